@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+
+from app.core.dependencies import require_admin
+from app.core.profiler import list_profiles, profile_file_path, set_dataset_profiling
+from app.models.profiling import (
+    DatasetProfilesResponse,
+    DatasetProfilingRequest,
+    DatasetProfilingResponse,
+)
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+    dependencies=[Depends(require_admin)],
+)
+
+
+@router.put("/datasets/{dataset_id}/profiling", response_model=DatasetProfilingResponse)
+async def set_profiling(dataset_id: str, body: DatasetProfilingRequest):
+    # While enabled, every ingest, append, dashboard and insights run for the dataset is profiled
+    if not await run_in_threadpool(set_dataset_profiling, dataset_id, body.enabled):
+        raise HTTPException(status_code=404, detail="Dataset not found")
+
+    return {"dataset_id": dataset_id, "profiling": body.enabled}
+
+
+@router.get("/datasets/{dataset_id}/profiles", response_model=DatasetProfilesResponse)
+async def get_profiles(dataset_id: str):
+    profiles = await run_in_threadpool(list_profiles, dataset_id)
+    return {"dataset_id": dataset_id, "profiles": profiles}
+
+
+@router.get("/datasets/{dataset_id}/profiles/{profile_id}/{filename}")
+async def download_profile_file(dataset_id: str, profile_id: str, filename: str):
+    path = await run_in_threadpool(profile_file_path, dataset_id, profile_id, filename)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile file not found")
+
+    return FileResponse(path, filename=f"{profile_id}-{filename}")
@@ -29,10 +29,10 @@ class TokenResponse(BaseModel):
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register_user(payload: UserRegisterRequest):
+async def register_user(payload: UserRegisterRequest):
     print("Registering user with email:", payload.email)
     try:
-        user = create_user(payload)
+        user = await create_user(payload)
     except ValueError as exc:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -49,8 +49,8 @@ def register_user(payload: UserRegisterRequest):
 
 
 @router.post("/login", response_model=TokenResponse)
-def login_user(payload: UserLoginRequest):
-    user = authenticate_user(payload.email, payload.password)
+async def login_user(payload: UserLoginRequest):
+    user = await authenticate_user(payload.email, payload.password)
 
     if not user:
         raise HTTPException(
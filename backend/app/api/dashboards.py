@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional
 from uuid import uuid4
@@ -13,7 +14,10 @@ from app.core.dependencies import get_current_user
 from bson import ObjectId
 from datetime import datetime
 
-from app.core.database import get_dashboards_collection 
+from app.core.database import get_async_dashboards_collection
+from app.core.files import dataset_exists
+from app.core.http_cache import artifact_or_not_modified
+from app.core.storage import dashboard_key, storage_key
 
 
 router = APIRouter(prefix="/dashboards", tags=["Dashboards"])
@@ -21,62 +25,59 @@ from app.models.dashboard import DashboardCreateResponse
 
 @router.post("/", response_model=DashboardCreateResponse)
 async def create_dashboard(dataset_id: str,current_user: dict = Depends(get_current_user),):
-    dataset_path = os.path.join(settings.DATASET_DIR, dataset_id)
-
-    if not os.path.exists(dataset_path):
+    if not await dataset_exists(dataset_id):
         raise HTTPException(status_code=404, detail="Dataset not found")
 
-    dashboard = generate_dashboard(dataset_id)
-
-    dashboard_path = os.path.join(
-        settings.DASHBOARD_DIR,
-        f"{dashboard['dashboard_id']}.json"
-    )
-
-    with open(dashboard_path, "w") as f:
-        json.dump(dashboard, f, indent=2,default=str)
+    # generate_dashboard validates and writes the artifact itself
+    dashboard = await run_in_threadpool(generate_dashboard, dataset_id)
 
-    dashboards_col = get_dashboards_collection()
-    dashboards_col.insert_one({
+    dashboards_col = get_async_dashboards_collection()
+    await dashboards_col.insert_one({
         "dashboard_id": dashboard["dashboard_id"],
         "dataset_id": dataset_id,
         "user_id": str(current_user["_id"]),
         "created_at": datetime.utcnow(),
-        "path": dashboard_path,
+        "path": dashboard_key(dashboard["dashboard_id"]),
     })
 
 
     return {"dashboard_id": dashboard["dashboard_id"]}
 
 @router.get("/{dashboard_id}", response_model=DashboardResponse)
-async def get_dashboard(dashboard_id: str,current_user: dict = Depends(get_current_user),):
-    dashboards_col = get_dashboards_collection()
-
-    dashboard_meta = dashboards_col.find_one({
-        "dashboard_id": dashboard_id,
-        "user_id": str(current_user["_id"]),
-    })
+async def get_dashboard(dashboard_id: str,request: Request,current_user: dict = Depends(get_current_user),):
+    dashboards_col = get_async_dashboards_collection()
+
+    dashboard_meta = await dashboards_col.find_one(
+        {
+            "dashboard_id": dashboard_id,
+            "user_id": str(current_user["_id"]),
+        },
+        {"path": 1},
+    )
 
     if not dashboard_meta:
         raise HTTPException(status_code=404, detail="Dashboard not found")
 
-    with open(dashboard_meta["path"]) as f:
-        return json.load(f)
+    # Stored in wire form and validated when written; stream it as is
+    return await artifact_or_not_modified(request, storage_key(dashboard_meta["path"]))
 
 
 @router.get("/by-dataset/{dataset_id}", response_model=DashboardResponse)
-async def get_dashboard_by_dataset(dataset_id: str,current_user: dict = Depends(get_current_user),):
-    dashboards_col = get_dashboards_collection()
-
-    dashboard_meta = dashboards_col.find_one({
-        "dataset_id": dataset_id,
-        "user_id": str(current_user["_id"]),
-    })
+async def get_dashboard_by_dataset(dataset_id: str,request: Request,current_user: dict = Depends(get_current_user),):
+    dashboards_col = get_async_dashboards_collection()
+
+    dashboard_meta = await dashboards_col.find_one(
+        {
+            "dataset_id": dataset_id,
+            "user_id": str(current_user["_id"]),
+        },
+        {"path": 1},
+    )
 
     if not dashboard_meta:
         # 🔥 AUTO-GENERATE
-        dashboard = generate_dashboard(dataset_id)
-        return dashboard
+        dashboard = await run_in_threadpool(generate_dashboard, dataset_id)
+        return await artifact_or_not_modified(request, dashboard_key(dashboard["dashboard_id"]))
 
     if not dashboard_meta:
         raise HTTPException(
@@ -84,7 +85,6 @@ async def get_dashboard_by_dataset(dataset_id: str,current_user: dict = Depends(
             detail="Dashboard not found for dataset"
         )
 
-    with open(dashboard_meta["path"]) as f:
-        return json.load(f)
+    return await artifact_or_not_modified(request, storage_key(dashboard_meta["path"]))
 
 
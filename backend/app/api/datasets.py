@@ -1,27 +1,41 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from uuid import uuid4
-from typing import List
+import asyncio
+from typing import List, Optional
 import os
-import shutil
-from app.models.dataset import DatasetResponse, DatasetListResponse
+from app.models.dataset import DatasetAppendResponse, DatasetResponse, DatasetListResponse
+from app.models.query import DatasetQueryRequest, DatasetQueryResponse
 
-from app.services.dataset_service import process_dataset
 from app.core.config import settings
+from app.core.jobs import enqueue_dataset_job, cancel_dataset_job, QUEUED, READY
 from app.core.dependencies import get_current_user
+from app.core.events import EVENT_FIELDS, dataset_event, dataset_events, format_sse
 
 from bson import ObjectId
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from app.core.database import get_datasets_collection
+from app.core.database import get_async_datasets_collection
+from app.core.files import FileTooLargeError, save_upload
+from app.core.http_cache import cache_headers, is_not_modified, make_etag, not_modified
+from app.core.storage import dataset_prefix, get_storage
+from app.services.dashboard_service import invalidate_dashboards
+from app.services.dataset_service import AppendError, append_dataset, link_dataset_artifacts
+from app.services.insight_service import invalidate_insights
+from app.services.query_service import QueryError, run_query
+from app.services.user_service import increment_user_stat
 
 
 router = APIRouter(prefix="/datasets", tags=["Datasets"])
 
+# What DatasetResponse/DatasetListResponse show; reads fetch nothing else
+DATASET_FIELDS = {field: 1 for field in EVENT_FIELDS}
+
 
 @router.post("/upload", response_model=DatasetResponse)
 async def upload_dataset(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     current_user: dict = Depends(get_current_user)
 ):
@@ -31,73 +45,343 @@ async def upload_dataset(
             detail="Unsupported file type"
         )
 
-    dataset_id = str(uuid4())
-    upload_dir = os.path.join(settings.DATASET_DIR, dataset_id)
-    os.makedirs(upload_dir, exist_ok=True)
+    max_bytes = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"File exceeds the {settings.MAX_UPLOAD_SIZE_MB} MB upload limit"
+    )
 
-    file_path = os.path.join(upload_dir, file.filename)
+    if file.size is not None and file.size > max_bytes:
+        raise too_large
+
+    dataset_id = str(uuid4())
+    storage = get_storage()
+    file_key = f"{dataset_prefix(dataset_id)}/{file.filename}"
+    file_path = storage.path(file_key)
 
     try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        content_hash = await save_upload(file.file, file_path, max_bytes)
+        # Ingest may run on any node
+        await run_in_threadpool(storage.publish, file_key)
+    except FileTooLargeError:
+        raise too_large
     except Exception:
         raise HTTPException(status_code=500, detail="File upload failed")
 
-    datasets_col = get_datasets_collection()
+    datasets_col = get_async_datasets_collection()
+    user_id = str(current_user["_id"])
+
+    # Same bytes already processed → share its artifacts instead of re-ingesting
+    source = await datasets_col.find_one(
+        {"content_hash": content_hash, "status": "READY"},
+        {"dataset_id": 1},
+    )
+
+    if source and await run_in_threadpool(
+        link_dataset_artifacts,
+        source["dataset_id"],
+        dataset_id,
+        file_path,
+        content_hash,
+    ):
+        await datasets_col.insert_one({
+            "dataset_id": dataset_id,
+            "user_id": user_id,
+            "filename": file.filename,
+            "status": "READY",
+            "job_status": READY,
+            "content_hash": content_hash,
+            "deduplicated_from": source["dataset_id"],
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow(),
+            "path": file_key,
+        })
+        increment_user_stat(user_id, "datasets_uploaded")
+
+        return DatasetResponse(
+            dataset_id=dataset_id,
+            filename=file.filename,
+            status="READY",
+            job_status=READY,
+        )
 
-    datasets_col.insert_one({
+    await datasets_col.insert_one({
         "dataset_id": dataset_id,
-        "user_id": str(current_user["_id"]),
+        "user_id": user_id,
         "filename": file.filename,
         "status": "PROCESSING",
+        "job_status": QUEUED,
+        "content_hash": content_hash,
         "created_at": datetime.utcnow(),
-        "path": file_path,
+        "updated_at": datetime.utcnow(),
+        "path": file_key,
     })
 
 
-    background_tasks.add_task(process_dataset, dataset_id, file_path)
+    await run_in_threadpool(enqueue_dataset_job, dataset_id, file_key)
 
     return DatasetResponse(
         dataset_id=dataset_id,
         filename=file.filename,
-        status="PROCESSING"
+        status="PROCESSING",
+        job_status=QUEUED,
+    )
+
+
+@router.get("/events")
+async def stream_dataset_events(request: Request, current_user: dict = Depends(get_current_user)):
+    """
+    Server-sent events: one `datasets` event with the user's datasets, then
+    a `dataset` event whenever one of them changes status or ingest stage.
+    """
+    user_id = str(current_user["_id"])
+    # Subscribe before the snapshot so no change falls in between
+    queue = dataset_events.subscribe(user_id)
+
+    async def events():
+        try:
+            datasets = await get_async_datasets_collection().find(
+                {"user_id": user_id},
+                DATASET_FIELDS,
+            ).to_list()
+            yield format_sse("datasets", [dataset_event(d) for d in datasets])
+
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(),
+                        settings.DATASET_EVENTS_KEEPALIVE_SECONDS,
+                    )
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle connection
+                    yield b": keepalive\n\n"
+                    continue
+
+                yield format_sse("dataset", event)
+        finally:
+            dataset_events.unsubscribe(user_id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
 @router.get("/{dataset_id}", response_model=DatasetResponse)
-async def get_dataset(dataset_id: str,current_user: dict = Depends(get_current_user),):
-    datasets_col = get_datasets_collection()
+async def get_dataset(
+    dataset_id: str,
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(get_current_user),
+):
+    datasets_col = get_async_datasets_collection()
 
-    dataset = datasets_col.find_one({
-        "dataset_id": dataset_id,
-        "user_id": str(current_user["_id"]),
-    })
+    dataset = await datasets_col.find_one(
+        {
+            "dataset_id": dataset_id,
+            "user_id": str(current_user["_id"]),
+        },
+        DATASET_FIELDS,
+    )
 
     if not dataset:
         raise HTTPException(status_code=404, detail="Dataset not found")
 
+    body = DatasetResponse(
+        dataset_id=dataset["dataset_id"],
+        filename=dataset["filename"],
+        status=dataset["status"],
+        job_status=dataset.get("job_status"),
+        stage=dataset.get("stage"),
+    )
+
+    # Polled while processing; most polls see the same status
+    etag = make_etag(body.model_dump())
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    response.headers.update(cache_headers(etag))
+    return body
+
+
+@router.post("/{dataset_id}/cancel", response_model=DatasetResponse)
+async def cancel_dataset_processing(dataset_id: str,current_user: dict = Depends(get_current_user),):
+    datasets_col = get_async_datasets_collection()
+
+    dataset = await datasets_col.find_one(
+        {
+            "dataset_id": dataset_id,
+            "user_id": str(current_user["_id"]),
+        },
+        DATASET_FIELDS,
+    )
+
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+
+    if dataset["status"] != "PROCESSING" or not await run_in_threadpool(cancel_dataset_job, dataset_id):
+        raise HTTPException(status_code=409, detail="Dataset is not being processed")
+
     return DatasetResponse(
         dataset_id=dataset["dataset_id"],
         filename=dataset["filename"],
         status=dataset["status"],
+        job_status=dataset.get("job_status"),
+        stage=dataset.get("stage"),
+    )
+
+
+@router.post("/{dataset_id}/append", response_model=DatasetAppendResponse)
+async def append_to_dataset(
+    dataset_id: str,
+    file: UploadFile = File(...),
+    current_user: dict = Depends(get_current_user)
+):
+    if file.content_type not in settings.ALLOWED_FILE_TYPES:
+        raise HTTPException(status_code=400, detail="Unsupported file type")
+
+    max_bytes = settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
+    datasets_col = get_async_datasets_collection()
+    now = datetime.utcnow()
+
+    # One append at a time per dataset; a lock older than the job timeout
+    # belongs to a worker that died mid-append
+    dataset = await datasets_col.find_one_and_update(
+        {
+            "dataset_id": dataset_id,
+            "user_id": str(current_user["_id"]),
+            "status": "READY",
+            "$or": [
+                {"append_started_at": None},
+                {"append_started_at": {"$lt": now - timedelta(seconds=settings.INGEST_JOB_TIMEOUT_SECONDS)}},
+            ],
+        },
+        {"$set": {"append_started_at": now}},
+        projection={"_id": 1},
+    )
+
+    if not dataset:
+        exists = await datasets_col.find_one(
+            {
+                "dataset_id": dataset_id,
+                "user_id": str(current_user["_id"]),
+            },
+            {"_id": 1},
+        )
+        if not exists:
+            raise HTTPException(status_code=404, detail="Dataset not found")
+        raise HTTPException(status_code=409, detail="Dataset is not ready or is being updated")
+
+    delta_path = get_storage().path(
+        f"{dataset_prefix(dataset_id)}/appends/{uuid4()}_{file.filename}"
+    )
+
+    result = None
+    try:
+        delta_hash = await save_upload(file.file, delta_path, max_bytes)
+        result = await run_in_threadpool(append_dataset, dataset_id, delta_path, delta_hash)
+    except FileTooLargeError:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File exceeds the {settings.MAX_UPLOAD_SIZE_MB} MB upload limit"
+        )
+    except AppendError as exc:
+        # Unreadable files, unsupported formats and rows that don't fit the schema
+        raise HTTPException(status_code=400, detail=str(exc))
+    finally:
+        if result is None and os.path.exists(delta_path):
+            await run_in_threadpool(os.remove, delta_path)
+        await datasets_col.update_one(
+            {"dataset_id": dataset_id},
+            {"$set": {"append_started_at": None}},
+        )
+
+    await run_in_threadpool(invalidate_dashboards, dataset_id, result["previous_content_hash"])
+    await run_in_threadpool(invalidate_insights, dataset_id)
+
+    return DatasetAppendResponse(
+        dataset_id=dataset_id,
+        rows_appended=result["rows_appended"],
+        row_count=result["row_count"],
+    )
+
+
+@router.post("/{dataset_id}/query", response_model=DatasetQueryResponse)
+async def query_dataset(dataset_id: str,query: DatasetQueryRequest,current_user: dict = Depends(get_current_user),):
+    datasets_col = get_async_datasets_collection()
+
+    dataset = await datasets_col.find_one(
+        {
+            "dataset_id": dataset_id,
+            "user_id": str(current_user["_id"]),
+        },
+        DATASET_FIELDS,
     )
 
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+
+    if dataset["status"] != "READY":
+        raise HTTPException(status_code=409, detail="Dataset is not ready")
+
+    try:
+        return await run_in_threadpool(run_query, dataset_id, query)
+    except QueryError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
 
 @router.get("/", response_model=List[DatasetListResponse])
-async def list_datasets(current_user: dict = Depends(get_current_user)):
-    datasets_col = get_datasets_collection()
+async def list_datasets(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's Link: rel=\"next\" header"),
+    limit: Optional[int] = Query(None, ge=1, le=settings.DATASET_PAGE_SIZE_MAX, description="Page size; without limit or cursor the whole list is returned"),
+    current_user: dict = Depends(get_current_user),
+):
+    datasets_col = get_async_datasets_collection()
+    filters = {"user_id": str(current_user["_id"])}
 
-    datasets = datasets_col.find({
-        "user_id": str(current_user["_id"])
-    })
+    # Keyset pagination on _id: each page is an index range scan, however deep
+    if cursor is not None:
+        if not ObjectId.is_valid(cursor):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        filters["_id"] = {"$gt": ObjectId(cursor)}
+
+    datasets_query = datasets_col.find(filters, DATASET_FIELDS).sort("_id", 1)
+    next_cursor = None
+
+    if cursor is None and limit is None:
+        # Clients that don't page (the web UI) still get every dataset
+        datasets = await datasets_query.to_list()
+    else:
+        limit = limit or settings.DATASET_PAGE_SIZE
+        datasets = await datasets_query.limit(limit + 1).to_list()
 
-    return [
+        if len(datasets) > limit:
+            next_cursor = str(datasets[limit - 1]["_id"])
+            datasets = datasets[:limit]
+
+    body = [
         DatasetListResponse(
             dataset_id=d["dataset_id"],
             filename=d["filename"],
             status=d["status"],
+            job_status=d.get("job_status"),
+            stage=d.get("stage"),
         )
         for d in datasets
     ]
 
+    # The frontend polls this every few seconds; answer unchanged lists with 304
+    etag = make_etag([item.model_dump() for item in body], next_cursor)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    response.headers.update(cache_headers(etag))
+    if next_cursor is not None:
+        next_url = request.url.include_query_params(cursor=next_cursor, limit=limit)
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+
+    return body
+
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional
 import os
@@ -6,13 +7,16 @@ import json
 
 from app.models.insights import InsightResponse
 from app.core.config import settings
-from app.services.insight_service import generate_insights
+from app.services.insight_service import generate_insights, insights_key
 from app.core.dependencies import get_current_user
 
 from bson import ObjectId
 from datetime import datetime
 
-from app.core.database import get_insights_collection
+from app.core.database import get_async_insights_collection
+from app.core.files import dataset_exists, write_artifact
+from app.core.http_cache import artifact_or_not_modified
+from app.core.storage import storage_key
 
 
 router = APIRouter(prefix="/insights", tags=["Insights"])
@@ -21,40 +25,40 @@ from fastapi import Query
 
 @router.post("/generate", response_model=InsightResponse)
 async def generate_dataset_insights(dataset_id: str = Query(..., description="Dataset ID to generate insights for"),current_user: dict = Depends(get_current_user),):
-    dataset_dir = os.path.join(settings.DATASET_DIR, dataset_id)
-
-    if not os.path.exists(dataset_dir):
+    if not await dataset_exists(dataset_id):
         raise HTTPException(status_code=404, detail="Dataset not found")
 
-    insights = generate_insights(dataset_id)
+    insights = await run_in_threadpool(generate_insights, dataset_id)
 
-    insight_path = os.path.join(dataset_dir, "insights.json")
+    insight_key = insights_key(dataset_id)
 
-    with open(insight_path, "w") as f:
-        json.dump(insights, f, indent=2)
+    payload = await write_artifact(insight_key, InsightResponse, insights)
 
-    insights_col = get_insights_collection()
+    insights_col = get_async_insights_collection()
 
-    insights_col.insert_one({
+    await insights_col.insert_one({
         "dataset_id": dataset_id,
         "user_id": str(current_user["_id"]),
         "generated_at": datetime.utcnow(),
         "has_summary": bool(insights.get("summary")),
-        "path": insight_path,
+        "path": insight_key,
     })
 
 
-    return insights
+    return Response(content=payload, media_type="application/json")
 
 
 @router.get("/{dataset_id}", response_model=InsightResponse)
-async def get_dataset_insights(dataset_id: str,current_user: dict = Depends(get_current_user),):
-    insights_col = get_insights_collection()
+async def get_dataset_insights(dataset_id: str,request: Request,current_user: dict = Depends(get_current_user),):
+    insights_col = get_async_insights_collection()
 
-    insight_meta = insights_col.find_one({
-        "dataset_id": dataset_id,
-        "user_id": str(current_user["_id"]),
-    })
+    insight_meta = await insights_col.find_one(
+        {
+            "dataset_id": dataset_id,
+            "user_id": str(current_user["_id"]),
+        },
+        {"path": 1},
+    )
 
     if not insight_meta:
         raise HTTPException(
@@ -62,6 +66,6 @@ async def get_dataset_insights(dataset_id: str,current_user: dict = Depends(get_
             detail="Insights not generated yet"
         )
 
-    with open(insight_meta["path"]) as f:
-        return json.load(f)
+    # Stored in wire form and validated when written; stream it as is
+    return await artifact_or_not_modified(request, storage_key(insight_meta["path"]))
 
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends
 
 from app.core.dependencies import get_current_user
 from app.models.user import UserProfileResponse
+from app.services.user_service import pending_user_stats
 
 router = APIRouter(
     prefix="/users",
@@ -16,5 +17,13 @@ def get_profile(current_user: dict = Depends(get_current_user)):
         name=current_user.get("profile", {}).get("name"),
         is_active=current_user["is_active"],
         created_at=current_user["created_at"],
-        stats=current_user.get("stats", {})
+        stats=_with_pending(current_user)
     )
+
+
+def _with_pending(user: dict) -> dict:
+    # Counters written behind by this process that haven't reached Mongo yet
+    stats = dict(user.get("stats", {}))
+    for field, delta in pending_user_stats(user["_id"]).items():
+        stats[field] = stats.get(field, 0) + delta
+    return stats
@@ -1,4 +1,280 @@
-from functools import lru_cache
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Hashable, Optional
 
-def cached(func):
-    return lru_cache(maxsize=128)(func)
+from app.core.metrics import CACHE_REQUESTS
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int, ttl: float, name: Optional[str] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+
+            if entry is None:
+                _record(self.name, "miss")
+                return default
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                _record(self.name, "miss")
+                return default
+
+            self._data.move_to_end(key)
+            _record(self.name, "hit")
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class ByteLRUCache:
+    """LRU cache of serialized values bounded by total size in bytes, with TTL."""
+
+    def __init__(self, max_bytes: int, ttl: float, name: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.name = name
+        self.size = 0
+        self._data: "OrderedDict[Hashable, tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(key)
+
+            if entry is None:
+                _record(self.name, "miss")
+                return None
+
+            expires_at, payload = entry
+            if expires_at <= time.monotonic():
+                self._pop(key)
+                _record(self.name, "miss")
+                return None
+
+            self._data.move_to_end(key)
+            _record(self.name, "hit")
+            return payload
+
+    def set(self, key: Hashable, payload: bytes) -> None:
+        if len(payload) > self.max_bytes:
+            return
+
+        with self._lock:
+            self._pop(key)
+            self._data[key] = (time.monotonic() + self.ttl, payload)
+            self.size += len(payload)
+
+            while self.size > self.max_bytes:
+                oldest = next(iter(self._data))
+                self._pop(oldest)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def _pop(self, key: Hashable) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+
+class DiskCacheTier:
+    """
+    Shared cache tier: one file per key in a directory all workers can see.
+
+    Entries are never revisited once their dataset changes, so writers
+    sweep the directory every `sweep_interval` seconds: files past the TTL
+    go, then the oldest written ones until it fits in `max_bytes`.
+    """
+
+    def __init__(self, directory: Path, ttl: float, max_bytes: int, sweep_interval: float = 300):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+        self._sweep_lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self.directory / key
+
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl:
+                path.unlink(missing_ok=True)
+                return None
+            return path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key: str, payload: bytes) -> None:
+        if len(payload) > self.max_bytes:
+            return
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.directory / f"{key}.{os.getpid()}.tmp"
+        tmp_path.write_bytes(payload)
+        os.replace(tmp_path, self.directory / key)
+
+        if time.monotonic() >= self._next_sweep and self._sweep_lock.acquire(blocking=False):
+            try:
+                self.sweep()
+            finally:
+                self._next_sweep = time.monotonic() + self.sweep_interval
+                self._sweep_lock.release()
+
+    def invalidate(self, key: str) -> None:
+        (self.directory / key).unlink(missing_ok=True)
+
+    def sweep(self) -> None:
+        now = time.time()
+        entries = []
+
+        for entry in os.scandir(self.directory):
+            try:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+            except FileNotFoundError:
+                # Removed by another worker's sweep
+                continue
+
+            if now - stat.st_mtime > self.ttl:
+                # Also catches temp files left by a writer that died
+                Path(entry.path).unlink(missing_ok=True)
+            elif not entry.name.endswith(".tmp"):
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+
+            Path(path).unlink(missing_ok=True)
+            total -= size
+
+
+class MongoCacheTier:
+    """Shared cache tier stored in a Mongo collection (entries must fit in a document)."""
+
+    MAX_PAYLOAD_BYTES = 15 * 1024 * 1024
+
+    def __init__(self, get_collection: Callable, ttl: float):
+        self._get_collection = get_collection
+        self.ttl = ttl
+        self._indexed = False
+
+    def get(self, key: str) -> Optional[bytes]:
+        doc = self._get_collection().find_one(
+            {"_id": key, "expires_at": {"$gt": datetime.utcnow()}},
+            {"payload": 1},
+        )
+        return bytes(doc["payload"]) if doc else None
+
+    def set(self, key: str, payload: bytes) -> None:
+        if len(payload) > self.MAX_PAYLOAD_BYTES:
+            return
+
+        collection = self._get_collection()
+
+        if not self._indexed:
+            # Let Mongo drop expired entries on its own
+            collection.create_index("expires_at", expireAfterSeconds=0)
+            self._indexed = True
+
+        collection.replace_one(
+            {"_id": key},
+            {
+                "_id": key,
+                "payload": payload,
+                "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl),
+            },
+            upsert=True,
+        )
+
+    def invalidate(self, key: str) -> None:
+        self._get_collection().delete_one({"_id": key})
+
+
+class TieredCache:
+    """
+    JSON value cache: a per-process byte-bounded LRU in front of an optional
+    shared tier. Values are stored serialized, so every get returns a fresh
+    object that callers are free to mutate.
+    """
+
+    def __init__(self, local: ByteLRUCache, shared=None, name: Optional[str] = None):
+        self.local = local
+        self.shared = shared
+        self.name = name
+
+    def get(self, key: str) -> Optional[Any]:
+        payload = self.local.get(key)
+        result = "hit"
+
+        if payload is None and self.shared is not None:
+            payload = self.shared.get(key)
+            result = "shared_hit"
+            if payload is not None:
+                self.local.set(key, payload)
+
+        if payload is None:
+            _record(self.name, "miss")
+            return None
+
+        _record(self.name, result)
+        return json.loads(payload)
+
+    def set(self, key: str, value: Any) -> None:
+        payload = json.dumps(value, default=str).encode("utf-8")
+
+        self.local.set(key, payload)
+        if self.shared is not None:
+            self.shared.set(key, payload)
+
+    def invalidate(self, key: str) -> None:
+        self.local.invalidate(key)
+        if self.shared is not None:
+            self.shared.invalidate(key)
+
+
+def _record(name: Optional[str], result: str) -> None:
+    # Unnamed caches (e.g. the local tier of a TieredCache) aren't reported
+    if name is not None:
+        CACHE_REQUESTS.labels(name, result).inc()
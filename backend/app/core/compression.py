@@ -0,0 +1,107 @@
+"""
+Response compression negotiated from Accept-Encoding: brotli when the
+client takes it, gzip otherwise. Small bodies are sent as is.
+"""
+import anyio.to_thread
+import brotli
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+THREAD_MINIMUM_SIZE = 128 * 1024
+
+
+class SizedResponderMixin:
+    """
+    Sends bodies whose Content-Length is under minimum_size as is. The
+    function middlewares in main.py re-stream every response, so without
+    this Starlette only ever sees "more body to come" and compresses all
+    of them, however small.
+    """
+    passthrough = False
+
+    async def send_with_compression(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            content_length = Headers(raw=message["headers"]).get("content-length", "")
+            self.passthrough = content_length.isdigit() and int(content_length) < self.minimum_size
+
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        await super().send_with_compression(message)
+
+
+class SizedIdentityResponder(SizedResponderMixin, IdentityResponder):
+    pass
+
+
+class SizedGZipResponder(SizedResponderMixin, GZipResponder):
+    pass
+
+
+class BrotliResponder(SizedResponderMixin, IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int):
+        super().__init__(app, minimum_size)
+        self.quality = quality
+        self._compressor = None
+
+    async def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if self._compressor is None:
+            self._compressor = brotli.Compressor(quality=self.quality)
+
+        if len(body) >= THREAD_MINIMUM_SIZE:
+            # Compressing large chunks inline would block the event loop
+            return await anyio.to_thread.run_sync(self._compress_body, body, more_body)
+        return self._compress_body(body, more_body)
+
+    def _compress_body(self, body: bytes, more_body: bool) -> bytes:
+        if more_body:
+            return self._compressor.process(body) + self._compressor.flush()
+        return self._compressor.process(body) + self._compressor.finish()
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int, gzip_level: int, brotli_quality: int):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accepted = _accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+
+        if "br" in accepted:
+            responder = BrotliResponder(self.app, self.minimum_size, self.brotli_quality)
+        elif "gzip" in accepted:
+            responder = SizedGZipResponder(self.app, self.minimum_size, compresslevel=self.gzip_level)
+        else:
+            # Still adds Vary: Accept-Encoding to bodies that could have been compressed
+            responder = SizedIdentityResponder(self.app, self.minimum_size)
+
+        await responder(scope, receive, send)
+
+
+def _accepted_encodings(header: str) -> set:
+    accepted = set()
+
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        params = params.strip()
+
+        try:
+            weight = float(params.removeprefix("q=")) if params.startswith("q=") else 1.0
+        except ValueError:
+            weight = 1.0
+
+        # "gzip;q=0" means the client refuses it
+        if weight > 0:
+            accepted.add(coding.strip().lower())
+
+    return accepted
@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+from pydantic import field_validator
 from pydantic_settings import BaseSettings
 
 
@@ -11,6 +12,18 @@ class Settings(BaseSettings):
     DATASET_DIR: Path = DATA_DIR / "datasets"
     DASHBOARD_DIR: Path = DATA_DIR / "dashboards"
 
+    # Artifact storage. "local" keeps everything in DATA_DIR; "s3" publishes it
+    # to an S3-compatible bucket (credentials from the usual AWS variables) and
+    # uses DATA_DIR as this node's read-through cache, revalidated at most
+    # every STORAGE_CACHE_REVALIDATE_SECONDS
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "local")
+    STORAGE_S3_BUCKET: str | None = os.getenv("STORAGE_S3_BUCKET")
+    STORAGE_S3_PREFIX: str = ""
+    STORAGE_S3_ENDPOINT_URL: str | None = os.getenv("STORAGE_S3_ENDPOINT_URL")
+    STORAGE_S3_REGION: str | None = None
+    STORAGE_CACHE_REVALIDATE_SECONDS: float = 5
+    STORAGE_TRANSFER_CONCURRENCY: int = 8
+
     # File upload
     MAX_UPLOAD_SIZE_MB: int = 100
     ALLOWED_FILE_TYPES: list[str] = [
@@ -20,12 +33,94 @@ class Settings(BaseSettings):
         "application/json"
     ]
 
+    # Columnar dataset cache
+    COLUMNAR_COMPRESSION: str = "zstd"
+
+    # Streaming ingestion (CSV files above the threshold are read in chunks)
+    STREAMING_INGEST_THRESHOLD_MB: int = 50
+    INGEST_CHUNK_ROWS: int = 200_000
+    STREAMING_TOP_K_CAPACITY: int = 1000
+
+    # Ingest job executor (set INGEST_WORKERS=0 to leave ingest to `python -m app.worker`)
+    INGEST_WORKERS: int = 2
+    INGEST_JOB_TIMEOUT_SECONDS: int = 900
+    JOB_LEASE_SECONDS: int = 60
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF_SECONDS: int = 10
+    JOB_POLL_INTERVAL_SECONDS: float = 1.0
+
+    # Chart data (points per line/scatter widget, bars per bar widget incl. "Other")
+    CHART_POINT_BUDGET: int = 500
+    CHART_MAX_CATEGORIES: int = 20
+
+    # Ad-hoc query result cache
+    QUERY_CACHE_MAX_MB: int = 64
+    QUERY_CACHE_TTL_SECONDS: int = 600
+
+    # Dataset listing (GET /datasets is keyset-paginated once a client passes
+    # limit or cursor; see its Link header)
+    DATASET_PAGE_SIZE: int = 100
+    DATASET_PAGE_SIZE_MAX: int = 500
+
+    # Dataset status events (GET /datasets/events). Source "auto" follows a Mongo
+    # change stream and falls back to polling on a standalone server; "poll" always polls
+    DATASET_EVENTS_SOURCE: str = "auto"
+    DATASET_EVENTS_POLL_SECONDS: float = 2
+    DATASET_EVENTS_KEEPALIVE_SECONDS: float = 15
+
+    # Dashboard cache (shared tier: "none", "disk" or "mongo")
+    DASHBOARD_CACHE_MAX_MB: int = 64
+    DASHBOARD_CACHE_TTL_SECONDS: int = 3600
+    DASHBOARD_CACHE_SHARED_TIER: str = "disk"
+    DASHBOARD_CACHE_DIR: Path = DATA_DIR / "cache" / "dashboards"
+    # Disk tier bounds, enforced by a sweep every DASHBOARD_CACHE_SWEEP_SECONDS
+    DASHBOARD_CACHE_DISK_MAX_MB: int = 1024
+    DASHBOARD_CACHE_SWEEP_SECONDS: int = 300
+
+    # Response compression (brotli or gzip, as the client accepts; smaller bodies go out as is)
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    GZIP_COMPRESS_LEVEL: int = 6
+    BROTLI_QUALITY: int = 5
+
+    # Metrics (set a directory to merge samples from ingest children and
+    # gunicorn workers through files there; unset or empty keeps metrics
+    # in-process)
+    METRICS_MULTIPROC_DIR: Path | None = None
+
+    # Admin access (X-Admin-Token header); admin routes are disabled when unset
+    ADMIN_TOKEN: str | None = os.getenv("ADMIN_TOKEN")
+
+    # On-demand profiling (X-Profile: 1 plus X-Admin-Token, or a dataset's `profiling` flag)
+    PROFILING_SAMPLE_INTERVAL_MS: float = 5
+    PROFILING_TRACEMALLOC_FRAMES: int = 10
+
+    # Password hashing (argon2id). Raising the cost rehashes each stored
+    # password at its owner's next login
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST_KIB: int = 65536
+    ARGON2_PARALLELISM: int = 4
+
+    # Password hashing runs on its own threads, away from the request
+    # threadpool; work beyond the workers plus this queue is refused with 429
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_QUEUE: int = 16
+
     # JWT configuration
     JWT_SECRET_KEY: str = os.getenv("JWT_SECRET_KEY", "change-me")
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    TOKEN_CACHE_SIZE: int = 10_000
+
+    # Authenticated-user cache
+    USER_CACHE_SIZE: int = 10_000
+    USER_CACHE_TTL_SECONDS: int = 30
 
 
+    # User stats counters are buffered and written in batches; a crash loses
+    # at most one flush interval of increments
+    USER_STATS_FLUSH_SECONDS: float = 5
+    USER_STATS_MAX_PENDING_USERS: int = 10_000
+
     # LLM configuration
     COHERE_API_KEY: str | None = os.getenv("COHERE_API_KEY")
     COHERE_MODEL: str = "c4ai-command"
@@ -33,11 +128,19 @@ class Settings(BaseSettings):
     # MongoDB configuration
     MONGODB_URI: str | None = os.getenv("MONGODB_URI")
     MONGODB_DB_NAME: str = os.getenv("MONGODB_DB_NAME", "smart_dashboard_db")
+    # Create/reconcile the indexes declared in app.core.indexes at startup
+    MONGODB_ENSURE_INDEXES: bool = True
 
 
     # Environment
     ENV: str = os.getenv("ENV", "development")
 
+    @field_validator("METRICS_MULTIPROC_DIR", mode="before")
+    @classmethod
+    def _empty_dir_is_unset(cls, value):
+        # METRICS_MULTIPROC_DIR= would otherwise parse as Path("."), the cwd
+        return value or None
+
     class Config:
         env_file = ".env"
 
@@ -1,12 +1,19 @@
 from typing import Optional
-from pymongo import MongoClient
+from pymongo import AsyncMongoClient, MongoClient
+from pymongo.asynchronous.database import AsyncDatabase
 from pymongo.database import Database
 
 from app.core.config import settings
+from app.core.metrics import MongoCommandListener
 
 _client: Optional[MongoClient] = None
 _db: Optional[Database] = None
 
+# Request handlers use the async client so Mongo round-trips never block the
+# event loop; background jobs and threadpool code keep the sync client.
+_async_client: Optional[AsyncMongoClient] = None
+_async_db: Optional[AsyncDatabase] = None
+
 def get_users_collection():
     print("Getting users collection")
     return get_database()["users"]
@@ -24,6 +31,14 @@ def get_insights_collection():
     return get_database()["insights"]
 
 
+def get_jobs_collection():
+    return get_database()["jobs"]
+
+
+def get_dashboard_cache_collection():
+    return get_database()["dashboard_cache"]
+
+
 def get_database() -> Database:
     global _client, _db
 
@@ -35,8 +50,54 @@ def get_database() -> Database:
 
     _client = MongoClient(
         settings.MONGODB_URI,
-        serverSelectionTimeoutMS=5000
+        serverSelectionTimeoutMS=5000,
+        event_listeners=[MongoCommandListener()]
     )
 
     _db = _client[settings.MONGODB_DB_NAME]
     return _db
+
+
+def get_async_users_collection():
+    return get_async_database()["users"]
+
+
+def get_async_datasets_collection():
+    return get_async_database()["datasets"]
+
+
+def get_async_dashboards_collection():
+    return get_async_database()["dashboards"]
+
+
+def get_async_insights_collection():
+    return get_async_database()["insights"]
+
+
+def get_async_database() -> AsyncDatabase:
+    global _async_client, _async_db
+
+    if _async_db is not None:
+        return _async_db
+
+    if not settings.MONGODB_URI:
+        raise RuntimeError("MONGODB_URI is not configured")
+
+    _async_client = AsyncMongoClient(
+        settings.MONGODB_URI,
+        serverSelectionTimeoutMS=5000,
+        event_listeners=[MongoCommandListener()]
+    )
+
+    _async_db = _async_client[settings.MONGODB_DB_NAME]
+    return _async_db
+
+
+async def close_async_database() -> None:
+    global _async_client, _async_db
+
+    if _async_client is not None:
+        await _async_client.close()
+
+    _async_client = None
+    _async_db = None
@@ -1,13 +1,15 @@
-from fastapi import Depends, HTTPException, status
+from typing import Optional
+
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
-from app.core.security import decode_access_token
-from app.services.user_service import get_user_by_id
+from app.core.security import decode_access_token, is_admin_token
+from app.services.user_service import get_user_by_id_async
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
     user_id = decode_access_token(token)
 
     if not user_id:
@@ -16,7 +18,7 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
             detail="Invalid or expired token",
         )
 
-    user = get_user_by_id(user_id)
+    user = await get_user_by_id_async(user_id)
 
     if not user:
         raise HTTPException(
@@ -31,3 +33,11 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> dict:
         )
 
     return user
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(default=None)) -> None:
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin token required",
+        )
@@ -0,0 +1,143 @@
+"""
+Dataset status events for GET /datasets/events.
+
+Ingest runs in other processes (and possibly on other hosts), so events
+are read back from the `datasets` collection: through a change stream
+when Mongo is a replica set, otherwise by polling recently updated
+documents. Each API process runs one such feed while anyone is
+subscribed and fans the changes out to its subscribers' queues.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+import orjson
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import get_async_datasets_collection
+
+logger = logging.getLogger(__name__)
+
+EVENT_FIELDS = ["dataset_id", "filename", "status", "job_status", "stage"]
+
+# Polls re-read this far back so writers with a lagging clock aren't missed
+POLL_LOOKBACK_SECONDS = 30
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Mongo's "The $changeStream stage is only supported on replica sets"
+CHANGE_STREAMS_UNSUPPORTED = 40573
+
+
+def dataset_event(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {field: doc.get(field) for field in EVENT_FIELDS}
+
+
+def format_sse(event: str, data: Any) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+class DatasetEventHub:
+    def __init__(self):
+        self._subscribers: Dict[str, set] = defaultdict(set)
+        self._task: Optional[asyncio.Task] = None
+        self._source = settings.DATASET_EVENTS_SOURCE
+        # Last state sent per dataset; polls and unrelated updates repeat it
+        self._last_sent = TTLCache(maxsize=100_000, ttl=2 * POLL_LOOKBACK_SECONDS)
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers[user_id].add(queue)
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._feed())
+
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(user_id)
+        if queues is None:
+            return
+
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[user_id]
+
+        # Nobody listening: stop reading Mongo
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _publish(self, doc: Dict[str, Any]) -> None:
+        event = dataset_event(doc)
+        if self._last_sent.get(event["dataset_id"]) == event:
+            return
+
+        self._last_sent.set(event["dataset_id"], event)
+
+        for queue in self._subscribers.get(doc.get("user_id"), ()):
+            if queue.full():
+                # A stalled client loses its oldest updates, not the newest
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def _feed(self) -> None:
+        while True:
+            try:
+                if self._source == "auto":
+                    await self._watch()
+                else:
+                    await self._poll()
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as exc:
+                if exc.code != CHANGE_STREAMS_UNSUPPORTED:
+                    logger.exception("Dataset event feed failed")
+                    await asyncio.sleep(settings.DATASET_EVENTS_POLL_SECONDS)
+                    continue
+
+                logger.info("Mongo has no change streams; polling for dataset events")
+                self._source = "poll"
+            except PyMongoError:
+                logger.exception("Dataset event feed failed")
+                await asyncio.sleep(settings.DATASET_EVENTS_POLL_SECONDS)
+
+    async def _watch(self) -> None:
+        pipeline = [
+            {"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}},
+            {"$project": {f"fullDocument.{field}": 1 for field in EVENT_FIELDS + ["user_id"]}},
+        ]
+
+        stream = await get_async_datasets_collection().watch(pipeline, full_document="updateLookup")
+        async with stream:
+            async for change in stream:
+                if change.get("fullDocument"):
+                    self._publish(change["fullDocument"])
+
+    async def _poll(self) -> None:
+        datasets_col = get_async_datasets_collection()
+
+        while True:
+            since = datetime.utcnow() - timedelta(seconds=POLL_LOOKBACK_SECONDS)
+
+            docs = await datasets_col.find(
+                {"updated_at": {"$gte": since}},
+                {field: 1 for field in EVENT_FIELDS + ["user_id"]},
+            ).to_list()
+
+            for doc in docs:
+                self._publish(doc)
+
+            await asyncio.sleep(settings.DATASET_EVENTS_POLL_SECONDS)
+
+
+dataset_events = DatasetEventHub()
@@ -0,0 +1,87 @@
+import contextlib
+import hashlib
+import os
+from typing import Any, BinaryIO, Optional, Type
+from uuid import uuid4
+
+import orjson
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+
+from app.core.storage import dataset_prefix, get_storage
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+
+class FileTooLargeError(ValueError):
+    pass
+
+
+# Async wrappers that move blocking disk I/O off the event loop
+
+async def dataset_exists(dataset_id: str) -> bool:
+    return await run_in_threadpool(get_storage().dir_exists, dataset_prefix(dataset_id))
+
+
+async def write_artifact(key: str, model: Type[BaseModel], data: Any) -> bytes:
+    return await run_in_threadpool(store_artifact, key, model, data)
+
+
+async def save_upload(src: BinaryIO, path: str, max_bytes: int) -> str:
+    """Copy an upload to `path` in chunks and return its SHA-256 hex digest."""
+    return await run_in_threadpool(_save_upload, src, path, max_bytes)
+
+
+def store_artifact(key: str, model: Type[BaseModel], data: Any) -> bytes:
+    """
+    Validate `data` against the response model once and write it in its
+    final wire form, so reads can stream the file back untouched. The file
+    goes to artifact storage under `key`.
+    """
+    payload = orjson.dumps(
+        model.model_validate(data).model_dump(),
+        default=str,
+        option=orjson.OPT_SERIALIZE_NUMPY,
+    )
+
+    storage = get_storage()
+    path = storage.path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # Readers stream the file, so never let them see a half-written one
+    tmp_path = f"{path}.{uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+    storage.publish(key)
+    return payload
+
+
+def artifact_response(path: str, headers: Optional[dict] = None) -> FileResponse:
+    return FileResponse(path, media_type="application/json", headers=headers)
+
+
+def _save_upload(src: BinaryIO, path: str, max_bytes: int) -> str:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    digest = hashlib.sha256()
+    written = 0
+
+    try:
+        with open(path, "wb") as buffer:
+            for chunk in iter(lambda: src.read(UPLOAD_CHUNK_BYTES), b""):
+                written += len(chunk)
+                if written > max_bytes:
+                    raise FileTooLargeError(f"Upload exceeds {max_bytes} bytes")
+
+                digest.update(chunk)
+                buffer.write(chunk)
+    except BaseException:
+        # Never leave a partial upload behind
+        with contextlib.suppress(OSError):
+            os.remove(path)
+            os.rmdir(os.path.dirname(path))
+        raise
+
+    return digest.hexdigest()
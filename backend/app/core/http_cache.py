@@ -0,0 +1,120 @@
+"""
+Conditional GETs for the endpoints the frontend polls.
+
+Handlers derive an ETag from what the response is made of (the dataset
+fields it shows, or the version of a stored artifact) and answer a
+matching If-None-Match with 304 before building or reading the body. The
+tags are weak because the same body may go out gzip- or brotli-encoded.
+"""
+import hashlib
+from typing import Any, Optional, Tuple
+
+import orjson
+from fastapi import HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from app.core.files import artifact_response
+from app.core.storage import get_storage
+
+# Per-user data: browsers may keep it but must revalidate on every use
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.blake2b(orjson.dumps(parts, default=str), digest_size=16).hexdigest()
+    return f'W/"{digest}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+
+    # If-None-Match uses weak comparison
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def cache_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag))
+
+
+async def artifact_or_not_modified(request: Request, key: str) -> Response:
+    """
+    Stream a stored artifact, or 304 when the client's copy is current.
+    Single byte ranges are honoured with either storage backend.
+    """
+    storage = get_storage()
+
+    info = await run_in_threadpool(storage.stat, key)
+    if info is None:
+        raise HTTPException(status_code=404, detail="Not found")
+
+    etag = make_etag(info.version)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+
+    headers = cache_headers(etag)
+    if storage.is_local:
+        # FileResponse does its own Range handling
+        return artifact_response(storage.path(key), headers)
+
+    headers["Accept-Ranges"] = "bytes"
+    byte_range = _requested_range(request, etag, info.size)
+
+    if byte_range is None:
+        return StreamingResponse(
+            storage.iter_range(key),
+            media_type="application/json",
+            headers={**headers, "Content-Length": str(info.size)},
+        )
+
+    start, end = byte_range
+    return StreamingResponse(
+        storage.iter_range(key, start, end),
+        status_code=206,
+        media_type="application/json",
+        headers={
+            **headers,
+            "Content-Range": f"bytes {start}-{end}/{info.size}",
+            "Content-Length": str(end - start + 1),
+        },
+    )
+
+
+def _requested_range(request: Request, etag: str, size: int) -> Optional[Tuple[int, int]]:
+    header = request.headers.get("range", "")
+    if not header.startswith("bytes=") or "," in header:
+        return None
+
+    # A range against another version of the artifact gets the whole thing
+    if_range = request.headers.get("if-range")
+    if if_range and if_range.strip().removeprefix("W/") != etag.removeprefix("W/"):
+        return None
+
+    first, _, last = header.removeprefix("bytes=").strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            # "bytes=-N": the last N bytes
+            start, end = max(size - int(last), 0), size - 1
+    except ValueError:
+        return None
+
+    if start > end or start >= size:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+
+    return start, end
@@ -0,0 +1,89 @@
+"""
+Indexes the services' queries rely on, created at startup.
+
+Each collection's indexes are declared here with the lookups they serve.
+`ensure_indexes` creates the missing ones and rebuilds any whose options
+(e.g. uniqueness) no longer match the declaration. Indexes that aren't
+declared are reported, never dropped; one may have been added by hand.
+"""
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.database import Database
+from pymongo.errors import OperationFailure
+
+from app.core.database import get_database
+
+logger = logging.getLogger(__name__)
+
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        # Login and registration; one account per address
+        IndexModel([("email", ASCENDING)], unique=True),
+    ],
+    "datasets": [
+        IndexModel([("dataset_id", ASCENDING)], unique=True),
+        # Per-user lookups, and list_datasets' keyset pages
+        IndexModel([("user_id", ASCENDING), ("_id", ASCENDING)]),
+        # Upload de-duplication
+        IndexModel([("content_hash", ASCENDING), ("status", ASCENDING)]),
+        # Dataset events poller
+        IndexModel([("updated_at", ASCENDING)]),
+    ],
+    "dashboards": [
+        IndexModel([("dashboard_id", ASCENDING), ("user_id", ASCENDING)]),
+        IndexModel([("dataset_id", ASCENDING), ("user_id", ASCENDING)]),
+    ],
+    "insights": [
+        IndexModel([("dataset_id", ASCENDING), ("user_id", ASCENDING)]),
+    ],
+    "jobs": [
+        # Claiming queued jobs and reclaiming expired leases
+        IndexModel([("state", ASCENDING), ("available_at", ASCENDING)]),
+        IndexModel([("state", ASCENDING), ("lease_expires_at", ASCENDING)]),
+        IndexModel([("dataset_id", ASCENDING)]),
+    ],
+}
+
+# Options that change what an index is, rather than how it was built
+_COMPARED_OPTIONS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds")
+
+
+def ensure_indexes(collections: Optional[Iterable[str]] = None, db: Optional[Database] = None) -> None:
+    db = db if db is not None else get_database()
+
+    for name in collections or INDEXES:
+        _reconcile(db[name], INDEXES[name])
+
+
+def _reconcile(collection, declared: List[IndexModel]) -> None:
+    existing = collection.index_information()
+    missing = []
+
+    for model in declared:
+        spec = model.document
+        current = existing.get(spec["name"])
+
+        if current is None:
+            missing.append(model)
+        elif any(current.get(option) != spec.get(option) for option in _COMPARED_OPTIONS):
+            logger.warning("Rebuilding index %s.%s: options changed", collection.name, spec["name"])
+            collection.drop_index(spec["name"])
+            missing.append(model)
+
+    for model in missing:
+        try:
+            collection.create_indexes([model])
+        except OperationFailure as exc:
+            # e.g. duplicate emails already stored; the service still runs without it
+            logger.error(
+                "Could not create index %s.%s: %s",
+                collection.name,
+                model.document["name"],
+                exc,
+            )
+
+    declared_names = {model.document["name"] for model in declared} | {"_id_"}
+    for name in existing.keys() - declared_names:
+        logger.info("Index %s.%s is not declared in app.core.indexes", collection.name, name)
@@ -0,0 +1,458 @@
+import logging
+import multiprocessing
+from multiprocessing import forkserver
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+from uuid import uuid4
+
+from pymongo import ASCENDING, ReturnDocument
+
+from app.core.config import settings
+from app.core.database import get_datasets_collection, get_jobs_collection
+from app.core.indexes import ensure_indexes
+from app.core.metrics import mark_process_dead
+from app.services.dataset_service import process_dataset
+from app.services.user_service import increment_user_stat
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "QUEUED"
+RUNNING = "RUNNING"
+READY = "READY"
+FAILED = "FAILED"
+
+
+def enqueue_dataset_job(dataset_id: str, file_path: str) -> str:
+    """Persist an ingest job; any worker sharing the dataset storage can claim it."""
+    now = datetime.utcnow()
+    job_id = str(uuid4())
+
+    get_jobs_collection().insert_one({
+        "job_id": job_id,
+        "dataset_id": dataset_id,
+        "file_path": file_path,
+        "state": QUEUED,
+        "attempts": 0,
+        "max_attempts": settings.JOB_MAX_ATTEMPTS,
+        "available_at": now,
+        "lease_owner": None,
+        "lease_expires_at": None,
+        "cancel_requested": False,
+        "created_at": now,
+        "updated_at": now,
+    })
+
+    return job_id
+
+
+def cancel_dataset_job(dataset_id: str) -> bool:
+    jobs_col = get_jobs_collection()
+    now = datetime.utcnow()
+
+    # Queued jobs can be failed on the spot
+    job = jobs_col.find_one_and_update(
+        {"dataset_id": dataset_id, "state": QUEUED},
+        {"$set": {"state": FAILED, "error": "Processing cancelled", "updated_at": now}},
+    )
+    if job:
+        _fail_dataset(dataset_id, "Processing cancelled")
+        return True
+
+    # Running jobs are killed by whichever worker holds the lease
+    result = jobs_col.update_one(
+        {"dataset_id": dataset_id, "state": RUNNING},
+        {"$set": {"cancel_requested": True, "updated_at": now}},
+    )
+    return result.modified_count > 0
+
+
+def ensure_job_indexes() -> None:
+    # Standalone workers (python -m app.worker) don't run the API's startup
+    ensure_indexes(["jobs"])
+
+
+class JobExecutor:
+    """
+    Claims ingest jobs from the `jobs` collection and runs them in child
+    processes, at most `max_workers` at a time.
+
+    A claimed job carries a lease that is renewed while the child runs. If
+    this worker dies, the lease expires and another worker reclaims the job.
+    Failed attempts are retried with exponential backoff up to
+    `max_attempts`. Each job gets its own process (forked from a clean
+    forkserver) so it can be killed on timeout or cancellation.
+    """
+
+    def __init__(
+        self,
+        target: Callable[[str, str, bool], None],
+        max_workers: int,
+        timeout: float,
+        worker_id: Optional[str] = None,
+    ):
+        self._target = target
+        self._max_workers = max_workers
+        self._timeout = timeout
+        self._worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self._stopping = threading.Event()
+        self._threads = []
+        self._ctx = _process_context()
+
+    def start(self) -> None:
+        if self._ctx.get_start_method() == "forkserver":
+            # Pay the pandas import once here rather than in the first job
+            forkserver.ensure_running()
+
+        ensure_job_indexes()
+
+        for i in range(self._max_workers):
+            thread = threading.Thread(
+                target=self._supervise,
+                name=f"ingest-supervisor-{i}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def shutdown(self) -> None:
+        self._stopping.set()
+
+        for thread in self._threads:
+            thread.join(timeout=10)
+
+        self._threads = []
+
+    def wait(self) -> None:
+        while any(thread.is_alive() for thread in self._threads):
+            time.sleep(1)
+
+    def _supervise(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                job = self._claim()
+            except Exception:
+                logger.exception("Failed to claim ingest job")
+                job = None
+
+            if job is None:
+                try:
+                    _reap_exhausted_jobs()
+                except Exception:
+                    logger.exception("Failed to reap exhausted ingest jobs")
+
+                self._stopping.wait(settings.JOB_POLL_INTERVAL_SECONDS)
+                continue
+
+            try:
+                self._run(job)
+            except Exception as exc:
+                logger.exception("Ingest job %s crashed", job["job_id"])
+
+                try:
+                    self._finish_failed(job, str(exc), retry=True)
+                except Exception:
+                    # The lease runs out and another claim retries the job
+                    logger.exception("Failed to record failure of ingest job %s", job["job_id"])
+
+    def _claim(self) -> Optional[dict]:
+        now = datetime.utcnow()
+
+        return get_jobs_collection().find_one_and_update(
+            {
+                "$or": [
+                    {"state": QUEUED, "available_at": {"$lte": now}},
+                    # Lease ran out: the worker holding it is gone
+                    {"state": RUNNING, "lease_expires_at": {"$lt": now}},
+                ],
+                "$expr": {"$lt": ["$attempts", "$max_attempts"]},
+                "cancel_requested": False,
+            },
+            {
+                "$set": {
+                    "state": RUNNING,
+                    "lease_owner": self._worker_id,
+                    "lease_expires_at": now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("available_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def _run(self, job: dict) -> None:
+        dataset_id = job["dataset_id"]
+        final_attempt = job["attempts"] >= job["max_attempts"]
+
+        _set_job_status(dataset_id, RUNNING)
+
+        process = self._ctx.Process(
+            target=self._target,
+            args=(dataset_id, job["file_path"], final_attempt),
+            name=f"ingest-{dataset_id}",
+        )
+        process.start()
+
+        deadline = time.monotonic() + self._timeout
+        next_heartbeat = time.monotonic() + _heartbeat_interval()
+
+        try:
+            while process.is_alive():
+                process.join(timeout=0.5)
+
+                if self._stopping.is_set():
+                    _terminate(process)
+                    self._release(job)
+                    return
+
+                if time.monotonic() > deadline:
+                    _terminate(process)
+                    self._finish_failed(
+                        job,
+                        f"Processing timed out after {self._timeout:g}s",
+                        retry=False,
+                    )
+                    return
+
+                if time.monotonic() >= next_heartbeat:
+                    lease = self._heartbeat(job)
+                    next_heartbeat = time.monotonic() + _heartbeat_interval()
+
+                    if lease is None:
+                        # Someone else owns the job now; don't race them
+                        _terminate(process)
+                        return
+
+                    if lease.get("cancel_requested"):
+                        _terminate(process)
+                        self._finish_failed(job, "Processing cancelled", retry=False)
+                        return
+        finally:
+            if process.is_alive():
+                # A Mongo error escaped the loop: the job is about to be
+                # handed back, so its child must not keep writing the dataset
+                _terminate(process)
+
+        mark_process_dead(process.pid)
+
+        if process.exitcode == 0:
+            self._finish_ready(job)
+        else:
+            self._finish_failed(
+                job,
+                f"Processing exited with code {process.exitcode}",
+                retry=True,
+            )
+
+    def _heartbeat(self, job: dict) -> Optional[dict]:
+        now = datetime.utcnow()
+
+        return get_jobs_collection().find_one_and_update(
+            {"job_id": job["job_id"], "lease_owner": self._worker_id, "state": RUNNING},
+            {
+                "$set": {
+                    "lease_expires_at": now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+                    "updated_at": now,
+                }
+            },
+            projection={"cancel_requested": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def _finish_ready(self, job: dict) -> None:
+        get_jobs_collection().update_one(
+            {"job_id": job["job_id"], "lease_owner": self._worker_id},
+            {
+                "$set": {
+                    "state": READY,
+                    "lease_owner": None,
+                    "lease_expires_at": None,
+                    "updated_at": datetime.utcnow(),
+                }
+            },
+        )
+        dataset = _set_job_status(job["dataset_id"], READY)
+
+        # Counted here rather than in the ingest child, which exits before
+        # the buffered increment would be written
+        if dataset:
+            increment_user_stat(dataset["user_id"], "datasets_uploaded")
+
+    def _finish_failed(self, job: dict, error: str, retry: bool) -> None:
+        now = datetime.utcnow()
+        attempts = job["attempts"]
+
+        if retry and attempts < job["max_attempts"]:
+            backoff = settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1)
+
+            get_jobs_collection().update_one(
+                {"job_id": job["job_id"], "lease_owner": self._worker_id},
+                {
+                    "$set": {
+                        "state": QUEUED,
+                        "available_at": now + timedelta(seconds=backoff),
+                        "lease_owner": None,
+                        "lease_expires_at": None,
+                        "error": error,
+                        "updated_at": now,
+                    }
+                },
+            )
+            _set_job_status(job["dataset_id"], QUEUED)
+            return
+
+        get_jobs_collection().update_one(
+            {"job_id": job["job_id"], "lease_owner": self._worker_id},
+            {
+                "$set": {
+                    "state": FAILED,
+                    "lease_owner": None,
+                    "lease_expires_at": None,
+                    "error": error,
+                    "updated_at": now,
+                }
+            },
+        )
+        _fail_dataset(job["dataset_id"], error)
+
+    def _release(self, job: dict) -> None:
+        # Shutting down: hand the job back without charging an attempt
+        get_jobs_collection().update_one(
+            {"job_id": job["job_id"], "lease_owner": self._worker_id},
+            {
+                "$set": {
+                    "state": QUEUED,
+                    "available_at": datetime.utcnow(),
+                    "lease_owner": None,
+                    "lease_expires_at": None,
+                },
+                "$inc": {"attempts": -1},
+            },
+        )
+        _set_job_status(job["dataset_id"], QUEUED)
+
+
+_executor: Optional[JobExecutor] = None
+
+
+def get_job_executor() -> JobExecutor:
+    global _executor
+
+    if _executor is None:
+        _executor = JobExecutor(
+            target=process_dataset,
+            max_workers=settings.INGEST_WORKERS,
+            timeout=settings.INGEST_JOB_TIMEOUT_SECONDS,
+        )
+        _executor.start()
+
+    return _executor
+
+
+def shutdown_job_executor() -> None:
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+
+
+def _reap_exhausted_jobs() -> None:
+    # Expired leases that can't be claimed again: the final attempt lost its
+    # worker, or the job was cancelled while its worker was gone
+    now = datetime.utcnow()
+    jobs_col = get_jobs_collection()
+
+    for condition, error in (
+        ({"$expr": {"$gte": ["$attempts", "$max_attempts"]}}, "Worker lost during final attempt"),
+        ({"cancel_requested": True}, "Processing cancelled"),
+    ):
+        while True:
+            job = jobs_col.find_one_and_update(
+                {
+                    "state": RUNNING,
+                    "lease_expires_at": {"$lt": now},
+                    **condition,
+                },
+                {
+                    "$set": {
+                        "state": FAILED,
+                        "lease_owner": None,
+                        "error": error,
+                        "updated_at": now,
+                    }
+                },
+            )
+            if job is None:
+                break
+
+            _fail_dataset(job["dataset_id"], error)
+
+
+def _heartbeat_interval() -> float:
+    return min(settings.JOB_LEASE_SECONDS / 3, 10)
+
+
+def _process_context():
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("forkserver")
+        # Children fork from a server that already imported pandas & co.
+        ctx.set_forkserver_preload(["app.services.dataset_service"])
+        return ctx
+
+    return multiprocessing.get_context("spawn")
+
+
+def _terminate(process) -> None:
+    process.terminate()
+    process.join(timeout=5)
+
+    if process.is_alive():
+        process.kill()
+        process.join()
+
+    mark_process_dead(process.pid)
+
+
+def _set_job_status(dataset_id: str, job_status: str) -> Optional[dict]:
+    return get_datasets_collection().find_one_and_update(
+        {"dataset_id": dataset_id},
+        {
+            "$set": {
+                "job_status": job_status,
+                "updated_at": datetime.utcnow(),
+            }
+        },
+        projection={"user_id": 1},
+    )
+
+
+def _fail_dataset(dataset_id: str, error: str) -> None:
+    datasets_col = get_datasets_collection()
+
+    # Don't overwrite the error process_dataset already recorded
+    datasets_col.update_one(
+        {"dataset_id": dataset_id, "status": {"$ne": "FAILED"}},
+        {
+            "$set": {
+                "status": "FAILED",
+                "error": error,
+                # Status subscribers would otherwise keep showing the last stage
+                "stage": None,
+                "updated_at": datetime.utcnow(),
+            }
+        },
+    )
+    datasets_col.update_one(
+        {"dataset_id": dataset_id},
+        {
+            "$set": {
+                "job_status": FAILED,
+                "updated_at": datetime.utcnow(),
+            }
+        },
+    )
@@ -0,0 +1,188 @@
+"""
+Prometheus metrics, scraped from GET /metrics.
+
+Ingest runs in child processes (and the API may run under several gunicorn
+workers), so when METRICS_MULTIPROC_DIR is set every process writes its
+samples there and a scrape merges them. Files left by processes that have
+exited are cleared when the API or a worker starts.
+"""
+import glob
+import os
+from typing import Tuple
+
+from app.core.config import settings
+
+if settings.METRICS_MULTIPROC_DIR:
+    # Must be in the environment before prometheus_client creates any metric,
+    # and is inherited by the ingest forkserver and its children
+    os.makedirs(settings.METRICS_MULTIPROC_DIR, exist_ok=True)
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", str(settings.METRICS_MULTIPROC_DIR))
+
+from prometheus_client import (  # noqa: E402
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily  # noqa: E402
+from pymongo import monitoring  # noqa: E402
+from pymongo.errors import PyMongoError  # noqa: E402
+
+# Pipeline stages run from milliseconds (small CSVs) to minutes (streamed ones)
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+
+INGEST_STAGE_SECONDS = Histogram(
+    "ingest_stage_duration_seconds",
+    "Time spent in each dataset ingest stage",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+
+DASHBOARD_STAGE_SECONDS = Histogram(
+    "dashboard_stage_duration_seconds",
+    "Time spent in each dashboard generation stage",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+
+DATASET_ROWS_PROCESSED = Counter(
+    "dataset_rows_processed",
+    "Rows ingested or appended",
+    ["operation"],
+)
+
+DATASET_BYTES_PROCESSED = Counter(
+    "dataset_bytes_processed",
+    "Bytes of uploaded files ingested or appended",
+    ["operation"],
+)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests",
+    "Cache lookups by cache and result (hit, shared_hit, miss)",
+    ["cache", "result"],
+)
+
+PASSWORD_WORK_REJECTED = Counter(
+    "password_work_rejected",
+    "Password hash/verify calls refused because the password executor was saturated",
+)
+
+MONGO_COMMAND_SECONDS = Histogram(
+    "mongodb_command_duration_seconds",
+    "MongoDB command latency as seen by the driver",
+    ["command", "outcome"],
+)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Times every command sent by the sync and async clients."""
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        MONGO_COMMAND_SECONDS.labels(event.command_name, "success").observe(
+            event.duration_micros / 1_000_000
+        )
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        MONGO_COMMAND_SECONDS.labels(event.command_name, "failure").observe(
+            event.duration_micros / 1_000_000
+        )
+
+
+class JobQueueCollector:
+    """Ingest job counts by state, read from Mongo at scrape time."""
+
+    def describe(self):
+        # Lets the registry learn the name without querying Mongo on register
+        yield self._family()
+
+    def collect(self):
+        # Imported here: the database module registers MongoCommandListener from this one
+        from app.core.database import get_jobs_collection
+
+        gauge = self._family()
+
+        try:
+            counts = get_jobs_collection().aggregate([
+                {"$match": {"state": {"$in": ["QUEUED", "RUNNING"]}}},
+                {"$group": {"_id": "$state", "count": {"$sum": 1}}},
+            ])
+            counts = {doc["_id"]: doc["count"] for doc in counts}
+        except (PyMongoError, RuntimeError):
+            # An unreachable database shouldn't fail the whole scrape
+            return
+
+        for state in ("QUEUED", "RUNNING"):
+            gauge.add_metric([state], counts.get(state, 0))
+
+        yield gauge
+
+    def _family(self) -> GaugeMetricFamily:
+        return GaugeMetricFamily("ingest_jobs", "Ingest jobs by state", labels=["state"])
+
+
+_job_queue_collector = JobQueueCollector()
+
+if not settings.METRICS_MULTIPROC_DIR:
+    REGISTRY.register(_job_queue_collector)
+
+
+def clear_dead_process_metrics() -> None:
+    """
+    Remove the sample files of processes that are no longer running.
+
+    Live processes keep their files mmapped, so the directory can't simply
+    be emptied from a process that has already created metrics.
+    """
+    if not settings.METRICS_MULTIPROC_DIR:
+        return
+
+    for path in glob.glob(os.path.join(settings.METRICS_MULTIPROC_DIR, "*.db")):
+        # <type>_<pid>.db, or <type>_<mode>_<pid>.db for gauges
+        pid = os.path.basename(path)[: -len(".db")].rsplit("_", 1)[-1]
+        if not pid.isdigit() or _process_alive(int(pid)):
+            continue
+
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop the live gauge samples of a reaped child process."""
+    if settings.METRICS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid, str(settings.METRICS_MULTIPROC_DIR))
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, but belongs to another user
+        return True
+    return True
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    if not settings.METRICS_MULTIPROC_DIR:
+        return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(_job_queue_collector)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,295 @@
+"""
+Opt-in profiling of a single dataset operation on production data.
+
+A profiled call records a sampled CPU profile of the calling thread and a
+tracemalloc snapshot, and stores them under the dataset's `profiles/`
+directory. Profiling is requested either per request (X-Profile header plus
+the admin token, see `profiling_requested`) or per dataset (the `profiling`
+flag on its Mongo document, which also covers background ingest jobs).
+"""
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from uuid import uuid4
+
+from pymongo.errors import PyMongoError
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import get_datasets_collection
+from app.core.storage import dataset_prefix, get_storage
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIRNAME = "profiles"
+CPU_PROFILE_FILENAME = "cpu.folded"
+ALLOCATIONS_FILENAME = "allocations.tracemalloc"
+SUMMARY_FILENAME = "summary.json"
+PROFILE_FILES = [SUMMARY_FILENAME, CPU_PROFILE_FILENAME, ALLOCATIONS_FILENAME]
+
+TOP_N = 30
+
+# Set for the duration of a request that asked to be profiled
+profiling_requested: ContextVar[bool] = ContextVar("profiling_requested", default=False)
+
+# Flags are flipped rarely; don't add a Mongo round-trip to every call
+_flag_cache = TTLCache(maxsize=10_000, ttl=30)
+
+# tracemalloc is process-wide, so only one profiled call runs at a time
+_session_lock = threading.Lock()
+
+
+class SamplingProfiler:
+    """
+    Samples one thread's Python stack every `interval` seconds from a
+    background thread. Stacks are kept in folded form ("outer;inner count"),
+    which flamegraph.pl and speedscope read directly.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+
+def profiled(operation: str) -> Callable:
+    """
+    Profile calls of a `(dataset_id, ...)` function when the current
+    request or the dataset asks for it; otherwise call straight through.
+    """
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(dataset_id: str, *args, **kwargs):
+            if not (profiling_requested.get() or dataset_profiling_enabled(dataset_id)):
+                return fn(dataset_id, *args, **kwargs)
+
+            with profile_session(dataset_id, operation):
+                return fn(dataset_id, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def profile_session(dataset_id: str, operation: str):
+    if not _session_lock.acquire(blocking=False):
+        logger.warning("Skipping %s profile for %s: another profile is running", operation, dataset_id)
+        yield
+        return
+
+    profiler = SamplingProfiler(
+        threading.get_ident(),
+        settings.PROFILING_SAMPLE_INTERVAL_MS / 1000,
+    )
+    started_at = datetime.utcnow()
+    start = time.perf_counter()
+    error = None
+
+    tracemalloc.start(settings.PROFILING_TRACEMALLOC_FRAMES)
+    profiler.start()
+
+    try:
+        yield
+    except BaseException as exc:
+        error = repr(exc)
+        raise
+    finally:
+        profiler.stop()
+        duration = time.perf_counter() - start
+
+        try:
+            # Leave out the sampler's own bookkeeping
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, __file__),
+                tracemalloc.Filter(False, tracemalloc.__file__),
+            ])
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            _session_lock.release()
+
+        try:
+            profile_id = _save_profile(
+                dataset_id,
+                operation,
+                profiler,
+                snapshot,
+                summary={
+                    "dataset_id": dataset_id,
+                    "operation": operation,
+                    "started_at": started_at.isoformat(),
+                    "duration_seconds": round(duration, 4),
+                    "peak_traced_mb": round(peak / (1024 * 1024), 2),
+                    "error": error,
+                },
+            )
+            logger.info("Saved %s profile %s for dataset %s", operation, profile_id, dataset_id)
+        except Exception:
+            # A failed write or upload must not turn a successful operation into an error
+            logger.exception("Failed to save %s profile for dataset %s", operation, dataset_id)
+
+
+def dataset_profiling_enabled(dataset_id: str) -> bool:
+    enabled = _flag_cache.get(dataset_id)
+    if enabled is not None:
+        return enabled
+
+    try:
+        doc = get_datasets_collection().find_one({"dataset_id": dataset_id}, {"profiling": 1})
+    except (PyMongoError, RuntimeError):
+        return False
+
+    enabled = bool(doc and doc.get("profiling"))
+    _flag_cache.set(dataset_id, enabled)
+    return enabled
+
+
+def set_dataset_profiling(dataset_id: str, enabled: bool) -> bool:
+    result = get_datasets_collection().update_one(
+        {"dataset_id": dataset_id},
+        {"$set": {"profiling": enabled}},
+    )
+    _flag_cache.invalidate(dataset_id)
+    return result.matched_count > 0
+
+
+def list_profiles(dataset_id: str) -> List[Dict[str, Any]]:
+    # Profiles may have been written on any node; only summaries are needed here
+    profiles_dir = get_storage().fetch_dir(
+        _profiles_prefix(dataset_id),
+        include=lambda name: os.path.basename(name) == SUMMARY_FILENAME,
+    )
+    if not os.path.isdir(profiles_dir):
+        return []
+
+    profiles = []
+    for profile_id in sorted(os.listdir(profiles_dir), reverse=True):
+        summary_path = os.path.join(profiles_dir, profile_id, SUMMARY_FILENAME)
+        if not os.path.exists(summary_path):
+            continue
+
+        with open(summary_path) as f:
+            summary = json.load(f)
+
+        profiles.append({
+            "profile_id": profile_id,
+            "operation": summary["operation"],
+            "started_at": summary["started_at"],
+            "duration_seconds": summary["duration_seconds"],
+            "files": PROFILE_FILES,
+        })
+
+    return profiles
+
+
+def profile_file_path(dataset_id: str, profile_id: str, filename: str) -> Optional[str]:
+    # All three come from the URL; only serve files we wrote
+    if filename not in PROFILE_FILES:
+        return None
+    if any(os.path.basename(name) != name or name in ("", ".", "..") for name in (dataset_id, profile_id)):
+        return None
+
+    try:
+        path = get_storage().fetch(f"{_profiles_prefix(dataset_id)}/{profile_id}/{filename}")
+    except FileNotFoundError:
+        return None
+
+    return path if os.path.exists(path) else None
+
+
+def _save_profile(
+    dataset_id: str,
+    operation: str,
+    profiler: SamplingProfiler,
+    snapshot: tracemalloc.Snapshot,
+    summary: Dict[str, Any]
+) -> str:
+    profile_id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{operation}-{uuid4().hex[:8]}"
+    prefix = f"{_profiles_prefix(dataset_id)}/{profile_id}"
+    storage = get_storage()
+
+    profile_dir = storage.path(prefix)
+    os.makedirs(profile_dir)
+
+    with open(os.path.join(profile_dir, CPU_PROFILE_FILENAME), "w") as f:
+        for stack, count in profiler.samples.most_common():
+            f.write(f"{stack} {count}\n")
+
+    snapshot.dump(os.path.join(profile_dir, ALLOCATIONS_FILENAME))
+
+    summary.update({
+        "sample_interval_ms": settings.PROFILING_SAMPLE_INTERVAL_MS,
+        "samples": sum(profiler.samples.values()),
+        "top_functions": _top_functions(profiler.samples),
+        "top_allocations": [
+            {
+                "location": str(stat.traceback[0]),
+                "size_kb": round(stat.size / 1024, 1),
+                "count": stat.count,
+            }
+            for stat in snapshot.statistics("lineno")[:TOP_N]
+        ],
+    })
+
+    with open(os.path.join(profile_dir, SUMMARY_FILENAME), "w") as f:
+        json.dump(summary, f, indent=2)
+
+    storage.publish_dir(prefix)
+
+    return profile_id
+
+
+def _profiles_prefix(dataset_id: str) -> str:
+    return f"{dataset_prefix(dataset_id)}/{PROFILE_DIRNAME}"
+
+
+def _top_functions(samples: Counter) -> List[Dict[str, Any]]:
+    own: Counter = Counter()
+    total: Counter = Counter()
+
+    for stack, count in samples.items():
+        frames = stack.split(";")
+        own[frames[-1]] += count
+        # A recursive function still counts once per sample
+        for frame in set(frames):
+            total[frame] += count
+
+    return [
+        {"function": frame, "self_samples": count, "total_samples": total[frame]}
+        for frame, count in own.most_common(TOP_N)
+    ]
@@ -1,22 +1,82 @@
+import asyncio
+import hmac
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Optional, Tuple
 
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.metrics import PASSWORD_WORK_REJECTED
 
 pwd_context = CryptContext(
     schemes=["argon2"],
-    deprecated="auto"
+    deprecated="auto",
+    argon2__time_cost=settings.ARGON2_TIME_COST,
+    argon2__memory_cost=settings.ARGON2_MEMORY_COST_KIB,
+    argon2__parallelism=settings.ARGON2_PARALLELISM,
 )
 
+# Argon2 is slow and memory-hungry by design. A login spike on the shared
+# request threadpool would starve every other endpoint, so it gets its own
+# threads and a bounded backlog.
+_password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password",
+)
+_password_slots = threading.BoundedSemaphore(
+    settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_MAX_QUEUE
+)
+
+
+class PasswordWorkRejected(RuntimeError):
+    """The password executor is saturated; the caller should retry later."""
+
+# Recently seen tokens → subject; entries never outlive the token itself
+_token_cache = TTLCache(
+    maxsize=settings.TOKEN_CACHE_SIZE,
+    ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    name="token"
+)
+
+def is_admin_token(token: Optional[str]) -> bool:
+    if not settings.ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode("utf-8"), settings.ADMIN_TOKEN.encode("utf-8"))
+
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+async def hash_password_async(password: str) -> str:
+    return await _run_password_work(pwd_context.hash, password)
+
+async def verify_and_update_password(
+    plain_password: str,
+    hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    (valid, new_hash). new_hash is set when the stored hash was made with
+    other argon2 parameters than the configured ones and should be replaced.
+    """
+    return await _run_password_work(pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def _run_password_work(fn: Callable, *args):
+    if not _password_slots.acquire(blocking=False):
+        PASSWORD_WORK_REJECTED.inc()
+        raise PasswordWorkRejected("Too many concurrent password operations")
+
+    future = _password_executor.submit(fn, *args)
+    # Freed when the work finishes, even if the request awaiting it is gone
+    future.add_done_callback(lambda _: _password_slots.release())
+    return await asyncio.wrap_future(future)
+
 def create_access_token(
     subject: str,
     expires_delta: Optional[timedelta] = None
@@ -40,12 +100,23 @@ def create_access_token(
     )
 
 def decode_access_token(token: str) -> Optional[str]:
+    subject = _token_cache.get(token)
+    if subject is not None:
+        return subject
+
     try:
         payload = jwt.decode(
             token,
             settings.JWT_SECRET_KEY,
             algorithms=[settings.JWT_ALGORITHM]
         )
-        return payload.get("sub")
     except JWTError:
         return None
+
+    subject = payload.get("sub")
+    expires_in = payload.get("exp", 0) - time.time()
+
+    if subject and expires_in > 0:
+        _token_cache.set(token, subject, ttl=expires_in)
+
+    return subject
@@ -0,0 +1,400 @@
+"""
+Artifact storage shared by every API and ingest node.
+
+Uploads, dataset artifacts and dashboard/insight JSON are addressed by keys
+relative to DATA_DIR ("datasets/<id>/schema.json", "dashboards/<id>.json").
+Code keeps reading and writing ordinary files under DATA_DIR; the backend
+decides where those files are published to and brought back from:
+
+- "local": DATA_DIR is the store itself (one node, or a shared volume).
+- "s3": an S3-compatible bucket (AWS, MinIO, ...). DATA_DIR becomes this
+  node's read-through cache of it, revalidated against object ETags at
+  most every STORAGE_CACHE_REVALIDATE_SECONDS.
+"""
+import json
+import os
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterator, NamedTuple, Optional
+from uuid import uuid4
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+READ_CHUNK_BYTES = 1024 * 1024
+
+# Per-object ETags of the S3 cache, kept outside the dataset directories
+VERSIONS_DIRNAME = ".storage-versions"
+
+
+class ObjectInfo(NamedTuple):
+    size: int
+    # Changes whenever the object is rewritten
+    version: str
+
+
+def storage_key(path_or_key: str) -> str:
+    """
+    Key of a file under DATA_DIR. Mongo documents written before storage
+    backends hold absolute paths; newer ones hold the key itself.
+    """
+    if os.path.isabs(path_or_key):
+        path_or_key = os.path.relpath(path_or_key, settings.DATA_DIR)
+
+    return Path(path_or_key).as_posix()
+
+
+def dataset_prefix(dataset_id: str) -> str:
+    return storage_key(os.path.join(settings.DATASET_DIR, dataset_id))
+
+
+def dashboard_key(dashboard_id: str) -> str:
+    return storage_key(os.path.join(settings.DASHBOARD_DIR, f"{dashboard_id}.json"))
+
+
+class LocalStorage:
+    is_local = True
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def path(self, key: str) -> str:
+        return str(self.root / key)
+
+    def fetch(self, key: str) -> str:
+        return self.path(key)
+
+    def fetch_dir(
+        self,
+        prefix: str,
+        include: Optional[Callable[[str], bool]] = None,
+        revalidate: bool = False
+    ) -> str:
+        return self.path(prefix)
+
+    def publish(self, key: str) -> None:
+        pass
+
+    def publish_dir(self, prefix: str) -> None:
+        pass
+
+    def dir_exists(self, prefix: str) -> bool:
+        return os.path.isdir(self.path(prefix))
+
+    def stat(self, key: str) -> Optional[ObjectInfo]:
+        try:
+            stat = os.stat(self.path(key))
+        except FileNotFoundError:
+            return None
+
+        # Artifacts are replaced atomically, so a rewrite always changes the inode
+        return ObjectInfo(stat.st_size, f"{stat.st_ino}-{stat.st_mtime_ns}-{stat.st_size}")
+
+    def iter_range(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        with open(self.path(key), "rb") as f:
+            f.seek(start)
+            remaining = None if end is None else end - start + 1
+
+            while remaining is None or remaining > 0:
+                size = READ_CHUNK_BYTES if remaining is None else min(READ_CHUNK_BYTES, remaining)
+                chunk = f.read(size)
+                if not chunk:
+                    break
+
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+
+class S3Storage:
+    """
+    S3-compatible bucket with a read-through cache in `cache_dir`.
+
+    Writers produce files in the cache directory and publish them; readers
+    fetch a key or a whole dataset directory, which downloads only objects
+    whose ETag differs from the cached copy. Each cached file's ETag is
+    recorded next to its size and mtime, so a file rewritten locally is
+    treated as unpublished rather than current.
+    """
+
+    is_local = False
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str,
+        cache_dir: Path,
+        revalidate_seconds: float,
+        transfer_concurrency: int,
+        client=None
+    ):
+        if client is None:
+            import boto3
+
+            client = boto3.client(
+                "s3",
+                endpoint_url=settings.STORAGE_S3_ENDPOINT_URL,
+                region_name=settings.STORAGE_S3_REGION,
+            )
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.cache_dir = Path(cache_dir)
+        self.transfer_concurrency = transfer_concurrency
+        self._client = client
+        # Keys/prefixes revalidated recently enough to be served from the cache
+        self._fresh = TTLCache(maxsize=100_000, ttl=revalidate_seconds, name="storage")
+        self._locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+        self._locks_lock = threading.Lock()
+
+    def path(self, key: str) -> str:
+        return str(self.cache_dir / key)
+
+    def fetch(self, key: str) -> str:
+        with self._lock(key):
+            if self._fresh.get(key) is None:
+                self._download(key, if_none_match=self._cached_version(key))
+                self._fresh.set(key, True)
+
+        return self.path(key)
+
+    def fetch_dir(
+        self,
+        prefix: str,
+        include: Optional[Callable[[str], bool]] = None,
+        revalidate: bool = False
+    ) -> str:
+        """
+        Bring the cached copy of everything under `prefix` (optionally only
+        names relative to it that pass `include`) up to date with the bucket.
+        """
+        with self._lock(prefix):
+            if revalidate or self._fresh.get(prefix) is None:
+                remote = self._list(prefix)
+                stale = [
+                    key
+                    for key, version in remote.items()
+                    if (include is None or include(key[len(prefix) + 1:]))
+                    and self._cached_version(key) != version
+                ]
+                self._transfer(self._download, stale)
+
+                # Gone from the bucket (e.g. insights dropped after an append)
+                for key in self._cached_keys(prefix):
+                    if key not in remote:
+                        self._forget(key)
+
+                self._fresh.set(prefix, True)
+
+        return self.path(prefix)
+
+    def publish(self, key: str) -> None:
+        path = self.path(key)
+        stat = os.stat(path)
+
+        with open(path, "rb") as f:
+            response = self._client.put_object(Bucket=self.bucket, Key=self._object_key(key), Body=f)
+
+        self._record_version(key, response["ETag"], stat)
+
+    def publish_dir(self, prefix: str) -> None:
+        """Upload the files under `prefix` that changed since they were last published or fetched."""
+        directory = self.path(prefix)
+        changed = []
+
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+
+                key = Path(os.path.relpath(os.path.join(root, name), self.cache_dir)).as_posix()
+                if self._cached_version(key) is None:
+                    changed.append(key)
+
+        self._transfer(self.publish, changed)
+        self._fresh.set(prefix, True)
+
+    def dir_exists(self, prefix: str) -> bool:
+        response = self._client.list_objects_v2(
+            Bucket=self.bucket,
+            Prefix=self._object_key(prefix) + "/",
+            MaxKeys=1,
+        )
+        return response.get("KeyCount", 0) > 0
+
+    def stat(self, key: str) -> Optional[ObjectInfo]:
+        try:
+            response = self._client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except self._client.exceptions.ClientError as exc:
+            if _error_code(exc) in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+        return ObjectInfo(response["ContentLength"], response["ETag"])
+
+    def iter_range(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        request = {"Bucket": self.bucket, "Key": self._object_key(key)}
+        if start or end is not None:
+            # Ranged GET: only the requested bytes leave the bucket
+            request["Range"] = f"bytes={start}-{'' if end is None else end}"
+
+        response = self._client.get_object(**request)
+
+        body = response["Body"]
+        try:
+            yield from body.iter_chunks(READ_CHUNK_BYTES)
+        finally:
+            body.close()
+
+    def delete(self, key: str) -> None:
+        self._client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+        self._forget(key)
+        self._fresh.invalidate(key)
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _lock(self, key: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks[key]
+
+    def _list(self, prefix: str) -> Dict[str, str]:
+        versions = {}
+        strip = len(self.prefix) + 1 if self.prefix else 0
+        paginator = self._client.get_paginator("list_objects_v2")
+
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._object_key(prefix) + "/"):
+            for obj in page.get("Contents", []):
+                versions[obj["Key"][strip:]] = obj["ETag"]
+
+        return versions
+
+    def _download(self, key: str, if_none_match: Optional[str] = None) -> None:
+        request = {"Bucket": self.bucket, "Key": self._object_key(key)}
+        if if_none_match:
+            request["IfNoneMatch"] = if_none_match
+
+        try:
+            response = self._client.get_object(**request)
+        except self._client.exceptions.ClientError as exc:
+            code = _error_code(exc)
+            if code in ("304", "NotModified"):
+                return
+            if code in ("404", "NoSuchKey"):
+                raise FileNotFoundError(key)
+            raise
+
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Concurrent readers (other threads or workers) only ever see whole files
+        tmp_path = f"{path}.{uuid4().hex}.tmp"
+        body = response["Body"]
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in body.iter_chunks(READ_CHUNK_BYTES):
+                    f.write(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        finally:
+            body.close()
+
+        self._record_version(key, response["ETag"], os.stat(path))
+
+    def _transfer(self, fn: Callable[[str], None], keys: list) -> None:
+        if len(keys) <= 1:
+            for key in keys:
+                fn(key)
+            return
+
+        with ThreadPoolExecutor(max_workers=self.transfer_concurrency) as pool:
+            # list() re-raises the first failure
+            list(pool.map(fn, keys))
+
+    def _version_path(self, key: str) -> Path:
+        return self.cache_dir / VERSIONS_DIRNAME / f"{key}.json"
+
+    def _cached_version(self, key: str) -> Optional[str]:
+        try:
+            with open(self._version_path(key)) as f:
+                recorded = json.load(f)
+            stat = os.stat(self.path(key))
+        except (FileNotFoundError, ValueError):
+            return None
+
+        if (stat.st_size, stat.st_mtime_ns) != (recorded["size"], recorded["mtime_ns"]):
+            return None
+
+        return recorded["etag"]
+
+    def _record_version(self, key: str, etag: str, stat: os.stat_result) -> None:
+        path = self._version_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = path.with_name(f"{path.name}.{uuid4().hex}.tmp")
+        tmp_path.write_text(json.dumps({
+            "etag": etag,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }))
+        os.replace(tmp_path, path)
+
+    def _cached_keys(self, prefix: str) -> list:
+        root = self.cache_dir / VERSIONS_DIRNAME
+        keys = []
+
+        for dirpath, _, files in os.walk(root / prefix):
+            for name in files:
+                if name.endswith(".json"):
+                    relative = os.path.relpath(os.path.join(dirpath, name), root)
+                    keys.append(Path(relative).as_posix()[:-len(".json")])
+
+        return keys
+
+    def _forget(self, key: str) -> None:
+        for path in (self.path(key), self._version_path(key)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def _error_code(exc) -> str:
+    return str(exc.response.get("Error", {}).get("Code", ""))
+
+
+_storage = None
+
+
+def get_storage():
+    global _storage
+
+    if _storage is None:
+        if settings.STORAGE_BACKEND == "s3":
+            if not settings.STORAGE_S3_BUCKET:
+                raise RuntimeError("STORAGE_S3_BUCKET is required for the s3 storage backend")
+
+            _storage = S3Storage(
+                bucket=settings.STORAGE_S3_BUCKET,
+                prefix=settings.STORAGE_S3_PREFIX,
+                cache_dir=settings.DATA_DIR,
+                revalidate_seconds=settings.STORAGE_CACHE_REVALIDATE_SECONDS,
+                transfer_concurrency=settings.STORAGE_TRANSFER_CONCURRENCY,
+            )
+        elif settings.STORAGE_BACKEND == "local":
+            _storage = LocalStorage(settings.DATA_DIR)
+        else:
+            raise RuntimeError(f"Unknown STORAGE_BACKEND: {settings.STORAGE_BACKEND}")
+
+    return _storage
@@ -1,15 +1,30 @@
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api import datasets, dashboards, insights
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
 from app.core.logging import setup_logging
-from app.api import users,auth
+from app.api import users,auth,admin
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi import Request
+from pymongo.errors import PyMongoError
+import logging
+import time
 
-from app.core.database import get_users_collection
+from app.core.database import get_users_collection, close_async_database
+from app.core.events import dataset_events
+from app.core.indexes import ensure_indexes
+from app.core.jobs import get_job_executor, shutdown_job_executor
+from app.core.metrics import REQUEST_LATENCY, clear_dead_process_metrics, render_metrics
+from app.core.profiler import profiling_requested
+from app.core.security import PasswordWorkRejected, is_admin_token
+from app.core.storage import get_storage
+from app.services.user_service import close_user_stats
+
+logger = logging.getLogger(__name__)
 
 
 
@@ -20,17 +35,79 @@ app = FastAPI(
     version="1.0.0"
 )
 
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    # Reject oversized uploads before the multipart body is spooled to disk
+    content_length = request.headers.get("content-length")
+    limit = (settings.MAX_UPLOAD_SIZE_MB + 1) * 1024 * 1024  # + multipart overhead
+
+    if content_length and content_length.isdigit() and int(content_length) > limit:
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"File exceeds the {settings.MAX_UPLOAD_SIZE_MB} MB upload limit"},
+        )
+
+    return await call_next(request)
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template, not raw path, to keep cardinality bounded
+        route = request.scope.get("route")
+        REQUEST_LATENCY.labels(
+            request.method,
+            route.path if route is not None else "unmatched",
+            str(status),
+        ).observe(time.perf_counter() - start)
+
+@app.middleware("http")
+async def request_profiling(request: Request, call_next):
+    # Admins can profile one request's dataset work against real data
+    if request.headers.get("x-profile") == "1" and is_admin_token(request.headers.get("x-admin-token")):
+        token = profiling_requested.set(True)
+        try:
+            return await call_next(request)
+        finally:
+            profiling_requested.reset(token)
+
+    return await call_next(request)
+
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     print(exc.errors())
     return JSONResponse(status_code=422, content={"detail": exc.errors()})
 
+@app.exception_handler(PasswordWorkRejected)
+async def password_work_rejected_handler(request: Request, exc: PasswordWorkRejected):
+    # Shed login/registration bursts early instead of queueing them behind argon2
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Too many login attempts in progress, retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["https://insights-frontend-v2n9.onrender.com"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets the frontend follow GET /datasets pages
+    expose_headers=["Link"],
+)
+
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.GZIP_COMPRESS_LEVEL,
+    brotli_quality=settings.BROTLI_QUALITY,
 )
 
 app.include_router(datasets.router)
@@ -38,6 +115,7 @@ app.include_router(dashboards.router)
 app.include_router(insights.router)
 app.include_router(users.router)
 app.include_router(auth.router)
+app.include_router(admin.router)
 
 
 @app.on_event("startup")
@@ -46,6 +124,29 @@ def on_startup():
     settings.DATASET_DIR.mkdir(exist_ok=True)
     settings.DASHBOARD_DIR.mkdir(exist_ok=True)
     setup_logging()
+    clear_dead_process_metrics()
+
+    # Fail fast on a misconfigured storage backend
+    get_storage()
+
+    if settings.MONGODB_ENSURE_INDEXES:
+        try:
+            ensure_indexes()
+        except PyMongoError:
+            # Don't keep the API down over it; queries still work, only slower
+            logger.exception("Failed to ensure MongoDB indexes")
+
+    if settings.INGEST_WORKERS > 0:
+        get_job_executor()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await run_in_threadpool(shutdown_job_executor)
+    # After the executor, which may still count finished ingests
+    await run_in_threadpool(close_user_stats)
+    await dataset_events.close()
+    await close_async_database()
 
 
 @app.get("/health")
@@ -55,6 +156,11 @@ def health_check():
 @app.get("/health/db")
 def db_health():
     users = get_users_collection()
-    users.find_one()
+    users.find_one({}, {"_id": 1})
     return {"db": "connected"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    # The job queue gauge queries Mongo with the sync client
+    payload, content_type = await run_in_threadpool(render_metrics)
+    return Response(content=payload, media_type=content_type)
@@ -1,11 +1,21 @@
+from typing import Optional
 from pydantic import BaseModel
 
 class DatasetResponse(BaseModel):
     dataset_id: str
     filename: str
     status: str
+    job_status: Optional[str] = None
+    stage: Optional[str] = None
 
 class DatasetListResponse(BaseModel):
     dataset_id: str
     filename: str
     status: str
+    job_status: Optional[str] = None
+    stage: Optional[str] = None
+
+class DatasetAppendResponse(BaseModel):
+    dataset_id: str
+    rows_appended: int
+    row_count: int
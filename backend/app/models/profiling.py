@@ -0,0 +1,25 @@
+from datetime import datetime
+from typing import List
+from pydantic import BaseModel
+
+
+class DatasetProfilingRequest(BaseModel):
+    enabled: bool
+
+
+class DatasetProfilingResponse(BaseModel):
+    dataset_id: str
+    profiling: bool
+
+
+class ProfileSummary(BaseModel):
+    profile_id: str
+    operation: str
+    started_at: datetime
+    duration_seconds: float
+    files: List[str]
+
+
+class DatasetProfilesResponse(BaseModel):
+    dataset_id: str
+    profiles: List[ProfileSummary]
@@ -0,0 +1,39 @@
+from typing import Any, List, Literal, Optional
+from pydantic import BaseModel, Field
+
+
+class QueryFilter(BaseModel):
+    column: str
+    op: Literal[
+        "eq", "ne", "lt", "lte", "gt", "gte",
+        "in", "not_in", "contains", "is_null", "not_null"
+    ]
+    value: Any = None
+
+
+class QueryAggregation(BaseModel):
+    func: Literal["count", "sum", "mean", "min", "max", "nunique"]
+    column: Optional[str] = None        # None → row count
+    alias: Optional[str] = None
+
+
+class QuerySort(BaseModel):
+    column: str
+    descending: bool = False
+
+
+class DatasetQueryRequest(BaseModel):
+    filters: List[QueryFilter] = []
+    group_by: List[str] = []
+    aggregations: List[QueryAggregation] = []
+    columns: Optional[List[str]] = None  # row selection when nothing is aggregated
+    sort: List[QuerySort] = []
+    limit: int = Field(default=100, ge=1, le=10_000)
+
+
+class DatasetQueryResponse(BaseModel):
+    dataset_id: str
+    columns: List[str]
+    rows: List[dict]
+    total_rows: int
+    truncated: bool
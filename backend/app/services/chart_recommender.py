@@ -1,5 +1,8 @@
 from typing import Dict, Any, List
 
+# Bump whenever the recommendations change so cached dashboards are rebuilt
+RECOMMENDER_VERSION = 1
+
 def recommend_charts(
     schema: Dict[str, Any],
     profile: Dict[str, Any]
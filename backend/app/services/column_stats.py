@@ -0,0 +1,194 @@
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+
+def analyze_dataset(df: pd.DataFrame) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Compute schema.json and profile.json in one pass over each column."""
+    schema: Dict[str, Any] = {}
+    profile: Dict[str, Any] = {
+        "numeric": {},
+        "categorical": {},
+        "missing": {}
+    }
+
+    row_count = len(df)
+
+    for col in df.columns:
+        stats = _analyze_column(df[col], row_count)
+
+        schema[col] = stats["schema"]
+
+        if stats.get("numeric") is not None:
+            profile["numeric"][col] = stats["numeric"]
+
+        if stats.get("categorical") is not None:
+            profile["categorical"][col] = stats["categorical"]
+
+        if stats["missing_ratio"] > 0:
+            profile["missing"][col] = {
+                "missing_ratio": stats["missing_ratio"]
+            }
+
+    return schema, profile
+
+
+def _analyze_column(series: pd.Series, row_count: int) -> Dict[str, Any]:
+    null_mask = series.isna()
+    null_count = int(null_mask.sum())
+    values = series[~null_mask] if null_count else series
+
+    is_bool = pd.api.types.is_bool_dtype(series)
+    is_numeric = not is_bool and pd.api.types.is_numeric_dtype(series)
+    is_categorical = _is_categorical_dtype(series)
+
+    value_counts = None
+    if is_categorical:
+        # value_counts already hashes every value, so nunique comes for free
+        value_counts = values.value_counts()
+        unique_count = len(value_counts)
+    else:
+        unique_count = int(values.nunique())
+
+    unique_ratio = unique_count / max(row_count, 1)
+
+    result: Dict[str, Any] = {
+        "schema": {
+            "type": _infer_type(series, values, is_bool, unique_ratio),
+            "nullable": null_count > 0,
+            "cardinality": "high" if unique_ratio > 0.5 else "low"
+        },
+        "missing_ratio": null_count / row_count if row_count else 0.0
+    }
+
+    if result["schema"]["type"] == "datetime" and is_categorical:
+        result["schema"]["format"] = detect_datetime_format(values)
+
+    if is_numeric and len(values):
+        result["numeric"] = _numeric_stats(values)
+
+    if value_counts is not None and len(values):
+        result["categorical"] = {
+            "unique_count": unique_count,
+            "top_values": value_counts.head(5).to_dict()
+        }
+
+    return result
+
+
+def _is_categorical_dtype(series: pd.Series) -> bool:
+    dtype = series.dtype
+    return (
+        pd.api.types.is_object_dtype(dtype)
+        or isinstance(dtype, (pd.CategoricalDtype, pd.StringDtype))
+    )
+
+
+def _infer_type(
+    series: pd.Series,
+    values: pd.Series,
+    is_bool: bool,
+    unique_ratio: float
+) -> str:
+    if is_bool:
+        return "boolean"
+
+    if pd.api.types.is_numeric_dtype(series):
+        return "numeric"
+
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "datetime"
+
+    return infer_column_type(values, unique_ratio)
+
+
+def infer_column_type(values: pd.Series, unique_ratio: float) -> str:
+    """Type of a non-numeric column from its non-null values and unique ratio."""
+    # Try datetime coercion
+    try:
+        parsed = pd.to_datetime(values.head(20), errors="coerce")
+
+        if parsed.notna().sum() >= 5:
+            return "datetime"
+    except Exception:
+        pass
+
+    if unique_ratio < 0.2:
+        return "categorical"
+
+    return "text"
+
+
+def detect_datetime_format(values: pd.Series) -> Optional[str]:
+    """
+    strftime format of a text datetime column, judged on its first values.
+    Only returned when parsing and re-formatting gives back the same text,
+    so typed loads can render the values exactly as uploaded.
+    """
+    sample = values.head(20).astype(str)
+    if sample.empty:
+        return None
+
+    fmt = guess_datetime_format(sample.iloc[0])
+    if fmt is None:
+        return None
+
+    try:
+        parsed = pd.to_datetime(sample, format=fmt)
+    except (ValueError, TypeError):
+        return None
+
+    if not parsed.dt.strftime(fmt).equals(sample):
+        return None
+
+    return fmt
+
+
+def _numeric_stats(values: pd.Series) -> Dict[str, Any]:
+    arr = values.to_numpy(dtype="float64")
+    count = len(arr)
+
+    mean = float(arr.mean())
+    std = float(arr.std(ddof=1)) if count > 1 else float("nan")
+    q1, q3 = np.quantile(arr, [0.25, 0.75])
+
+    return {
+        "mean": mean,
+        "min": float(arr.min()),
+        "max": float(arr.max()),
+        "std": std,
+        "trend": _detect_trend(arr),
+        "outliers": _detect_outliers(values, arr, q1, q3)
+    }
+
+
+def _detect_trend(arr: np.ndarray) -> str:
+    if len(arr) < 3:
+        return "flat"
+
+    half = len(arr) // 2
+    first_half = arr[:half].mean()
+    second_half = arr[half:].mean()
+
+    if second_half > first_half * 1.05:
+        return "up"
+    elif second_half < first_half * 0.95:
+        return "down"
+    return "flat"
+
+
+def _detect_outliers(
+    values: pd.Series,
+    arr: np.ndarray,
+    q1: float,
+    q3: float
+) -> list:
+    iqr = q3 - q1
+
+    lower = q1 - 1.5 * iqr
+    upper = q3 + 1.5 * iqr
+
+    outliers = values[(arr < lower) | (arr > upper)]
+    return outliers.head(5).tolist()
@@ -0,0 +1,153 @@
+import glob
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.core.config import settings
+from app.services.load_plan import apply_load_plan, build_load_plan, dictionary_columns
+
+COLUMNAR_FILENAME = "data.parquet"
+# Appended rows live in numbered part files next to the base file
+PART_PATTERN = "data.part-{:05d}.parquet"
+
+
+def columnar_path(dataset_dir: str) -> str:
+    return os.path.join(dataset_dir, COLUMNAR_FILENAME)
+
+
+def columnar_paths(dataset_dir: str) -> List[str]:
+    base = columnar_path(dataset_dir)
+    if not os.path.exists(base):
+        return []
+
+    parts = sorted(glob.glob(os.path.join(dataset_dir, "data.part-*.parquet")))
+    return [base, *parts]
+
+
+def has_columnar(dataset_dir: str) -> bool:
+    return os.path.exists(columnar_path(dataset_dir))
+
+
+def save_columnar(dataset_dir: str, df: pd.DataFrame) -> str:
+    path = columnar_path(dataset_dir)
+    tmp_path = f"{path}.tmp"
+
+    table = _to_arrow(df)
+    pq.write_table(
+        table,
+        tmp_path,
+        compression=settings.COLUMNAR_COMPRESSION,
+    )
+
+    # Atomic swap so readers never see a half-written file
+    os.replace(tmp_path, path)
+    return path
+
+
+def save_columnar_chunks(
+    dataset_dir: str,
+    chunks: Iterable[pd.DataFrame],
+    empty: pd.DataFrame
+) -> str:
+    path = columnar_path(dataset_dir)
+    tmp_path = f"{path}.tmp"
+    writer = None
+
+    try:
+        for chunk in chunks:
+            table = _to_arrow(chunk)
+
+            if writer is None:
+                writer = pq.ParquetWriter(
+                    tmp_path,
+                    table.schema,
+                    compression=settings.COLUMNAR_COMPRESSION,
+                )
+            else:
+                table = table.cast(writer.schema)
+
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        return save_columnar(dataset_dir, empty)
+
+    os.replace(tmp_path, path)
+    return path
+
+
+def append_columnar(dataset_dir: str, df: pd.DataFrame) -> str:
+    """
+    Store appended rows as a new part, typed like the base file. Raises
+    pa.ArrowInvalid when the rows can't be represented with those types.
+    """
+    paths = columnar_paths(dataset_dir)
+    if not paths:
+        raise FileNotFoundError(columnar_path(dataset_dir))
+
+    schema = pq.read_schema(paths[0])
+    table = _to_arrow(df[schema.names]).cast(schema)
+
+    path = os.path.join(dataset_dir, PART_PATTERN.format(len(paths)))
+    tmp_path = f"{path}.tmp"
+
+    pq.write_table(
+        table,
+        tmp_path,
+        compression=settings.COLUMNAR_COMPRESSION,
+    )
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_columnar(
+    dataset_dir: str,
+    columns: Optional[Iterable[str]] = None,
+    schema: Optional[Dict[str, Any]] = None
+) -> pd.DataFrame:
+    """
+    Read the columnar copy (all parts). With the dataset's schema, columns
+    come back compactly typed; see load_plan.
+    """
+    paths = columnar_paths(dataset_dir)
+
+    if not paths:
+        return pd.DataFrame()
+
+    available = pq.read_schema(paths[0]).names
+
+    if columns is not None:
+        columns = [col for col in dict.fromkeys(columns) if col in set(available)]
+
+        if not columns:
+            return pd.DataFrame()
+
+    plan = build_load_plan(schema) if schema else {}
+    read_dictionary = dictionary_columns(plan, columns if columns is not None else available)
+
+    tables = [
+        pq.read_table(path, columns=columns, read_dictionary=read_dictionary or None)
+        for path in paths
+    ]
+    table = tables[0] if len(tables) == 1 else pa.concat_tables(tables)
+
+    return apply_load_plan(table.to_pandas(), plan)
+
+
+def _to_arrow(df: pd.DataFrame) -> pa.Table:
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+
+    # Mixed-type object columns can't be typed by Arrow → store them as strings
+    df = df.copy()
+    for col in df.select_dtypes(include=["object"]).columns:
+        df[col] = df[col].map(lambda v: v if pd.isna(v) else str(v))
+
+    return pa.Table.from_pandas(df, preserve_index=False)
@@ -1,20 +1,109 @@
 import os
 import json
+import hashlib
 from uuid import uuid4
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 from app.core.config import settings
-from app.services.kpi_engine import generate_kpis
-from app.services.chart_recommender import recommend_charts
-
-from app.core.cache import cached
+from app.services.kpi_engine import KPI_VERSION, generate_kpis
+from app.services.chart_recommender import RECOMMENDER_VERSION, recommend_charts
+from app.services.columnar_store import load_columnar, has_columnar
+from app.services.dataset_service import backfill_columnar, dataset_fingerprint, local_dataset_dir
+from app.services.downsampling import (
+    downsample_line,
+    downsample_scatter,
+    lttb_indices,
+    top_n_from_totals,
+    top_n_with_other,
+)
+from app.services.load_plan import datetime_formats, format_datetimes
+from app.services.rollups import DATETIME_FREQUENCIES, load_rollup
+
+from app.core.files import store_artifact
+from app.models.dashboard import DashboardResponse
+from app.core.cache import ByteLRUCache, DiskCacheTier, MongoCacheTier, TieredCache
+from app.core.metrics import DASHBOARD_STAGE_SECONDS
+from app.core.profiler import profiled
+from app.core.storage import dashboard_key, get_storage, storage_key
 from datetime import datetime
-from app.core.database import get_dashboards_collection, get_datasets_collection
+from app.core.database import (
+    get_dashboard_cache_collection,
+    get_dashboards_collection,
+    get_datasets_collection,
+)
 from app.services.user_service import increment_user_stat
 
+import numpy as np
 import pandas as pd
 
-def _build_chart_data(df, x: str, y: str, aggregation: str | None):
+# Bump whenever the widget layout or chart data changes so cached dashboards are rebuilt
+DASHBOARD_VERSION = 3
+
+
+def _build_dashboard_cache() -> TieredCache:
+    ttl = settings.DASHBOARD_CACHE_TTL_SECONDS
+    local = ByteLRUCache(settings.DASHBOARD_CACHE_MAX_MB * 1024 * 1024, ttl)
+
+    shared = None
+    if settings.DASHBOARD_CACHE_SHARED_TIER == "disk":
+        shared = DiskCacheTier(
+            settings.DASHBOARD_CACHE_DIR,
+            ttl,
+            max_bytes=settings.DASHBOARD_CACHE_DISK_MAX_MB * 1024 * 1024,
+            sweep_interval=settings.DASHBOARD_CACHE_SWEEP_SECONDS,
+        )
+    elif settings.DASHBOARD_CACHE_SHARED_TIER == "mongo":
+        shared = MongoCacheTier(get_dashboard_cache_collection, ttl)
+
+    return TieredCache(local, shared, name="dashboard")
+
+
+_dashboard_cache = _build_dashboard_cache()
+
+
+def dashboard_cache_key(dataset_dir: str) -> Optional[str]:
+    # Keyed on content, so re-uploads of the same file share an entry and
+    # changed data or a new recommender/KPI version never hits a stale one
+    fingerprint = dataset_fingerprint(dataset_dir)
+    if fingerprint is None:
+        return None
+
+    return _cache_key(fingerprint)
+
+
+def invalidate_dashboard_cache(dataset_id: str, fingerprint: Optional[str] = None) -> None:
+    if fingerprint is None:
+        fingerprint = dataset_fingerprint(local_dataset_dir(dataset_id))
+
+    if fingerprint is not None:
+        _dashboard_cache.invalidate(_cache_key(fingerprint))
+
+
+def invalidate_dashboards(dataset_id: str, fingerprint: Optional[str] = None) -> None:
+    """Forget cached and saved dashboards of a dataset whose data changed."""
+    invalidate_dashboard_cache(dataset_id, fingerprint)
+
+    dashboards_col = get_dashboards_collection()
+    storage = get_storage()
+    for meta in dashboards_col.find({"dataset_id": dataset_id}, {"path": 1}):
+        if meta.get("path"):
+            storage.delete(storage_key(meta["path"]))
+
+    dashboards_col.delete_many({"dataset_id": dataset_id})
+
+
+def _cache_key(fingerprint: str) -> str:
+    key = f"{fingerprint}:{RECOMMENDER_VERSION}:{KPI_VERSION}:{DASHBOARD_VERSION}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+def _build_chart_data(
+    df,
+    chart_type: str,
+    x: str,
+    y: str,
+    aggregation: str | None,
+    formats: Optional[Dict[str, str]] = None
+):
     if df.empty or x not in df.columns or y not in df.columns:
         return []
 
@@ -23,96 +112,185 @@ def _build_chart_data(df, x: str, y: str, aggregation: str | None):
     if clean_df.empty:
         return []
 
-    # Scatter charts → raw data
-    if aggregation is None:
-        return clean_df.head(200).to_dict(orient="records")
+    budget = settings.CHART_POINT_BUDGET
+
+    if aggregation in ("mean", "sum"):
+        return top_n_with_other(
+            clean_df, x, y, aggregation, settings.CHART_MAX_CATEGORIES
+        )
+
+    if chart_type == "line":
+        points = downsample_line(clean_df, x, y, budget)
+    else:
+        # Scatter charts → sample spread over the whole file
+        points = downsample_scatter(clean_df, budget)
+
+    # Parsed datetimes go out as the text that was uploaded
+    return format_datetimes(points, formats or {}).to_dict(orient="records")
+
+def _build_charts_data(
+    df,
+    charts: List[Dict[str, Any]],
+    formats: Optional[Dict[str, str]] = None
+) -> List[list]:
+    """
+    Chart data for every chart at once. Aggregated charts are planned per x
+    column: the column is factorized once and every y it is paired with is
+    summed and counted in the same pass, then split back per chart.
+    """
+    aggregated: Dict[str, List[str]] = {}
+    for chart in charts:
+        x, y = chart["x"], chart["y"]
+        if (
+            chart.get("aggregation") in ("mean", "sum")
+            and x in df.columns
+            and y in df.columns
+        ):
+            aggregated.setdefault(x, [])
+            if y not in aggregated[x]:
+                aggregated[x].append(y)
+
+    totals = {
+        (x, y): grouped
+        for x, ys in aggregated.items()
+        for y, grouped in _grouped_totals(df[x], df[ys]).items()
+    }
 
-    if aggregation == "mean":
-        return (
-            clean_df.groupby(x, as_index=False)[y]
-            .mean()
-            .to_dict(orient="records")
+    results = []
+    for chart in charts:
+        x, y = chart["x"], chart["y"]
+        aggregation = chart.get("aggregation")
+
+        if (x, y) in totals and aggregation in ("mean", "sum"):
+            results.append(top_n_from_totals(
+                totals[(x, y)], x, y, aggregation, settings.CHART_MAX_CATEGORIES
+            ))
+        else:
+            results.append(
+                _build_chart_data(df, chart["chart_type"], x, y, aggregation, formats)
+            )
+
+    return results
+
+def _grouped_totals(keys: pd.Series, values: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    # Sorted codes keep the category order groupby would produce
+    codes, categories = pd.factorize(keys, sort=True)
+    size = len(categories)
+    has_key = codes >= 0
+
+    totals = {}
+    for y in values.columns:
+        column = values[y]
+        mask = has_key & column.notna().to_numpy()
+        group_codes = codes[mask]
+
+        sums = np.bincount(
+            group_codes,
+            weights=column.to_numpy(dtype=np.float64, na_value=np.nan)[mask],
+            minlength=size,
+        )
+        if column.dtype.kind in "iub":
+            sums = sums.round().astype(np.int64)
+
+        totals[y] = pd.DataFrame(
+            {
+                "sum": sums,
+                "count": np.bincount(group_codes, minlength=size),
+            },
+            index=categories,
         )
 
-    if aggregation == "sum":
-        return (
-            clean_df.groupby(x, as_index=False)[y]
-            .sum()
-            .to_dict(orient="records")
+    return totals
+
+def _rollup_chart_data(dataset_dir: str, chart: Dict[str, Any]):
+    # Answer from the ingest-time rollups when possible; None → use raw rows
+    x, y = chart["x"], chart["y"]
+    aggregation = chart.get("aggregation")
+
+    if chart["chart_type"] == "bar" and aggregation in ("mean", "sum"):
+        totals = load_rollup(dataset_dir, "categorical", x, y)
+        if totals is None:
+            return None
+
+        return top_n_from_totals(
+            totals, x, y, aggregation, settings.CHART_MAX_CATEGORIES
         )
 
-    return clean_df.head(200).to_dict(orient="records")
+    if chart["chart_type"] == "line":
+        return _line_from_rollups(dataset_dir, x, y)
+
+    return None
+
+def _line_from_rollups(dataset_dir: str, x: str, y: str):
+    budget = settings.CHART_POINT_BUDGET
+    totals = None
+
+    # Finest bucket size that fits the point budget
+    for freq in DATETIME_FREQUENCIES:
+        totals = load_rollup(dataset_dir, "datetime", x, y, freq)
+        if totals is None:
+            return None
 
-def _load_dataframe(dataset_dir: str) -> pd.DataFrame:
-    for file in os.listdir(dataset_dir):
-        if file.endswith(".csv"):
-            return pd.read_csv(os.path.join(dataset_dir, file))
-    return pd.DataFrame()
+        totals = totals[totals["count"] > 0].sort_index()
+
+        if freq == "day" and totals["count"].sum() <= budget:
+            # Few enough rows to plot every point
+            return None
+
+        if len(totals) <= budget:
+            break
+
+    means = totals["sum"] / totals["count"]
+
+    if len(means) > budget:
+        keys = means.index.to_numpy(dtype="datetime64[ns]").astype("int64")
+        means = means.iloc[lttb_indices(keys, means.to_numpy(), budget)]
+
+    return [
+        {x: bucket.strftime("%Y-%m-%d"), y: value}
+        for bucket, value in zip(means.index, means.tolist())
+    ]
 
+def _load_dataframe(dataset_dir: str, columns: List[str], schema: Dict[str, Any]) -> pd.DataFrame:
+    if not columns:
+        return pd.DataFrame()
 
-@cached
+    if not has_columnar(dataset_dir) and not backfill_columnar(dataset_dir):
+        return pd.DataFrame()
+
+    return load_columnar(dataset_dir, columns, schema)
+
+
+@profiled("dashboard")
 def generate_dashboard(dataset_id: str) -> Dict[str, Any]:
-    dataset_dir = os.path.join(settings.DATASET_DIR, dataset_id)
+    dataset_dir = local_dataset_dir(dataset_id)
 
-    schema = _load_json(dataset_dir, "schema.json")
-    profile = _load_json(dataset_dir, "profile.json")
+    key = dashboard_cache_key(dataset_dir)
+    content = _dashboard_cache.get(key) if key is not None else None
+
+    if content is None:
+        content = _build_dashboard_content(dataset_dir)
+
+        if key is not None:
+            _dashboard_cache.set(key, content)
 
     dashboard = {
         "dashboard_id": str(uuid4()),
         "dataset_id": dataset_id,
-        "title": "Auto Generated Dashboard",
-        "widgets": []
+        **content
     }
 
-    # KPIs
-    dashboard["widgets"].extend([
-        {
-            "widget_id": str(uuid4()),
-            "type": "kpi",
-            **kpi
-        }
-        for kpi in generate_kpis(profile)
-    ])
-
-    # Charts
-    df = _load_dataframe(dataset_dir)
-    charts = recommend_charts(schema, profile)
+    # 📄 Write dashboard JSON to artifact storage
+    key = dashboard_key(dashboard["dashboard_id"])
 
-    dashboard["widgets"].extend([
-        {
-            "widget_id": str(uuid4()),
-            "type": "chart",
-            "chart_type": chart["chart_type"],
-            "x": chart["x"],
-            "y": chart["y"],
-            "aggregation": chart.get("aggregation"),
-            "data": _build_chart_data(
-                df,
-                chart["x"],
-                chart["y"],
-                chart.get("aggregation")
-            ) or []
-        }
-        for chart in charts
-    ])
-
-    # 🔒 Ensure dashboards directory exists
-    os.makedirs(settings.DASHBOARD_DIR, exist_ok=True)
-
-    # 📄 Write dashboard JSON to disk
-    dashboard_path = os.path.join(
-        settings.DASHBOARD_DIR,
-        f"{dashboard['dashboard_id']}.json"
-    )
-
-    with open(dashboard_path, "w", encoding="utf-8") as f:
-        json.dump(dashboard, f, indent=2, default=str)
+    with DASHBOARD_STAGE_SECONDS.labels("serialization").time():
+        store_artifact(key, DashboardResponse, dashboard)
 
     # 🗄️ Persist metadata to MongoDB
     dashboards_col = get_dashboards_collection()
     datasets_col = get_datasets_collection()
 
-    dataset_doc = datasets_col.find_one({"dataset_id": dataset_id})
+    dataset_doc = datasets_col.find_one({"dataset_id": dataset_id}, {"user_id": 1})
 
     if dataset_doc:
         dashboards_col.update_one(
@@ -126,7 +304,7 @@ def generate_dashboard(dataset_id: str) -> Dict[str, Any]:
                     "dataset_id": dataset_id,
                     "user_id": dataset_doc["user_id"],
                     "created_at": datetime.utcnow(),
-                    "path": dashboard_path
+                    "path": key
                 }
             },
             upsert=True
@@ -135,6 +313,65 @@ def generate_dashboard(dataset_id: str) -> Dict[str, Any]:
         increment_user_stat(dataset_doc["user_id"], "dashboards_created")
     return dashboard
 
+def _build_dashboard_content(dataset_dir: str) -> Dict[str, Any]:
+    with DASHBOARD_STAGE_SECONDS.labels("artifact_load").time():
+        schema = _load_json(dataset_dir, "schema.json")
+        profile = _load_json(dataset_dir, "profile.json")
+
+    content = {
+        "title": "Auto Generated Dashboard",
+        "widgets": []
+    }
+
+    # KPIs
+    content["widgets"].extend([
+        {
+            "widget_id": str(uuid4()),
+            "type": "kpi",
+            **kpi
+        }
+        for kpi in generate_kpis(profile)
+    ])
+
+    # Charts
+    charts = recommend_charts(schema, profile)
+
+    with DASHBOARD_STAGE_SECONDS.labels("rollup_charts").time():
+        rollup_data = [_rollup_chart_data(dataset_dir, chart) for chart in charts]
+
+    # Only charts the rollups can't answer need row-level data
+    with DASHBOARD_STAGE_SECONDS.labels("dataframe_load").time():
+        df = _load_dataframe(
+            dataset_dir,
+            [
+                col
+                for chart, data in zip(charts, rollup_data)
+                if data is None
+                for col in (chart["x"], chart["y"])
+            ],
+            schema
+        )
+
+    pending = [chart for chart, data in zip(charts, rollup_data) if data is None]
+
+    with DASHBOARD_STAGE_SECONDS.labels("chart_build").time():
+        raw_data = iter(_build_charts_data(df, pending, datetime_formats(schema)))
+
+    content["widgets"].extend([
+        {
+            "widget_id": str(uuid4()),
+            "type": "chart",
+            "chart_type": chart["chart_type"],
+            "x": chart["x"],
+            "y": chart["y"],
+            "aggregation": chart.get("aggregation"),
+            "data": (data if data is not None else next(raw_data)) or []
+        }
+        for chart, data in zip(charts, rollup_data)
+    ])
+
+    return content
+
 def _load_json(dataset_dir: str, filename: str) -> Dict[str, Any]:
     path = os.path.join(dataset_dir, filename)
     if not os.path.exists(path):
@@ -1,64 +1,162 @@
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import fnmatch
+import glob
+import hashlib
+import logging
 import os
 import json
+import shutil
+import tempfile
 from datetime import datetime
+from typing import Optional
 
 from app.core.config import settings
-from app.services.schema_inference import infer_schema
-from app.services.profiling import profile_dataset
+from app.core.metrics import DATASET_BYTES_PROCESSED, DATASET_ROWS_PROCESSED, INGEST_STAGE_SECONDS
+from app.core.profiler import profiled
+from app.core.storage import dataset_prefix, get_storage, storage_key
+from app.services.column_stats import analyze_dataset
+from app.services.columnar_store import (
+    COLUMNAR_FILENAME,
+    PART_PATTERN,
+    append_columnar,
+    save_columnar,
+)
+from app.services.profile_state import (
+    SKETCH_STATE_FILENAME,
+    build_profile,
+    build_schema,
+    load_sketch_state,
+    outlier_fences,
+    save_sketch_state,
+    scan_sketch_state,
+)
+from app.services.rollups import ROLLUP_DIRNAME, RollupBuilder, build_rollups, parse_datetimes
+from app.services.schema_inference import normalize_columns
+from app.services.streaming_ingest import should_stream, stream_dataset
 
 # 🔹 MongoDB collections
-from app.core.database import (
-    get_datasets_collection,
-    get_users_collection,
-)
+from app.core.database import get_datasets_collection
+
+logger = logging.getLogger(__name__)
+
+# Files derived purely from the upload's content; identical uploads share them
+ARTIFACT_FILES = ["schema.json", "profile.json", COLUMNAR_FILENAME]
+OPTIONAL_ARTIFACT_FILES = [SKETCH_STATE_FILENAME]
+
+# What readers need of a dataset; the raw upload and appended files stay in storage
+READ_FILES = ARTIFACT_FILES + OPTIONAL_ARTIFACT_FILES + ["metadata.json", "insights.json"]
+READ_PATTERNS = [PART_PATTERN.replace("{:05d}", "*"), f"{ROLLUP_DIRNAME}/*"]
+
+# Rewritten by an append; put back together if any step of it fails
+APPEND_OUTPUTS = [SKETCH_STATE_FILENAME, "schema.json", "profile.json", "metadata.json", ROLLUP_DIRNAME]
 
 
-def process_dataset(dataset_id: str, file_path: str) -> None:
-    dataset_dir = os.path.join(settings.DATASET_DIR, dataset_id)
+class AppendError(ValueError):
+    pass
+
+
+@profiled("ingest")
+def process_dataset(
+    dataset_id: str,
+    file_path: str,
+    final_attempt: bool = True
+) -> None:
+    storage = get_storage()
+    dataset_dir = storage.path(dataset_prefix(dataset_id))
+    os.makedirs(dataset_dir, exist_ok=True)
 
     datasets_col = get_datasets_collection()
-    users_col = get_users_collection()
 
     try:
-        df = _load_dataset(file_path)
-        df.columns = _normalize_columns(df.columns)
+        # The upload may have been received by another node
+        file_path = storage.fetch(storage_key(file_path))
+        file_size = os.path.getsize(file_path)
 
-        schema = infer_schema(df)
-        profile = profile_dataset(df)
+        if should_stream(file_path, file_size):
+            # Large CSVs are profiled chunk by chunk to keep memory bounded
+            _set_stage(datasets_col, dataset_id, "stream")
+            schema, profile = stream_dataset(file_path, dataset_dir)
+        else:
+            _set_stage(datasets_col, dataset_id, "load")
+            with INGEST_STAGE_SECONDS.labels("load").time():
+                df = _load_dataset(file_path)
+                df.columns = normalize_columns(df.columns)
 
-        _save_json(dataset_dir, "schema.json", schema)
-        _save_json(dataset_dir, "profile.json", profile)
+            # Schema and profile come out of the same pass over each column
+            _set_stage(datasets_col, dataset_id, "analyze")
+            with INGEST_STAGE_SECONDS.labels("analyze").time():
+                schema, profile = analyze_dataset(df)
+
+            _set_stage(datasets_col, dataset_id, "columnar_write")
+            with INGEST_STAGE_SECONDS.labels("columnar_write").time():
+                save_columnar(dataset_dir, df)
 
-        # ✅ UPDATE DATASET STATUS → READY (MongoDB)
-        dataset_doc = datasets_col.find_one_and_update(
+            _set_stage(datasets_col, dataset_id, "rollups")
+            with INGEST_STAGE_SECONDS.labels("rollups").time():
+                build_rollups(dataset_dir, df, schema)
+
+            DATASET_ROWS_PROCESSED.labels("ingest").inc(len(df))
+
+        _set_stage(datasets_col, dataset_id, "artifact_write")
+        with INGEST_STAGE_SECONDS.labels("artifact_write").time():
+            _save_json(dataset_dir, "schema.json", schema)
+            _save_json(dataset_dir, "profile.json", profile)
+
+        # The upload route hashes while receiving the file
+        dataset_doc = datasets_col.find_one(
             {"dataset_id": dataset_id},
-            {
-                "$set": {
-                    "status": "READY",
-                    "updated_at": datetime.utcnow(),
-                }
-            },
-            return_document=True,
+            {"content_hash": 1},
+        )
+        content_hash = (
+            (dataset_doc or {}).get("content_hash")
+            or file_sha256(file_path)
+        )
+
+        _update_metadata(
+            dataset_dir,
+            dataset_id,
+            file_path,
+            status="READY",
+            content_hash=content_hash,
         )
 
-        # ✅ INCREMENT USER STATS (only on success)
-        if dataset_doc:
-            users_col.update_one(
-                {"_id": dataset_doc["user_id"]},
-                {"$inc": {"stats.datasets_uploaded": 1}},
+        # Any node may serve the dataset once it is READY
+        _set_stage(datasets_col, dataset_id, "publish")
+        with INGEST_STAGE_SECONDS.labels("publish").time():
+            storage.publish_dir(dataset_prefix(dataset_id))
+
+        with INGEST_STAGE_SECONDS.labels("mongo_update").time():
+            # ✅ UPDATE DATASET STATUS → READY (MongoDB)
+            # (the user's datasets_uploaded stat is counted by the job
+            # supervisor once this process exits cleanly)
+            datasets_col.update_one(
+                {"dataset_id": dataset_id},
+                {
+                    "$set": {
+                        "status": "READY",
+                        "stage": None,
+                        "content_hash": content_hash,
+                        "updated_at": datetime.utcnow(),
+                    }
+                },
             )
 
-        # (Optional) keep metadata.json for debugging
-        _update_metadata(dataset_dir, dataset_id, file_path, status="READY")
+        DATASET_BYTES_PROCESSED.labels("ingest").inc(file_size)
 
     except Exception as exc:
+        # The job queue will retry; keep the dataset in PROCESSING meanwhile
+        if not final_attempt:
+            raise exc
+
         # ❌ UPDATE DATASET STATUS → FAILED (MongoDB)
         datasets_col.update_one(
             {"dataset_id": dataset_id},
             {
                 "$set": {
                     "status": "FAILED",
+                    "stage": None,
                     "updated_at": datetime.utcnow(),
                     "error": str(exc),
                 }
@@ -68,6 +166,320 @@ def process_dataset(dataset_id: str, file_path: str) -> None:
         _update_metadata(dataset_dir, dataset_id, file_path, status="FAILED")
         raise exc
 
+@profiled("append")
+def append_dataset(dataset_id: str, file_path: str, delta_hash: str) -> dict:
+    """
+    Add the rows of `file_path` to a READY dataset.
+
+    Schema and profile are updated from the persisted sketch state and the
+    rollups are extended with the new rows only; historical rows are read
+    once, on the first append, for datasets ingested without sketch state.
+    Outliers are kept while they stay outside the updated fences and topped
+    up from the new rows, so they can differ from a full reprocess. An
+    append that fails part way leaves the dataset as it was.
+    """
+    # Start from the latest published state, whichever node wrote it
+    dataset_dir = local_dataset_dir(dataset_id, revalidate=True)
+
+    schema = _load_json(dataset_dir, "schema.json")
+    profile = _load_json(dataset_dir, "profile.json")
+
+    try:
+        delta = _load_dataset(file_path)
+    except (ValueError, pd.errors.ParserError, UnicodeDecodeError) as exc:
+        raise AppendError(f"Could not read the file: {exc}")
+
+    delta.columns = normalize_columns(delta.columns)
+    _validate_delta(delta, schema)
+
+    state = load_sketch_state(dataset_dir) or scan_sketch_state(dataset_dir)
+    accumulators, row_count = state
+
+    try:
+        part_path = append_columnar(dataset_dir, delta)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, ValueError) as exc:
+        raise AppendError(f"Rows don't match the dataset's column types: {exc}")
+
+    backup_dir = _backup_append_outputs(dataset_dir)
+    try:
+        # Profile the rows exactly as they were stored
+        delta = pq.read_table(part_path).to_pandas()
+
+        for col, acc in accumulators.items():
+            acc.update(delta[col])
+        row_count += len(delta)
+
+        rollups = RollupBuilder.load(dataset_dir, schema)
+        if rollups is not None:
+            rollups.update(delta)
+
+        # Column types stay fixed; only nullability and cardinality can move
+        for col, meta in build_schema(accumulators, row_count).items():
+            schema[col]["nullable"] = meta["nullable"]
+            schema[col]["cardinality"] = meta["cardinality"]
+
+        outliers = {}
+        for col, (lower, upper) in outlier_fences(accumulators).items():
+            previous = profile.get("numeric", {}).get(col, {}).get("outliers", [])
+            kept = [value for value in previous if value < lower or value > upper]
+
+            values = delta[col].dropna()
+            hits = values[(values < lower) | (values > upper)]
+            outliers[col] = (kept + hits.tolist())[:5]
+
+        profile = build_profile(accumulators, row_count, outliers)
+
+        # New content → new fingerprint, so caches keyed on it move on and the
+        # dataset is no longer a dedup source for its original upload
+        previous_hash = dataset_fingerprint(dataset_dir)
+        metadata = _load_json(dataset_dir, "metadata.json")
+        content_hash = hashlib.sha256(
+            f"{previous_hash or ''}:{delta_hash}".encode("utf-8")
+        ).hexdigest()
+        metadata["content_hash"] = content_hash
+
+        # Everything above only computed; the dataset changes from here on
+        if rollups is not None:
+            rollups.save(dataset_dir)
+        save_sketch_state(dataset_dir, accumulators, row_count)
+        _save_json(dataset_dir, "schema.json", schema)
+        _save_json(dataset_dir, "profile.json", profile)
+        _save_json(dataset_dir, "metadata.json", metadata)
+
+        get_storage().publish_dir(dataset_prefix(dataset_id))
+
+        get_datasets_collection().update_one(
+            {"dataset_id": dataset_id},
+            {
+                "$set": {
+                    "content_hash": content_hash,
+                    "updated_at": datetime.utcnow(),
+                }
+            },
+        )
+    except BaseException:
+        # Otherwise queries would read rows that profile and row_count don't count
+        _roll_back_append(dataset_id, dataset_dir, part_path, backup_dir)
+        raise
+    finally:
+        shutil.rmtree(backup_dir, ignore_errors=True)
+
+    DATASET_ROWS_PROCESSED.labels("append").inc(len(delta))
+    DATASET_BYTES_PROCESSED.labels("append").inc(os.path.getsize(file_path))
+
+    return {
+        "rows_appended": len(delta),
+        "row_count": row_count,
+        "previous_content_hash": previous_hash,
+    }
+
+def local_dataset_dir(dataset_id: str, revalidate: bool = False) -> str:
+    """
+    Local directory holding the dataset's artifacts, brought up to date from
+    artifact storage first (see app.core.storage). `revalidate` skips the
+    freshness window, for callers about to modify the dataset.
+    """
+    return get_storage().fetch_dir(
+        dataset_prefix(dataset_id),
+        include=_is_read_file,
+        revalidate=revalidate,
+    )
+
+def backfill_columnar(dataset_dir: str) -> bool:
+    # Datasets ingested before the columnar cache existed only have the raw upload
+    metadata_path = os.path.join(dataset_dir, "metadata.json")
+    if not os.path.exists(metadata_path):
+        return False
+
+    with open(metadata_path) as f:
+        metadata = json.load(f)
+
+    file_path = os.path.join(dataset_dir, metadata["filename"])
+    if not os.path.exists(file_path):
+        return False
+
+    df = _load_dataset(file_path)
+    df.columns = normalize_columns(df.columns)
+    save_columnar(dataset_dir, df)
+    return True
+
+def link_dataset_artifacts(
+    source_dataset_id: str,
+    dataset_id: str,
+    file_path: str,
+    content_hash: str
+) -> bool:
+    """
+    Reuse the artifacts of an already processed upload with the same content.
+    Returns False when the source artifacts are incomplete, in which case the
+    dataset has to be processed normally.
+    """
+    source_dir = local_dataset_dir(source_dataset_id)
+    dataset_dir = get_storage().path(dataset_prefix(dataset_id))
+
+    sources = [os.path.join(source_dir, name) for name in ARTIFACT_FILES]
+    if not all(os.path.exists(path) for path in sources):
+        return False
+
+    os.makedirs(dataset_dir, exist_ok=True)
+
+    for source, name in zip(sources, ARTIFACT_FILES):
+        _link_file(source, os.path.join(dataset_dir, name))
+
+    for name in OPTIONAL_ARTIFACT_FILES:
+        source = os.path.join(source_dir, name)
+        if os.path.exists(source):
+            _link_file(source, os.path.join(dataset_dir, name))
+
+    # Rollups are optional: datasets ingested before them have none
+    rollup_dir = os.path.join(source_dir, ROLLUP_DIRNAME)
+    if os.path.isdir(rollup_dir):
+        os.makedirs(os.path.join(dataset_dir, ROLLUP_DIRNAME), exist_ok=True)
+        for name in os.listdir(rollup_dir):
+            _link_file(
+                os.path.join(rollup_dir, name),
+                os.path.join(dataset_dir, ROLLUP_DIRNAME, name),
+            )
+
+    _update_metadata(
+        dataset_dir,
+        dataset_id,
+        file_path,
+        status="READY",
+        content_hash=content_hash,
+    )
+
+    get_storage().publish_dir(dataset_prefix(dataset_id))
+    return True
+
+def dataset_fingerprint(dataset_dir: str) -> Optional[str]:
+    """SHA-256 of the dataset's uploaded file, recorded in metadata.json at ingest."""
+    metadata_path = os.path.join(dataset_dir, "metadata.json")
+    if not os.path.exists(metadata_path):
+        return None
+
+    with open(metadata_path) as f:
+        metadata = json.load(f)
+
+    if metadata.get("status") != "READY":
+        return None
+
+    if metadata.get("content_hash"):
+        return metadata["content_hash"]
+
+    # Ingested before hashes were recorded → hash once and remember it
+    file_path = os.path.join(dataset_dir, metadata["filename"])
+    if not os.path.exists(file_path):
+        return None
+
+    metadata["content_hash"] = file_sha256(file_path)
+    _save_json(dataset_dir, "metadata.json", metadata)
+    return metadata["content_hash"]
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+def _validate_delta(delta: pd.DataFrame, schema: dict) -> None:
+    missing = [col for col in schema if col not in delta.columns]
+    extra = [col for col in delta.columns if col not in schema]
+
+    if missing or extra:
+        raise AppendError(
+            f"Columns don't match the dataset (missing: {missing}, unexpected: {extra})"
+        )
+
+    mismatched = []
+    for col, meta in schema.items():
+        values = delta[col].dropna()
+        if values.empty:
+            continue
+
+        if meta["type"] == "numeric":
+            ok = pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values)
+        elif meta["type"] == "boolean":
+            ok = pd.api.types.is_bool_dtype(values)
+        elif meta["type"] == "datetime":
+            parsed = parse_datetimes(values)
+            ok = parsed is not None and not parsed.isna().any()
+        else:
+            ok = True
+
+        if not ok:
+            mismatched.append(f"{col} ({meta['type']})")
+
+    if mismatched:
+        raise AppendError(f"Values don't match the column types: {', '.join(mismatched)}")
+
+def _is_read_file(name: str) -> bool:
+    return name in READ_FILES or any(fnmatch.fnmatch(name, pattern) for pattern in READ_PATTERNS)
+
+def _backup_append_outputs(dataset_dir: str) -> str:
+    # Hard links are enough: artifacts are replaced, never modified in place
+    backup_dir = tempfile.mkdtemp(
+        prefix=f".{os.path.basename(dataset_dir)}.append-",
+        dir=os.path.dirname(dataset_dir),
+    )
+
+    for name in APPEND_OUTPUTS:
+        path = os.path.join(dataset_dir, name)
+
+        if os.path.isdir(path):
+            os.makedirs(os.path.join(backup_dir, name))
+            for filename in os.listdir(path):
+                _link_file(os.path.join(path, filename), os.path.join(backup_dir, name, filename))
+        elif os.path.exists(path):
+            _link_file(path, os.path.join(backup_dir, name))
+
+    return backup_dir
+
+def _roll_back_append(dataset_id: str, dataset_dir: str, part_path: str, backup_dir: str) -> None:
+    for name in APPEND_OUTPUTS:
+        path = os.path.join(dataset_dir, name)
+        saved = os.path.join(backup_dir, name)
+
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+        if os.path.exists(saved):
+            os.replace(saved, path)
+
+    for tmp_path in glob.glob(os.path.join(dataset_dir, "*.tmp")):
+        if os.path.isdir(tmp_path):
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        else:
+            os.remove(tmp_path)
+
+    storage = get_storage()
+    try:
+        # The part may already have been published along with the rest
+        storage.delete(storage_key(part_path))
+        storage.publish_dir(dataset_prefix(dataset_id))
+    except Exception:
+        logger.exception("Failed to restore stored artifacts of dataset %s after a failed append", dataset_id)
+
+def _load_json(dataset_dir: str, filename: str) -> dict:
+    path = os.path.join(dataset_dir, filename)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def _link_file(source: str, target: str) -> None:
+    try:
+        # Artifacts are replaced atomically, never modified in place,
+        # so hard links are safe to share
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
 def _load_dataset(file_path: str) -> pd.DataFrame:
     if file_path.endswith(".csv"):
         return pd.read_csv(file_path)
@@ -80,17 +492,20 @@ def _load_dataset(file_path: str) -> pd.DataFrame:
 
     raise ValueError("Unsupported file format")
 
-def _normalize_columns(columns):
-    return [
-        col.strip().lower().replace(" ", "_")
-        for col in columns
-    ]
+def _set_stage(datasets_col, dataset_id: str, stage: str) -> None:
+    # Status subscribers (GET /datasets/events) follow ingest through this field
+    datasets_col.update_one(
+        {"dataset_id": dataset_id},
+        {"$set": {"stage": stage, "updated_at": datetime.utcnow()}},
+    )
+
 
 def _update_metadata(
     dataset_dir: str,
     dataset_id: str,
     file_path: str,
-    status: str
+    status: str,
+    content_hash: Optional[str] = None
 ):
     metadata = {
         "dataset_id": dataset_id,
@@ -98,9 +513,16 @@ def _update_metadata(
         "status": status
     }
 
+    if content_hash:
+        metadata["content_hash"] = content_hash
+
     _save_json(dataset_dir, "metadata.json", metadata)
 
 def _save_json(dataset_dir: str, filename: str, data):
     path = os.path.join(dataset_dir, filename)
-    with open(path, "w") as f:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
         json.dump(data, f, indent=2)
+
+    # Replace rather than rewrite: the file may be hard-linked to a duplicate upload
+    os.replace(tmp_path, path)
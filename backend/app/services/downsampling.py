@@ -0,0 +1,150 @@
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+OTHER_LABEL = "Other"
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: pick `threshold` points of a series
+    (sorted by x) that preserve its visual shape, peaks included.
+    """
+    n = len(x)
+
+    if threshold >= n:
+        return np.arange(n)
+
+    if threshold < 3:
+        return np.linspace(0, n - 1, max(threshold, 1)).astype(np.int64)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    every = (n - 2) / (threshold - 2)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    a = 0
+
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+
+        # Average of the next bucket is the third vertex of the triangle
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    selected[-1] = n - 1
+    return selected
+
+
+def stratified_sample_indices(n: int, budget: int, seed: int = 0) -> np.ndarray:
+    """One random row from each of `budget` equal slices, so the whole file is covered."""
+    if n <= budget:
+        return np.arange(n)
+
+    edges = np.linspace(0, n, budget + 1).astype(np.int64)
+    rng = np.random.default_rng(seed)
+    offsets = (rng.random(budget) * (edges[1:] - edges[:-1])).astype(np.int64)
+
+    return edges[:-1] + offsets
+
+
+def downsample_line(df: pd.DataFrame, x: str, y: str, budget: int) -> pd.DataFrame:
+    keys = _order_keys(df[x])
+
+    if keys is None:
+        return df.iloc[stratified_sample_indices(len(df), budget)]
+
+    order = np.argsort(keys, kind="stable")
+    df = df.iloc[order]
+
+    return df.iloc[lttb_indices(keys[order], df[y].to_numpy(dtype=np.float64), budget)]
+
+
+def downsample_scatter(df: pd.DataFrame, budget: int) -> pd.DataFrame:
+    return df.iloc[stratified_sample_indices(len(df), budget)]
+
+
+def top_n_with_other(
+    df: pd.DataFrame,
+    x: str,
+    y: str,
+    aggregation: str,
+    limit: int
+) -> List[Dict[str, Any]]:
+    grouped = df.groupby(x)[y].agg(["sum", "count"])
+    return top_n_from_totals(grouped, x, y, aggregation, limit)
+
+
+def top_n_from_totals(
+    grouped: pd.DataFrame,
+    x: str,
+    y: str,
+    aggregation: str,
+    limit: int
+) -> List[Dict[str, Any]]:
+    """
+    Bar data from per-category `sum`/`count` totals, keeping the `limit - 1`
+    most frequent categories and folding the rest into a single "Other" bar.
+    """
+    grouped = grouped[grouped["count"] > 0]
+
+    other = None
+    if len(grouped) > limit:
+        top = grouped.nlargest(limit - 1, "count", keep="first").index
+        rest = grouped.drop(top)
+        grouped = grouped.loc[grouped.index.isin(top)]
+        other = (rest["sum"].sum(), rest["count"].sum())
+
+    if aggregation == "mean":
+        values = grouped["sum"] / grouped["count"]
+    else:
+        values = grouped["sum"]
+
+    records = [
+        {x: key, y: value}
+        for key, value in zip(values.index.tolist(), values.tolist())
+    ]
+
+    if other is not None:
+        total, count = other
+        records.append({
+            x: OTHER_LABEL,
+            y: float(total / count) if aggregation == "mean" else float(total)
+        })
+
+    return records
+
+
+def _order_keys(values: pd.Series):
+    if values.dtype.kind in "biuf":
+        return values.to_numpy(dtype=np.float64)
+
+    if values.dtype.kind == "M":
+        return values.astype("int64").to_numpy(dtype=np.float64)
+
+    # Datetimes usually arrive as strings, so order by their parsed value
+    try:
+        parsed = pd.to_datetime(values, errors="coerce", format="mixed")
+    except (ValueError, TypeError):
+        parsed = None
+
+    if parsed is not None and not parsed.isna().any():
+        return parsed.astype("int64").to_numpy(dtype=np.float64)
+
+    numeric = pd.to_numeric(values, errors="coerce")
+    if not numeric.isna().any():
+        return numeric.to_numpy(dtype=np.float64)
+
+    return None
@@ -5,6 +5,9 @@ import json
 from typing import List, Dict, Any
 
 from app.core.config import settings
+from app.core.profiler import profiled
+from app.core.storage import dataset_prefix, get_storage
+from app.services.dataset_service import local_dataset_dir
 from app.services.llm_summarizer import summarize_insights
 from app.services.kpi_engine import generate_kpis
 from app.core.database import get_datasets_collection, get_insights_collection
@@ -83,8 +86,9 @@ def _kpi_based_insights(kpis: List[Dict[str, Any]]) -> List[Dict[str, str]]:
     return insights
 
 
+@profiled("insights")
 def generate_insights(dataset_id: str) -> Dict[str, Any]:
-    dataset_dir = os.path.join(settings.DATASET_DIR, dataset_id)
+    dataset_dir = local_dataset_dir(dataset_id)
 
     profile = _load_json(dataset_dir, "profile.json")
     schema = _load_json(dataset_dir, "schema.json")
@@ -104,7 +108,7 @@ def generate_insights(dataset_id: str) -> Dict[str, Any]:
     insights_col = get_insights_collection()
     datasets_col = get_datasets_collection()
 
-    dataset_doc = datasets_col.find_one({"dataset_id": dataset_id})
+    dataset_doc = datasets_col.find_one({"dataset_id": dataset_id}, {"user_id": 1})
 
     if dataset_doc:
         insights_col.update_one(
@@ -118,7 +122,7 @@ def generate_insights(dataset_id: str) -> Dict[str, Any]:
                     "user_id": dataset_doc["user_id"],
                     "generated_at": datetime.utcnow(),
                     "has_summary": bool(summary),
-                    "path": os.path.join(dataset_dir, "insights.json")
+                    "path": insights_key(dataset_id)
                 }
             },
             upsert=True
@@ -133,6 +137,16 @@ def generate_insights(dataset_id: str) -> Dict[str, Any]:
     }
 
 
+def invalidate_insights(dataset_id: str) -> None:
+    # Insights describe the old profile; drop them so they get regenerated
+    get_insights_collection().delete_many({"dataset_id": dataset_id})
+    get_storage().delete(insights_key(dataset_id))
+
+
+def insights_key(dataset_id: str) -> str:
+    return f"{dataset_prefix(dataset_id)}/insights.json"
+
+
 def _load_json(dataset_dir: str, filename: str) -> Dict[str, Any]:
     path = os.path.join(dataset_dir, filename)
     if not os.path.exists(path):
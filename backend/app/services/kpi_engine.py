@@ -1,5 +1,8 @@
 from typing import Dict, Any, List
 
+# Bump whenever the KPIs change so cached dashboards are rebuilt
+KPI_VERSION = 1
+
 def generate_kpis(profile: Dict[str, Any]) -> List[Dict[str, Any]]:
     kpis = []
 
@@ -0,0 +1,99 @@
+"""
+Typed loading of a dataset's columnar copy, planned from its schema.json.
+
+pandas defaults to 64-bit numbers and one Python string per text cell.
+The plan keeps low-cardinality strings as `category` (read straight from
+Parquet's dictionary encoding), downcasts integers to the smallest type
+that holds them, and parses datetime columns with the format found at
+ingest. Text stays in pandas' Arrow-backed string dtype.
+"""
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+
+def build_load_plan(schema: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    plan: Dict[str, Dict[str, Any]] = {}
+
+    for col, meta in schema.items():
+        if meta["type"] == "categorical" and meta.get("cardinality") == "low":
+            plan[col] = {"kind": "category"}
+        elif meta["type"] == "numeric":
+            plan[col] = {"kind": "integer"}
+        elif meta["type"] == "datetime" and meta.get("format"):
+            plan[col] = {"kind": "datetime", "format": meta["format"]}
+
+    return plan
+
+
+def dictionary_columns(plan: Dict[str, Dict[str, Any]], columns: List[str]) -> List[str]:
+    """Columns Parquet should hand over dictionary-encoded (→ pandas category)."""
+    return [col for col in columns if plan.get(col, {}).get("kind") == "category"]
+
+
+def apply_load_plan(df: pd.DataFrame, plan: Dict[str, Dict[str, Any]]) -> pd.DataFrame:
+    for col in df.columns:
+        step = plan.get(col)
+        if step is None:
+            continue
+
+        if step["kind"] == "category":
+            df[col] = _sorted_category(df[col])
+        elif step["kind"] == "integer" and df[col].dtype.kind in "iu":
+            df[col] = pd.to_numeric(df[col], downcast="integer")
+        elif step["kind"] == "datetime":
+            parsed = _parse_datetimes(df[col], step["format"])
+            if parsed is not None:
+                df[col] = parsed
+
+    return df
+
+
+def datetime_formats(schema: Dict[str, Any]) -> Dict[str, str]:
+    return {
+        col: meta["format"]
+        for col, meta in schema.items()
+        if meta["type"] == "datetime" and meta.get("format")
+    }
+
+
+def format_datetimes(df: pd.DataFrame, formats: Dict[str, str]) -> pd.DataFrame:
+    """Render parsed datetime columns back as text, exactly as uploaded."""
+    columns = [
+        col for col in df.columns
+        if col in formats and pd.api.types.is_datetime64_any_dtype(df[col])
+    ]
+    if not columns:
+        return df
+
+    df = df.copy()
+    for col in columns:
+        df[col] = df[col].dt.strftime(formats[col])
+
+    return df
+
+
+def _sorted_category(values: pd.Series) -> pd.Series:
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype("category")
+
+    # Ordered by value, so sorting, min/max and comparisons behave like the strings did
+    categories = values.cat.categories
+    return values.cat.reorder_categories(categories.sort_values(), ordered=True)
+
+
+def _parse_datetimes(values: pd.Series, fmt: str) -> Optional[pd.Series]:
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return None
+
+    try:
+        parsed = pd.to_datetime(values, format=fmt, errors="coerce")
+    except (ValueError, TypeError):
+        # e.g. mixed timezone offsets
+        return None
+
+    # A value the format can't read stays visible as text rather than turning into NaT
+    if parsed.isna().sum() != values.isna().sum():
+        return None
+
+    return parsed
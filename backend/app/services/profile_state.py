@@ -0,0 +1,336 @@
+"""
+Mergeable profiling state.
+
+Streaming ingest builds one ColumnAccumulator per column; the state is
+persisted next to the dataset so appended rows can update schema and
+profile without rescanning the rows already ingested.
+"""
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from app.core.config import settings
+from app.services.column_stats import detect_datetime_format, infer_column_type
+from app.services.columnar_store import columnar_paths
+from app.services.sketches import (
+    RunningMoments,
+    KLLSketch,
+    HyperLogLog,
+    SpaceSavingTopK,
+)
+
+SKETCH_STATE_FILENAME = "sketches.json"
+# Bumped when sketches are fed differently; older state is rebuilt by a scan
+SKETCH_STATE_VERSION = 2
+TREND_BLOCK = 1024
+
+
+def build_schema(
+    accumulators: Dict[str, "ColumnAccumulator"],
+    row_count: int
+) -> Dict[str, Any]:
+    schema: Dict[str, Any] = {}
+
+    for col, acc in accumulators.items():
+        unique_ratio = acc.unique_count() / max(row_count, 1)
+
+        schema[col] = {
+            "type": acc.column_type(unique_ratio),
+            "nullable": acc.null_count > 0,
+            "cardinality": "high" if unique_ratio > 0.5 else "low"
+        }
+
+        if schema[col]["type"] == "datetime":
+            schema[col]["format"] = detect_datetime_format(pd.Series(acc.type_sample, dtype=object))
+
+    return schema
+
+
+def outlier_fences(
+    accumulators: Dict[str, "ColumnAccumulator"]
+) -> Dict[str, Tuple[float, float]]:
+    return {
+        col: acc.outlier_fences()
+        for col, acc in accumulators.items()
+        if acc.final_kind() == "numeric" and acc.moments.count
+    }
+
+
+def build_profile(
+    accumulators: Dict[str, "ColumnAccumulator"],
+    row_count: int,
+    outliers: Dict[str, list]
+) -> Dict[str, Any]:
+    profile: Dict[str, Any] = {
+        "numeric": {},
+        "categorical": {},
+        "missing": {}
+    }
+
+    for col, acc in accumulators.items():
+        if col in outliers:
+            profile["numeric"][col] = acc.numeric_profile(outliers[col])
+
+        if acc.final_kind() == "object" and acc.top_k.counts.size:
+            profile["categorical"][col] = {
+                "unique_count": acc.unique_count(),
+                "top_values": acc.top_k.top(5)
+            }
+
+        if acc.null_count:
+            profile["missing"][col] = {
+                "missing_ratio": acc.null_count / row_count
+            }
+
+    return profile
+
+
+def save_sketch_state(
+    dataset_dir: str,
+    accumulators: Dict[str, "ColumnAccumulator"],
+    row_count: int
+) -> None:
+    path = os.path.join(dataset_dir, SKETCH_STATE_FILENAME)
+    tmp_path = f"{path}.tmp"
+
+    state = {
+        "version": SKETCH_STATE_VERSION,
+        "row_count": row_count,
+        "columns": {col: acc.to_state() for col, acc in accumulators.items()},
+    }
+
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, default=str)
+
+    os.replace(tmp_path, path)
+
+
+def load_sketch_state(
+    dataset_dir: str
+) -> Optional[Tuple[Dict[str, "ColumnAccumulator"], int]]:
+    path = os.path.join(dataset_dir, SKETCH_STATE_FILENAME)
+    if not os.path.exists(path):
+        return None
+
+    with open(path) as f:
+        state = json.load(f)
+
+    if state.get("version") != SKETCH_STATE_VERSION:
+        return None
+
+    accumulators = {
+        col: ColumnAccumulator.from_state(col_state)
+        for col, col_state in state["columns"].items()
+    }
+    return accumulators, state["row_count"]
+
+
+def scan_sketch_state(
+    dataset_dir: str
+) -> Tuple[Dict[str, "ColumnAccumulator"], int]:
+    """One-off rebuild from the columnar copy, for datasets ingested without state."""
+    accumulators: Dict[str, ColumnAccumulator] = {}
+    row_count = 0
+
+    for path in columnar_paths(dataset_dir):
+        parquet = pq.ParquetFile(path)
+
+        if not accumulators:
+            for col in parquet.schema_arrow.names:
+                accumulators[col] = ColumnAccumulator()
+
+        for batch in parquet.iter_batches(batch_size=settings.INGEST_CHUNK_ROWS):
+            chunk = batch.to_pandas()
+            row_count += len(chunk)
+
+            for col, acc in accumulators.items():
+                acc.update(chunk[col])
+
+    return accumulators, row_count
+
+
+class ColumnAccumulator:
+    """Mergeable per-column statistics that schema and profile are derived from."""
+
+    def __init__(self):
+        self.kinds = set()
+        self.null_count = 0
+        self.moments = RunningMoments()
+        self.quantiles = KLLSketch()
+        self.distinct = HyperLogLog()
+        self.top_k = SpaceSavingTopK(settings.STREAMING_TOP_K_CAPACITY)
+        self.type_sample: List[Any] = []
+        self.running_sum = 0.0
+        self.trend_blocks: List[float] = []
+
+    def update(self, series: pd.Series) -> None:
+        null_mask = series.isna()
+        self.null_count += int(null_mask.sum())
+        values = series[~null_mask]
+
+        if values.empty:
+            # All-null chunks parse as float64 and say nothing about the type
+            return
+
+        kind = chunk_kind(series)
+        self.kinds.add(kind)
+
+        if len(self.type_sample) < 20:
+            self.type_sample.extend(values.head(20 - len(self.type_sample)).tolist())
+
+        # Counted by text, so a column that later turns out to be object
+        # keeps the values seen while it still parsed as numbers
+        counts = values.value_counts(sort=False)
+        counts.index = text_labels(counts.index, kind)
+        self.distinct.update(pd.Series(counts.index.astype(str)))
+        self.top_k.merge_counts(counts)
+
+        if kind in ("int", "float"):
+            arr = values.to_numpy(dtype="float64")
+            self._update_trend(arr)
+            self.moments.update(arr)
+            self.quantiles.update(arr)
+
+    def final_kind(self) -> str:
+        if not self.kinds or self.kinds <= {"int", "float"}:
+            return "numeric"
+        if self.kinds == {"bool"}:
+            return "bool"
+        return "object"
+
+    def read_dtype(self) -> str:
+        kind = self.final_kind()
+
+        if kind == "numeric":
+            if self.kinds == {"int"} and not self.null_count:
+                return "int64"
+            return "float64"
+
+        if kind == "bool":
+            return "bool" if not self.null_count else "boolean"
+
+        return "str"
+
+    def column_type(self, unique_ratio: float) -> str:
+        kind = self.final_kind()
+
+        if kind == "bool" and not self.null_count:
+            return "boolean"
+
+        if kind == "numeric":
+            return "numeric"
+
+        return infer_column_type(pd.Series(self.type_sample, dtype=object), unique_ratio)
+
+    def unique_count(self) -> int:
+        if self.top_k.exact:
+            return int(self.top_k.counts.size)
+        return self.distinct.estimate()
+
+    def outlier_fences(self) -> Tuple[float, float]:
+        q1, q3 = self.quantiles.quantiles([0.25, 0.75])
+        iqr = q3 - q1
+        return q1 - 1.5 * iqr, q3 + 1.5 * iqr
+
+    def numeric_profile(self, outliers: list) -> Dict[str, Any]:
+        return {
+            "mean": self.moments.mean,
+            "min": self.moments.min,
+            "max": self.moments.max,
+            "std": self.moments.std,
+            "trend": self._trend(),
+            "outliers": outliers
+        }
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "kinds": sorted(self.kinds),
+            "null_count": self.null_count,
+            "moments": self.moments.to_state(),
+            "quantiles": self.quantiles.to_state(),
+            "distinct": self.distinct.to_state(),
+            "top_k": self.top_k.to_state(),
+            "type_sample": self.type_sample,
+            "running_sum": self.running_sum,
+            "trend_blocks": self.trend_blocks,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "ColumnAccumulator":
+        acc = cls()
+        acc.kinds = set(state["kinds"])
+        acc.null_count = state["null_count"]
+        acc.moments = RunningMoments.from_state(state["moments"])
+        acc.quantiles = KLLSketch.from_state(state["quantiles"])
+        acc.distinct = HyperLogLog.from_state(state["distinct"])
+        acc.top_k = SpaceSavingTopK.from_state(state["top_k"])
+        acc.type_sample = state["type_sample"]
+        acc.running_sum = state["running_sum"]
+        acc.trend_blocks = state["trend_blocks"]
+        return acc
+
+    def _update_trend(self, arr: np.ndarray) -> None:
+        # Keep the running sum at every TREND_BLOCK-th value so the
+        # first-half/second-half split can be recovered at the end
+        seen = self.moments.count
+        cumulative = np.cumsum(arr) + self.running_sum
+        positions = np.arange(seen + 1, seen + len(arr) + 1)
+        self.trend_blocks.extend(cumulative[positions % TREND_BLOCK == 0].tolist())
+        self.running_sum = float(cumulative[-1])
+
+    def _trend(self) -> str:
+        count = self.moments.count
+        if count < 3:
+            return "flat"
+
+        half = count // 2
+        block = half // TREND_BLOCK
+        block_start = self.trend_blocks[block - 1] if block else 0.0
+        block_end = (
+            self.trend_blocks[block]
+            if block < len(self.trend_blocks)
+            else self.running_sum
+        )
+        block_size = min(TREND_BLOCK, count - block * TREND_BLOCK)
+
+        # Linear interpolation inside the block that holds the midpoint
+        first_sum = block_start + (block_end - block_start) * (half - block * TREND_BLOCK) / block_size
+
+        first_half = first_sum / half
+        second_half = (self.running_sum - first_sum) / (count - half)
+
+        if second_half > first_half * 1.05:
+            return "up"
+        elif second_half < first_half * 0.95:
+            return "down"
+        return "flat"
+
+
+def chunk_kind(series: pd.Series) -> str:
+    if pd.api.types.is_bool_dtype(series):
+        return "bool"
+    if pd.api.types.is_integer_dtype(series):
+        return "int"
+    if pd.api.types.is_numeric_dtype(series):
+        return "float"
+    return "object"
+
+
+def text_labels(index: pd.Index, kind: str) -> pd.Index:
+    """Parsed numbers back as the CSV text they came from, the way a str read sees them."""
+    if kind == "float":
+        # Integers in a chunk with gaps parse as float: 10083.0 was "10083"
+        arr = index.to_numpy(dtype="float64")
+        labels = index.astype(str).to_numpy(dtype=object)
+        integral = np.isfinite(arr) & (arr == np.round(arr)) & (np.abs(arr) < 2 ** 53)
+        labels[integral] = arr[integral].astype("int64").astype(str)
+        return pd.Index(labels, dtype="str")
+
+    if kind == "int":
+        return index.astype(str)
+
+    return index
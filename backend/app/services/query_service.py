@@ -0,0 +1,254 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.core.cache import ByteLRUCache
+from app.core.config import settings
+from app.models.query import DatasetQueryRequest, QueryAggregation, QueryFilter
+from app.services.columnar_store import has_columnar, load_columnar
+from app.services.dataset_service import backfill_columnar, dataset_fingerprint, local_dataset_dir
+from app.services.load_plan import datetime_formats, format_datetimes
+
+# Results are small next to the data they come from; keep repeats in memory
+_result_cache = ByteLRUCache(
+    max_bytes=settings.QUERY_CACHE_MAX_MB * 1024 * 1024,
+    ttl=settings.QUERY_CACHE_TTL_SECONDS,
+    name="query",
+)
+
+
+class QueryError(ValueError):
+    pass
+
+
+def run_query(dataset_id: str, query: DatasetQueryRequest) -> Dict[str, Any]:
+    dataset_dir = local_dataset_dir(dataset_id)
+
+    key = _cache_key(dataset_dir, query)
+    if key is not None:
+        payload = _result_cache.get(key)
+        if payload is not None:
+            return {"dataset_id": dataset_id, **json.loads(payload)}
+
+    schema = _load_schema(dataset_dir)
+    _validate_columns(query, schema)
+
+    if not has_columnar(dataset_dir) and not backfill_columnar(dataset_dir):
+        raise QueryError("Dataset has no data to query")
+
+    df = load_columnar(dataset_dir, _referenced_columns(query, schema), schema)
+    df = df[_filter_mask(df, query.filters, schema)]
+
+    if query.aggregations:
+        df = _aggregate(df, query.group_by, query.aggregations)
+    else:
+        df = df[query.columns or list(schema)]
+
+    if query.sort:
+        df = df.sort_values(
+            [s.column for s in query.sort],
+            ascending=[not s.descending for s in query.sort],
+            kind="stable",
+        )
+
+    total_rows = len(df)
+    df = df.head(query.limit)
+
+    # Parsed datetimes go out as the text that was uploaded
+    df = format_datetimes(df, _output_formats(query, schema))
+
+    payload = json.dumps({
+        "columns": [str(col) for col in df.columns],
+        "rows": _to_records(df),
+        "total_rows": total_rows,
+        "truncated": total_rows > len(df),
+    }, default=str).encode("utf-8")
+
+    if key is not None:
+        _result_cache.set(key, payload)
+
+    return {"dataset_id": dataset_id, **json.loads(payload)}
+
+
+def _cache_key(dataset_dir: str, query: DatasetQueryRequest) -> Optional[str]:
+    fingerprint = dataset_fingerprint(dataset_dir)
+    if fingerprint is None:
+        return None
+
+    normalized = query.model_dump()
+    # Filters are ANDed, so their order doesn't change the result
+    normalized["filters"] = sorted(
+        normalized["filters"],
+        key=lambda f: json.dumps(f, sort_keys=True, default=str),
+    )
+
+    key = json.dumps([fingerprint, normalized], sort_keys=True, default=str)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def _load_schema(dataset_dir: str) -> Dict[str, Any]:
+    path = os.path.join(dataset_dir, "schema.json")
+    if not os.path.exists(path):
+        raise QueryError("Dataset has not been processed")
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def _validate_columns(query: DatasetQueryRequest, schema: Dict[str, Any]) -> None:
+    referenced = [f.column for f in query.filters] + list(query.group_by)
+    referenced += [a.column for a in query.aggregations if a.column is not None]
+    referenced += list(query.columns or [])
+
+    unknown = [col for col in referenced if col not in schema]
+    if unknown:
+        raise QueryError(f"Unknown columns: {', '.join(sorted(set(unknown)))}")
+
+    if query.group_by and not query.aggregations:
+        raise QueryError("group_by requires at least one aggregation")
+
+    for agg in query.aggregations:
+        if agg.column is None and agg.func != "count":
+            raise QueryError(f"{agg.func} needs a column")
+        if agg.func in ("sum", "mean") and schema[agg.column]["type"] != "numeric":
+            raise QueryError(f"{agg.func} needs a numeric column, got {agg.column}")
+
+    output = (
+        list(query.group_by) + [_alias(a) for a in query.aggregations]
+        if query.aggregations
+        else list(query.columns or schema)
+    )
+    if len(set(output)) != len(output):
+        raise QueryError("Output column names must be unique; set an alias")
+
+    unknown_sort = [s.column for s in query.sort if s.column not in output]
+    if unknown_sort:
+        raise QueryError(f"Cannot sort by: {', '.join(unknown_sort)}")
+
+
+def _referenced_columns(query: DatasetQueryRequest, schema: Dict[str, Any]) -> List[str]:
+    if not query.aggregations:
+        columns = list(query.columns or schema)
+    else:
+        columns = list(query.group_by)
+        columns += [a.column for a in query.aggregations if a.column is not None]
+
+    columns += [f.column for f in query.filters]
+
+    # A bare row count still needs one column to know how many rows there are
+    return columns or list(schema)[:1]
+
+
+def _filter_mask(df: pd.DataFrame, filters: List[QueryFilter], schema: Dict[str, Any]) -> np.ndarray:
+    mask = np.ones(len(df), dtype=bool)
+
+    for f in filters:
+        column = df[f.column]
+
+        if f.op == "is_null":
+            mask &= column.isna().to_numpy()
+            continue
+
+        if f.op == "not_null":
+            mask &= column.notna().to_numpy()
+            continue
+
+        if f.op == "contains":
+            text = format_datetimes(df[[f.column]], datetime_formats(schema))[f.column]
+            matched = text.astype("str").str.contains(str(f.value), case=False, regex=False)
+            mask &= matched.fillna(False).to_numpy(dtype=bool)
+            continue
+
+        column_type = schema[f.column]["type"]
+
+        if f.op in ("in", "not_in"):
+            if not isinstance(f.value, list):
+                raise QueryError(f"{f.op} on {f.column} needs a list value")
+            values = [_coerce(v, column_type, f.column) for v in f.value]
+            matched = _comparable(column, column_type).isin(values).to_numpy()
+            mask &= matched if f.op == "in" else ~matched
+            continue
+
+        value = _coerce(f.value, column_type, f.column)
+        column = _comparable(column, column_type)
+
+        matched = {
+            "eq": lambda: column == value,
+            "ne": lambda: column != value,
+            "lt": lambda: column < value,
+            "lte": lambda: column <= value,
+            "gt": lambda: column > value,
+            "gte": lambda: column >= value,
+        }[f.op]()
+        mask &= matched.fillna(False).to_numpy(dtype=bool)
+
+    return mask
+
+
+def _comparable(column: pd.Series, column_type: str) -> pd.Series:
+    # Datetimes loaded as text (no detected format) are compared as timestamps
+    if column_type == "datetime" and not pd.api.types.is_datetime64_any_dtype(column):
+        return pd.to_datetime(column, errors="coerce", format="mixed")
+
+    # Categories can't be ordered against values outside them; compare the text
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.astype(column.cat.categories.dtype)
+
+    return column
+
+
+def _coerce(value: Any, column_type: str, column: str) -> Any:
+    try:
+        if column_type == "numeric":
+            return float(value)
+        if column_type == "datetime":
+            return pd.Timestamp(value)
+    except (TypeError, ValueError):
+        raise QueryError(f"Invalid value for {column}: {value!r}")
+
+    return value
+
+
+def _aggregate(
+    df: pd.DataFrame,
+    group_by: List[str],
+    aggregations: List[QueryAggregation]
+) -> pd.DataFrame:
+    if not group_by:
+        return pd.DataFrame([{
+            _alias(agg): len(df) if agg.column is None else df[agg.column].agg(agg.func)
+            for agg in aggregations
+        }])
+
+    grouped = df.groupby(group_by, sort=False, dropna=False)
+
+    return pd.DataFrame({
+        _alias(agg): grouped.size() if agg.column is None else grouped[agg.column].agg(agg.func)
+        for agg in aggregations
+    }).reset_index()
+
+
+def _output_formats(query: DatasetQueryRequest, schema: Dict[str, Any]) -> Dict[str, str]:
+    formats = datetime_formats(schema)
+
+    # min/max of a datetime column is still a datetime of that column
+    for agg in query.aggregations:
+        if agg.func in ("min", "max") and agg.column in formats:
+            formats[_alias(agg)] = formats[agg.column]
+
+    return formats
+
+
+def _alias(agg: QueryAggregation) -> str:
+    if agg.alias:
+        return agg.alias
+    return f"{agg.func}_{agg.column}" if agg.column else agg.func
+
+
+def _to_records(df: pd.DataFrame) -> List[dict]:
+    # NaN/NaT aren't valid JSON
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
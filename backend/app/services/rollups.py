@@ -0,0 +1,204 @@
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.core.config import settings
+
+ROLLUP_DIRNAME = "rollups"
+MANIFEST_FILENAME = "manifest.json"
+ROLLUP_VERSION = 1
+
+AGGREGATIONS = ["count", "sum", "min", "max"]
+DATETIME_FREQUENCIES = ["day", "week", "month"]
+
+
+class RollupBuilder:
+    """
+    Pre-aggregates every numeric column by each categorical column and by
+    day/week/month buckets of each datetime column.
+
+    Chunks can be fed one at a time: partial results are merged as they
+    arrive, so memory is bounded by the number of groups, not rows.
+    """
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.numeric_cols = _columns_of_type(schema, "numeric")
+        self.categorical_cols = _columns_of_type(schema, "categorical")
+        self.datetime_cols = _columns_of_type(schema, "datetime")
+        self._partials: Dict[tuple, pd.DataFrame] = {}
+
+    @classmethod
+    def load(cls, dataset_dir: str, schema: Dict[str, Any]) -> Optional["RollupBuilder"]:
+        """Resume from saved rollups, e.g. to fold in appended rows."""
+        manifest = _load_manifest(os.path.join(dataset_dir, ROLLUP_DIRNAME))
+        if manifest is None:
+            return None
+
+        builder = cls(schema)
+        for entry in manifest["rollups"]:
+            path = os.path.join(dataset_dir, ROLLUP_DIRNAME, entry["file"])
+            table = pq.read_table(path).to_pandas().set_index("key")
+            builder._partials[(entry["kind"], entry["column"], entry["freq"])] = table
+
+        return builder
+
+    def update(self, df: pd.DataFrame) -> None:
+        if not self.numeric_cols:
+            return
+
+        numeric = df[self.numeric_cols]
+
+        for col in self.categorical_cols:
+            self._merge(("categorical", col, None), numeric, df[col])
+
+        for col in self.datetime_cols:
+            parsed = parse_datetimes(df[col])
+            if parsed is None:
+                continue
+
+            for freq in DATETIME_FREQUENCIES:
+                self._merge(("datetime", col, freq), numeric, bucket_datetimes(parsed, freq))
+
+    def save(self, dataset_dir: str) -> None:
+        rollup_dir = os.path.join(dataset_dir, ROLLUP_DIRNAME)
+        tmp_dir = f"{rollup_dir}.tmp"
+
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        entries = []
+        for i, ((kind, column, freq), table) in enumerate(self._partials.items()):
+            filename = f"{i}.parquet"
+            pq.write_table(
+                pa.Table.from_pandas(table.reset_index(names="key"), preserve_index=False),
+                os.path.join(tmp_dir, filename),
+                compression=settings.COLUMNAR_COMPRESSION,
+            )
+            entries.append({
+                "kind": kind,
+                "column": column,
+                "freq": freq,
+                "file": filename,
+            })
+
+        with open(os.path.join(tmp_dir, MANIFEST_FILENAME), "w") as f:
+            json.dump({"version": ROLLUP_VERSION, "rollups": entries}, f, indent=2)
+
+        shutil.rmtree(rollup_dir, ignore_errors=True)
+        os.replace(tmp_dir, rollup_dir)
+
+    def _merge(self, key: tuple, numeric: pd.DataFrame, by: pd.Series) -> None:
+        partial = numeric.groupby(by.rename("key")).agg(AGGREGATIONS)
+        partial.columns = [f"{col}__{agg}" for col, agg in partial.columns]
+
+        previous = self._partials.get(key)
+        if previous is not None:
+            partial = _combine(previous, partial)
+
+        self._partials[key] = partial
+
+
+def build_rollups(dataset_dir: str, df: pd.DataFrame, schema: Dict[str, Any]) -> None:
+    builder = RollupBuilder(schema)
+    builder.update(df)
+    builder.save(dataset_dir)
+
+
+def load_rollup(
+    dataset_dir: str,
+    kind: str,
+    column: str,
+    numeric_col: str,
+    freq: Optional[str] = None
+) -> Optional[pd.DataFrame]:
+    """
+    Rollup of `numeric_col` grouped by `column`, indexed by group key with
+    count/sum/min/max columns. None when the dataset has no such rollup.
+    """
+    rollup_dir = os.path.join(dataset_dir, ROLLUP_DIRNAME)
+    manifest = _load_manifest(rollup_dir)
+
+    if manifest is None:
+        return None
+
+    for entry in manifest["rollups"]:
+        if (entry["kind"], entry["column"], entry["freq"]) != (kind, column, freq):
+            continue
+
+        path = os.path.join(rollup_dir, entry["file"])
+        names = [f"{numeric_col}__{agg}" for agg in AGGREGATIONS]
+
+        if not set(names) <= set(pq.read_schema(path).names):
+            return None
+
+        table = pq.read_table(path, columns=["key", *names]).to_pandas()
+        table = table.set_index("key")
+        table.columns = AGGREGATIONS
+        return table
+
+    return None
+
+
+def parse_datetimes(values: pd.Series) -> Optional[pd.Series]:
+    try:
+        parsed = pd.to_datetime(values, errors="coerce", format="mixed")
+    except (ValueError, TypeError):
+        # e.g. mixed timezone offsets
+        return None
+
+    if parsed.dt.tz is not None:
+        parsed = parsed.dt.tz_convert(None)
+
+    return parsed
+
+
+def bucket_datetimes(parsed: pd.Series, freq: str) -> pd.Series:
+    if freq == "day":
+        return parsed.dt.floor("D")
+
+    if freq == "week":
+        day = parsed.dt.floor("D")
+        return day - pd.to_timedelta(day.dt.dayofweek, unit="D")
+
+    if freq == "month":
+        return parsed.dt.to_period("M").dt.start_time
+
+    raise ValueError(f"Unsupported rollup frequency: {freq}")
+
+
+def _load_manifest(rollup_dir: str) -> Optional[Dict[str, Any]]:
+    manifest_path = os.path.join(rollup_dir, MANIFEST_FILENAME)
+
+    if not os.path.exists(manifest_path):
+        return None
+
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    if manifest.get("version") != ROLLUP_VERSION:
+        return None
+
+    return manifest
+
+
+def _combine(left: pd.DataFrame, right: pd.DataFrame) -> pd.DataFrame:
+    combined = pd.concat([left, right])
+    grouped = combined.groupby(level=0)
+
+    how = {
+        col: {"count": "sum", "sum": "sum", "min": "min", "max": "max"}[col.rsplit("__", 1)[1]]
+        for col in combined.columns
+    }
+    return grouped.agg(how)
+
+
+def _columns_of_type(schema: Dict[str, Any], column_type: str) -> List[str]:
+    return [
+        col for col, meta in schema.items()
+        if meta["type"] == column_type
+    ]
@@ -0,0 +1,299 @@
+import base64
+import math
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+
+class RunningMoments:
+    """Welford/Chan mean and variance with min/max, mergeable across chunks."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values: np.ndarray) -> None:
+        if len(values) == 0:
+            return
+
+        other = RunningMoments()
+        other.count = len(values)
+        other.mean = float(values.mean())
+        other.m2 = float(((values - other.mean) ** 2).sum())
+        other.min = float(values.min())
+        other.max = float(values.max())
+
+        self.merge(other)
+
+    def merge(self, other: "RunningMoments") -> None:
+        if other.count == 0:
+            return
+
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return
+
+        total = self.count + other.count
+        delta = other.mean - self.mean
+
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def std(self) -> float:
+        if self.count < 2:
+            return float("nan")
+        return math.sqrt(self.m2 / (self.count - 1))
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "m2": self.m2,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "RunningMoments":
+        moments = cls()
+        moments.count = state["count"]
+        moments.mean = state["mean"]
+        moments.m2 = state["m2"]
+        if moments.count:
+            moments.min, moments.max = state["min"], state["max"]
+        return moments
+
+
+class KLLSketch:
+    """KLL quantile sketch: bounded memory, mergeable, ~1% rank error at k=200."""
+
+    def __init__(self, k: int = 200, seed: int = 0):
+        self.k = k
+        self.count = 0
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values: np.ndarray) -> None:
+        if len(values) == 0:
+            return
+
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: "KLLSketch") -> None:
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+
+        self.count += other.count
+        self._compress()
+
+    def quantiles(self, qs: List[float]) -> List[float]:
+        if self.count == 0:
+            return [float("nan")] * len(qs)
+
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([
+            np.full(len(level), 2 ** h, dtype="float64")
+            for h, level in enumerate(self.levels)
+        ])
+
+        order = np.argsort(items, kind="stable")
+        items = items[order]
+        cumulative = np.cumsum(weights[order])
+        total = cumulative[-1]
+
+        result = []
+        for q in qs:
+            idx = int(np.searchsorted(cumulative, q * total, side="left"))
+            result.append(float(items[min(idx, len(items) - 1)]))
+
+        return result
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "k": self.k,
+            "count": self.count,
+            "levels": [level.tolist() for level in self.levels],
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any], seed: int = 0) -> "KLLSketch":
+        sketch = cls(k=state["k"], seed=seed)
+        sketch.count = state["count"]
+        sketch.levels = [np.asarray(level, dtype="float64") for level in state["levels"]]
+        return sketch
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self) -> None:
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+
+                items = np.sort(items)
+                # Odd leftovers stay behind so no weight is lost
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                pairs = items[: len(items) - len(keep)]
+
+                offset = int(self._rng.integers(0, 2))
+                self.levels[level + 1] = np.concatenate([
+                    self.levels[level + 1],
+                    pairs[offset::2]
+                ])
+                self.levels[level] = keep
+
+            level += 1
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter over 64-bit pandas hashes (~0.8% error at p=14)."""
+
+    def __init__(self, precision: int = 14):
+        self.p = precision
+        self.m = 1 << precision
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def update(self, values: pd.Series) -> None:
+        if len(values) == 0:
+            return
+
+        hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+        idx = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        rank = ((64 - self.p) - _bit_length(rest) + 1).astype(np.uint8)
+
+        np.maximum.at(self.registers, idx, rank)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        raw = alpha * self.m * self.m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * self.m and zeros:
+            # Linear counting is far more accurate for small cardinalities
+            return int(round(self.m * math.log(self.m / zeros)))
+
+        return int(round(raw))
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "precision": self.p,
+            "registers": base64.b64encode(self.registers.tobytes()).decode("ascii"),
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "HyperLogLog":
+        hll = cls(precision=state["precision"])
+        hll.registers = np.frombuffer(
+            base64.b64decode(state["registers"]), dtype=np.uint8
+        ).copy()
+        return hll
+
+
+class SpaceSavingTopK:
+    """Heavy-hitter counters; exact while the number of distinct values fits."""
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype="int64")
+        self.error = 0
+
+    def update(self, values: pd.Series) -> None:
+        self.merge_counts(values.value_counts(sort=False))
+
+    def merge(self, other: "SpaceSavingTopK") -> None:
+        self.merge_counts(other.counts)
+        self.error += other.error
+
+    def merge_counts(self, counts: pd.Series) -> None:
+        if counts.empty:
+            return
+
+        # Positional arithmetic: .loc would treat boolean labels as a mask
+        known = counts.reindex(self.counts.index, fill_value=0).to_numpy()
+        fresh = counts[~counts.index.isin(self.counts.index)]
+
+        merged = self.counts + known
+        # Newly tracked values may have been evicted before; space-saving
+        # charges them the current error bound
+        merged = pd.concat([merged, fresh + self.error])
+        merged = merged.astype("int64").sort_values(ascending=False, kind="stable")
+
+        if len(merged) > self.capacity:
+            self.error = int(merged.iloc[self.capacity])
+            merged = merged.iloc[: self.capacity]
+
+        self.counts = merged
+
+    @property
+    def exact(self) -> bool:
+        return self.error == 0
+
+    def top(self, n: int) -> Dict[Any, int]:
+        # Counters over-count by up to the error bound; report the guaranteed
+        # lower bound instead. Every tracked value was seen at least once.
+        lower = (self.counts - self.error).clip(lower=1)
+        lower = lower.sort_values(ascending=False, kind="stable")
+        return {
+            key: int(value)
+            for key, value in lower.head(n).items()
+        }
+
+    def to_state(self) -> Dict[str, Any]:
+        # Pairs rather than a mapping: JSON keys would turn everything into strings
+        return {
+            "capacity": self.capacity,
+            "error": self.error,
+            "counts": [
+                [key.item() if isinstance(key, np.generic) else key, int(value)]
+                for key, value in self.counts.items()
+            ],
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "SpaceSavingTopK":
+        top_k = cls(capacity=state["capacity"])
+        top_k.error = state["error"]
+        if state["counts"]:
+            keys, values = zip(*state["counts"])
+            top_k.counts = pd.Series(
+                values,
+                index=pd.Index(keys, dtype=object),
+                dtype="int64",
+            )
+        return top_k
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    values = values.copy()
+    length = np.zeros(len(values), dtype=np.int64)
+
+    for shift in (32, 16, 8, 4, 2, 1):
+        mask = values >= np.uint64(1 << shift)
+        length[mask] += shift
+        values[mask] >>= np.uint64(shift)
+
+    return length + (values > 0)
@@ -0,0 +1,110 @@
+from typing import Dict, Any, Iterator, List, Tuple
+
+import pandas as pd
+
+from app.core.config import settings
+from app.core.metrics import DATASET_ROWS_PROCESSED, INGEST_STAGE_SECONDS
+from app.services.columnar_store import save_columnar_chunks
+from app.services.profile_state import (
+    ColumnAccumulator,
+    build_profile,
+    build_schema,
+    outlier_fences,
+    save_sketch_state,
+)
+from app.services.rollups import RollupBuilder
+from app.services.schema_inference import normalize_columns
+
+
+def should_stream(file_path: str, file_size: int) -> bool:
+    return (
+        file_path.endswith(".csv")
+        and file_size > settings.STREAMING_INGEST_THRESHOLD_MB * 1024 * 1024
+    )
+
+
+def stream_dataset(
+    file_path: str,
+    dataset_dir: str
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Out-of-core equivalent of load + analyze_dataset + save_columnar.
+
+    The first pass feeds every chunk into mergeable accumulators, so memory
+    stays bounded by the chunk size. The second pass re-reads the file with
+    the resolved dtypes to write the columnar copy and rollups, and to pick
+    the first outliers against the sketched IQR fences.
+    """
+    raw_columns: List[str] = []
+    accumulators: Dict[str, ColumnAccumulator] = {}
+    row_count = 0
+
+    # Reading and profiling are interleaved per chunk, so they share a stage
+    with INGEST_STAGE_SECONDS.labels("analyze").time():
+        for chunk in _read_chunks(file_path):
+            if not raw_columns:
+                raw_columns = list(chunk.columns)
+                for col in normalize_columns(raw_columns):
+                    accumulators[col] = ColumnAccumulator()
+
+            chunk.columns = normalize_columns(chunk.columns)
+            row_count += len(chunk)
+
+            for col, acc in accumulators.items():
+                acc.update(chunk[col])
+
+    if not raw_columns:
+        raw_columns = list(pd.read_csv(file_path, nrows=0).columns)
+        for col in normalize_columns(raw_columns):
+            accumulators[col] = ColumnAccumulator()
+
+    dtypes = {
+        raw: accumulators[col].read_dtype()
+        for raw, col in zip(raw_columns, normalize_columns(raw_columns))
+    }
+
+    schema = build_schema(accumulators, row_count)
+    rollups = RollupBuilder(schema)
+
+    fences = outlier_fences(accumulators)
+    outliers: Dict[str, list] = {col: [] for col in fences}
+
+    def typed_chunks() -> Iterator[pd.DataFrame]:
+        for chunk in _read_chunks(file_path, dtype=dtypes):
+            chunk.columns = normalize_columns(chunk.columns)
+
+            for col, (lower, upper) in fences.items():
+                if len(outliers[col]) >= 5:
+                    continue
+                series = chunk[col].dropna()
+                hits = series[(series < lower) | (series > upper)]
+                outliers[col].extend(hits.head(5 - len(outliers[col])).tolist())
+
+            rollups.update(chunk)
+            yield chunk
+
+    # Second read, outliers and rollup updates happen inside the write loop
+    with INGEST_STAGE_SECONDS.labels("columnar_write").time():
+        save_columnar_chunks(
+            dataset_dir,
+            typed_chunks(),
+            empty=pd.DataFrame(columns=normalize_columns(raw_columns))
+        )
+
+    with INGEST_STAGE_SECONDS.labels("rollups").time():
+        rollups.save(dataset_dir)
+
+    save_sketch_state(dataset_dir, accumulators, row_count)
+
+    DATASET_ROWS_PROCESSED.labels("ingest").inc(row_count)
+
+    profile = build_profile(accumulators, row_count, outliers)
+    return schema, profile
+
+
+def _read_chunks(file_path: str, dtype=None) -> Iterator[pd.DataFrame]:
+    return pd.read_csv(
+        file_path,
+        chunksize=settings.INGEST_CHUNK_ROWS,
+        dtype=dtype,
+    )
@@ -1,38 +1,94 @@
-from typing import Optional
+import copy
+import logging
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Optional
 from datetime import datetime
 
 from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
 
-from app.core.database import get_users_collection
-from app.core.security import hash_password, verify_password
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import get_users_collection, get_async_users_collection
+from app.core.security import hash_password_async, verify_and_update_password
 from app.models.user import UserRegisterRequest
 from datetime import datetime
 from app.core.database import get_insights_collection, get_datasets_collection
 
+logger = logging.getLogger(__name__)
+
+# get_current_user's principal never needs the password hash
+PRINCIPAL_PROJECTION = {"hashed_password": 0}
+
+# Authenticated-principal cache: get_current_user runs on every request.
+# Writes in this process invalidate explicitly; the TTL bounds staleness
+# for writes made by other workers.
+_user_cache = TTLCache(
+    maxsize=settings.USER_CACHE_SIZE,
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+    name="user"
+)
+
+
+def invalidate_user(user_id) -> None:
+    _user_cache.invalidate(str(user_id))
+
+
+def _cache_user(user_id: str, user: Optional[dict]) -> Optional[dict]:
+    if user is not None:
+        _user_cache.set(user_id, user)
+    return copy.deepcopy(user)
 
 
 def get_user_by_email(email: str) -> Optional[dict]:
     users = get_users_collection()
-    return users.find_one({"email": email})
+    return users.find_one(
+        {"email": email},
+        {"email": 1, "hashed_password": 1, "is_active": 1},
+    )
+
+async def get_user_by_email_async(email: str) -> Optional[dict]:
+    users = get_async_users_collection()
+    return await users.find_one(
+        {"email": email},
+        {"email": 1, "hashed_password": 1, "is_active": 1},
+    )
 
 def get_user_by_id(user_id: str) -> Optional[dict]:
+    cached_user = _user_cache.get(user_id)
+    if cached_user is not None:
+        return copy.deepcopy(cached_user)
+
     users = get_users_collection()
     try:
-        return users.find_one({"_id": ObjectId(user_id)})
+        return _cache_user(user_id, users.find_one({"_id": ObjectId(user_id)}, PRINCIPAL_PROJECTION))
     except Exception:
         return None
 
-def create_user(payload: UserRegisterRequest) -> dict:
+async def get_user_by_id_async(user_id: str) -> Optional[dict]:
+    cached_user = _user_cache.get(user_id)
+    if cached_user is not None:
+        return copy.deepcopy(cached_user)
+
+    users = get_async_users_collection()
+    try:
+        return _cache_user(user_id, await users.find_one({"_id": ObjectId(user_id)}, PRINCIPAL_PROJECTION))
+    except Exception:
+        return None
+
+async def create_user(payload: UserRegisterRequest) -> dict:
     print("Creating user:", payload.email)
-    users = get_users_collection()
+    users = get_async_users_collection()
 
-    if users.find_one({"email": payload.email}):
+    if await users.find_one({"email": payload.email}, {"_id": 1}):
         print("User already exists:", payload.email)
         raise ValueError("User already exists")
 
     user_doc = {
         "email": payload.email,
-        "hashed_password": hash_password(payload.password),
+        "hashed_password": await hash_password_async(payload.password),
         "is_active": True,
         "created_at": datetime.utcnow(),
         "profile": {
@@ -45,32 +101,165 @@ def create_user(payload: UserRegisterRequest) -> dict:
         }
     }
 
-    result = users.insert_one(user_doc)
+    try:
+        result = await users.insert_one(user_doc)
+    except DuplicateKeyError:
+        # Lost a race with a concurrent registration (users.email is unique)
+        raise ValueError("User already exists")
+
     user_doc["_id"] = result.inserted_id
+    invalidate_user(result.inserted_id)
     print("User created with ID:", result.inserted_id)
 
     return user_doc
 
-def authenticate_user(email: str, password: str) -> Optional[dict]:
-    user = get_user_by_email(email)
+async def authenticate_user(email: str, password: str) -> Optional[dict]:
+    user = await get_user_by_email_async(email)
     
 
     if not user:
         return None
 
-    if not verify_password(password, user["hashed_password"]):
+    valid, new_hash = await verify_and_update_password(password, user["hashed_password"])
+    if not valid:
         print("password not matched")
         return None
 
     if not user.get("is_active", False):
         return None
+
+    if new_hash:
+        # Stored with older argon2 parameters; only now is the plaintext at hand
+        await get_async_users_collection().update_one(
+            {"_id": user["_id"], "hashed_password": user["hashed_password"]},
+            {"$set": {"hashed_password": new_hash}}
+        )
+        user["hashed_password"] = new_hash
     
     print("authenticating",user)
     return user
 
-def increment_user_stat(user_id: str, field: str, value: int = 1) -> None:
+class UserStatBuffer:
+    """
+    Write-behind buffer for the per-user stats counters.
+
+    Increments are summed per (user, field) in memory and written with one
+    unordered bulk_write every `interval` seconds (or as soon as
+    `max_users` users have pending deltas), so a crash loses at most one
+    interval's worth. Until then `pending` lets readers add them in.
+    """
+
+    def __init__(self, interval: float, max_users: int):
+        self.interval = interval
+        self.max_users = max_users
+        self._pending: Dict[str, Counter] = defaultdict(Counter)
+        # Taken out of _pending but not yet acknowledged by Mongo
+        self._in_flight: Dict[str, Counter] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, user_id: str, field: str, value: int) -> None:
+        with self._lock:
+            self._pending[user_id][field] += value
+            full = len(self._pending) >= self.max_users
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="user-stats-flush", daemon=True)
+                self._thread.start()
+
+        if full:
+            self.flush()
+
+    def pending(self, user_id: str) -> Dict[str, int]:
+        with self._lock:
+            deltas = Counter(self._pending.get(user_id, {}))
+            deltas.update(self._in_flight.get(user_id, {}))
+            return dict(deltas)
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, defaultdict(Counter)
+                self._in_flight = batch
+
+            if not batch:
+                return
+
+            user_ids = [user_id for user_id in batch if ObjectId.is_valid(user_id)]
+            operations = [
+                UpdateOne(
+                    {"_id": ObjectId(user_id)},
+                    {"$inc": {f"stats.{field}": value for field, value in batch[user_id].items()}},
+                )
+                for user_id in user_ids
+            ]
+
+            try:
+                if operations:
+                    get_users_collection().bulk_write(operations, ordered=False)
+            except BulkWriteError as exc:
+                # Per-document failures would fail again; the rest were applied
+                errors = exc.details["writeErrors"]
+                logger.error("Dropped %d user stat updates: %s", len(errors), errors[:3])
+            except PyMongoError:
+                logger.exception("Failed to flush user stats; retrying next interval")
+                with self._lock:
+                    for user_id, fields in batch.items():
+                        self._pending[user_id].update(fields)
+            finally:
+                # Cached principals still hold the old counts
+                for user_id in user_ids:
+                    invalidate_user(user_id)
+
+                with self._lock:
+                    self._in_flight = {}
+
+    def close(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+        self._stopping.clear()
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("User stats flush crashed")
+
+
+_stat_buffer = UserStatBuffer(
+    interval=settings.USER_STATS_FLUSH_SECONDS,
+    max_users=settings.USER_STATS_MAX_PENDING_USERS,
+)
+
+
+def increment_user_stat(user_id, field: str, value: int = 1) -> None:
+    """Buffered; see UserStatBuffer. Accepts the user's id as str or ObjectId."""
+    _stat_buffer.add(str(user_id), field, value)
+
+
+def pending_user_stats(user_id) -> Dict[str, int]:
+    return _stat_buffer.pending(str(user_id))
+
+
+def flush_user_stats() -> None:
+    _stat_buffer.flush()
+
+
+def close_user_stats() -> None:
+    """Stop the background flusher and write out what's left (on shutdown)."""
+    _stat_buffer.close()
+
+def set_user_active(user_id: str, is_active: bool) -> None:
     users = get_users_collection()
     users.update_one(
         {"_id": ObjectId(user_id)},
-        {"$inc": {f"stats.{field}": value}}
+        {"$set": {"is_active": is_active}}
     )
+    invalidate_user(user_id)
@@ -0,0 +1,62 @@
+"""
+Standalone ingest worker.
+
+    python -m app.worker --workers 4
+
+Runs on any node that shares the dataset storage and MongoDB with the API,
+claiming jobs from the `jobs` collection until it receives SIGINT/SIGTERM.
+"""
+import argparse
+import logging
+import signal
+
+from app.core.config import settings
+from app.core.jobs import JobExecutor
+from app.core.logging import setup_logging
+from app.core.metrics import clear_dead_process_metrics
+from app.services.dataset_service import process_dataset
+from app.services.user_service import close_user_stats
+
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Dataset ingest worker")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=max(settings.INGEST_WORKERS, 1),
+        help="Number of datasets processed concurrently",
+    )
+    parser.add_argument(
+        "--worker-id",
+        default=None,
+        help="Lease owner name (defaults to host:pid)",
+    )
+    args = parser.parse_args()
+
+    setup_logging()
+    clear_dead_process_metrics()
+
+    executor = JobExecutor(
+        target=process_dataset,
+        max_workers=args.workers,
+        timeout=settings.INGEST_JOB_TIMEOUT_SECONDS,
+        worker_id=args.worker_id,
+    )
+
+    def stop(signum, frame):
+        logger.info("Received signal %s, releasing jobs and exiting", signum)
+        executor.shutdown()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    executor.start()
+    logger.info("Ingest worker started with %d slots", args.workers)
+    executor.wait()
+    close_user_stats()
+
+
+if __name__ == "__main__":
+    main()
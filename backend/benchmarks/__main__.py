@@ -0,0 +1,77 @@
+"""
+Benchmark the analytics pipeline on synthetic data.
+
+Run from the backend directory:
+
+    python -m benchmarks --rows 10000,100000 --columns 10,100
+    python -m benchmarks --output results.json
+    python -m benchmarks --baseline benchmarks/baseline.json --threshold 0.2
+
+Exits with status 1 when any stage regressed past the threshold.
+"""
+import argparse
+import json
+import sys
+
+from benchmarks.compare import compare
+from benchmarks.runner import STAGES, run
+
+
+def _int_list(value: str):
+    return [int(float(v)) for v in value.split(",") if v]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=_int_list, default=[10_000], help="comma-separated row counts (e.g. 10000,1e6)")
+    parser.add_argument("--columns", type=_int_list, default=[10], help="comma-separated column counts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs per stage; the best is kept")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak-memory run")
+    parser.add_argument("--stream", action="store_true", help="force the chunked ingest path")
+    parser.add_argument("--work-dir", help="keep generated files and artifacts here instead of a temp dir")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown as a fraction")
+    args = parser.parse_args(argv)
+
+    sizes = [(rows, columns) for rows in args.rows for columns in args.columns]
+    results = run(
+        sizes,
+        seed=args.seed,
+        repeat=args.repeat,
+        memory=not args.no_memory,
+        stream=args.stream,
+        work_dir=args.work_dir,
+    )
+
+    for scenario in results["scenarios"]:
+        print(f"\n{scenario['name']} ({scenario['file_mb']} MB)")
+        for stage in STAGES:
+            metrics = scenario["stages"][stage]
+            peak = f"{metrics['peak_mb']:>10.2f} MB" if "peak_mb" in metrics else ""
+            print(f"  {stage:<18}{metrics['seconds']:>10.4f} s{peak}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.threshold)
+    for r in regressions:
+        print(
+            f"REGRESSION {r['scenario']} {r['stage']} {r['metric']}: "
+            f"{r['baseline']} -> {r['current']}",
+            file=sys.stderr,
+        )
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""
+Compares a benchmark run against a stored baseline.
+"""
+from typing import Any, Dict, List
+
+# Below these, run-to-run noise swamps any real change
+MIN_SECONDS_DELTA = 0.05
+MIN_PEAK_MB_DELTA = 5.0
+
+
+def compare(
+    results: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float = 0.2
+) -> List[Dict[str, Any]]:
+    """
+    Stages that got slower or hungrier than the baseline by more than
+    `threshold` (a fraction, 0.2 = 20%). Scenarios or stages missing from
+    the baseline are skipped.
+    """
+    baseline_scenarios = {s["name"]: s for s in baseline.get("scenarios", [])}
+    regressions = []
+
+    for scenario in results["scenarios"]:
+        previous = baseline_scenarios.get(scenario["name"])
+        if previous is None:
+            continue
+
+        for stage, current in scenario["stages"].items():
+            before = previous["stages"].get(stage)
+            if before is None:
+                continue
+
+            for metric, min_delta in (("seconds", MIN_SECONDS_DELTA), ("peak_mb", MIN_PEAK_MB_DELTA)):
+                if metric not in current or metric not in before:
+                    continue
+
+                delta = current[metric] - before[metric]
+                if delta > min_delta and current[metric] > before[metric] * (1 + threshold):
+                    regressions.append({
+                        "scenario": scenario["name"],
+                        "stage": stage,
+                        "metric": metric,
+                        "baseline": before[metric],
+                        "current": current[metric],
+                        "change": round(delta / before[metric], 3) if before[metric] else None,
+                    })
+
+    return regressions
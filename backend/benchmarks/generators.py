@@ -0,0 +1,125 @@
+"""
+Seeded synthetic datasets that look like what users upload: skewed
+numerics, Zipf-distributed categories, timestamps, free text, booleans
+and scattered nulls. The same (rows, columns, seed) always produces the
+same file, so runs are comparable.
+"""
+from typing import Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Share of columns per kind, cycled in this order
+COLUMN_MIX: List[Tuple[str, int]] = [
+    ("numeric", 4),
+    ("categorical", 3),
+    ("datetime", 1),
+    ("text", 1),
+    ("boolean", 1),
+]
+
+CHUNK_ROWS = 250_000
+
+
+def column_kinds(columns: int) -> List[str]:
+    pattern = [kind for kind, weight in COLUMN_MIX for _ in range(weight)]
+    return [pattern[i % len(pattern)] for i in range(columns)]
+
+
+def generate_dataset(
+    rows: int,
+    columns: int,
+    seed: int = 0,
+    null_ratio: float = 0.05
+) -> pd.DataFrame:
+    return pd.concat(
+        list(generate_chunks(rows, columns, seed, null_ratio)),
+        ignore_index=True,
+    )
+
+
+def write_csv(
+    path: str,
+    rows: int,
+    columns: int,
+    seed: int = 0,
+    null_ratio: float = 0.05
+) -> None:
+    # Chunked so 10M-row files never have to fit in memory
+    for i, chunk in enumerate(generate_chunks(rows, columns, seed, null_ratio)):
+        chunk.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+
+
+def generate_chunks(
+    rows: int,
+    columns: int,
+    seed: int = 0,
+    null_ratio: float = 0.05
+) -> Iterator[pd.DataFrame]:
+    kinds = column_kinds(columns)
+
+    for start in range(0, max(rows, 1), CHUNK_ROWS):
+        size = min(CHUNK_ROWS, rows - start)
+        if size <= 0:
+            return
+
+        data = {}
+        for i, kind in enumerate(kinds):
+            # Per-column, per-chunk streams: adding columns doesn't reshuffle the others
+            rng = np.random.default_rng([seed, i, start])
+            values = _GENERATORS[kind](rng, i, start, size)
+
+            if null_ratio and kind != "boolean":
+                values = pd.Series(values)
+                values[rng.random(size) < null_ratio] = None
+
+            data[f"{kind.title()} {i}"] = values
+
+        yield pd.DataFrame(data)
+
+
+def _numeric(rng: np.random.Generator, i: int, start: int, size: int) -> np.ndarray:
+    variant = i % 3
+
+    if variant == 0:
+        # Right-skewed amounts (revenue, order value)
+        return np.round(rng.lognormal(mean=4, sigma=1, size=size), 2)
+
+    if variant == 1:
+        # Small integer counts
+        return rng.poisson(lam=3 + i % 7, size=size).astype("float64")
+
+    # Drifting measurement, so trend detection has something to find
+    drift = np.linspace(start, start + size, size) * 1e-5
+    return np.round(rng.normal(100, 15, size) + drift, 3)
+
+
+def _categorical(rng: np.random.Generator, i: int, start: int, size: int) -> np.ndarray:
+    cardinality = [5, 50, 1000][i % 3]
+    # Zipf: a few categories dominate, like real product or region columns
+    codes = np.minimum(rng.zipf(1.3, size), cardinality) - 1
+    return np.char.add(f"c{i}_", codes.astype(str))
+
+
+def _datetime(rng: np.random.Generator, i: int, start: int, size: int) -> np.ndarray:
+    base = np.datetime64("2020-01-01T00:00:00")
+    minutes = (np.arange(start, start + size) * 7 + rng.integers(0, 5, size)).astype("timedelta64[m]")
+    return np.datetime_as_string(base + minutes, unit="s")
+
+
+def _text(rng: np.random.Generator, i: int, start: int, size: int) -> np.ndarray:
+    ids = rng.integers(0, 10 * (start + size), size).astype(str)
+    return np.char.add("order note ", ids)
+
+
+def _boolean(rng: np.random.Generator, i: int, start: int, size: int) -> np.ndarray:
+    return rng.random(size) < 0.3
+
+
+_GENERATORS = {
+    "numeric": _numeric,
+    "categorical": _categorical,
+    "datetime": _datetime,
+    "text": _text,
+    "boolean": _boolean,
+}
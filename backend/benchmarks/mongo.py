@@ -0,0 +1,183 @@
+"""
+In-memory stand-in for the MongoDB calls the services make, so benchmarks
+time the analytics work rather than a network round-trip. It supports the
+subset of the pymongo API the app uses and counts every call.
+"""
+import copy
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+
+
+class InMemoryDatabase:
+    def __init__(self):
+        self.calls: Counter = Counter()
+        self._collections: Dict[str, InMemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> "InMemoryCollection":
+        if name not in self._collections:
+            self._collections[name] = InMemoryCollection(name, self.calls)
+        return self._collections[name]
+
+    __getattr__ = __getitem__
+
+
+class InMemoryCollection:
+    def __init__(self, name: str, calls: Counter):
+        self.name = name
+        self._calls = calls
+        self._docs: List[dict] = []
+
+    def insert_one(self, doc: dict):
+        self._count("insert_one")
+        doc.setdefault("_id", ObjectId())
+        self._docs.append(copy.deepcopy(doc))
+        return _Result(inserted_id=doc["_id"])
+
+    def find_one(self, filter: Optional[dict] = None, projection=None, **kwargs) -> Optional[dict]:
+        self._count("find_one")
+        doc = next(self._matching(filter or {}), None)
+        return copy.deepcopy(doc) if doc is not None else None
+
+    def find(self, filter: Optional[dict] = None, projection=None, **kwargs) -> List[dict]:
+        self._count("find")
+        return [copy.deepcopy(doc) for doc in self._matching(filter or {})]
+
+    def count_documents(self, filter: dict, **kwargs) -> int:
+        self._count("count_documents")
+        return sum(1 for _ in self._matching(filter))
+
+    def update_one(self, filter: dict, update: dict, upsert: bool = False, **kwargs):
+        self._count("update_one")
+        doc = next(self._matching(filter), None)
+
+        if doc is None:
+            if not upsert:
+                return _Result(matched_count=0, modified_count=0)
+            doc = {k: v for k, v in filter.items() if not isinstance(v, dict)}
+            doc["_id"] = doc.get("_id", ObjectId())
+            self._docs.append(doc)
+            _apply(doc, update, inserting=True)
+            return _Result(matched_count=0, modified_count=0, upserted_id=doc["_id"])
+
+        _apply(doc, update)
+        return _Result(matched_count=1, modified_count=1)
+
+    def update_many(self, filter: dict, update: dict, **kwargs):
+        self._count("update_many")
+        docs = list(self._matching(filter))
+        for doc in docs:
+            _apply(doc, update)
+        return _Result(matched_count=len(docs), modified_count=len(docs))
+
+    def find_one_and_update(self, filter: dict, update: dict, return_document=False, **kwargs):
+        self._count("find_one_and_update")
+        doc = next(self._matching(filter), None)
+        if doc is None:
+            return None
+
+        before = copy.deepcopy(doc)
+        _apply(doc, update)
+        return copy.deepcopy(doc) if return_document else before
+
+    def replace_one(self, filter: dict, replacement: dict, upsert: bool = False, **kwargs):
+        self._count("replace_one")
+        self._docs = [doc for doc in self._docs if not _matches(doc, filter)]
+        self._docs.append(copy.deepcopy(replacement))
+        return _Result(matched_count=1, modified_count=1)
+
+    def delete_one(self, filter: dict):
+        self._count("delete_one")
+        doc = next(self._matching(filter), None)
+        if doc is not None:
+            self._docs.remove(doc)
+        return _Result(deleted_count=int(doc is not None))
+
+    def delete_many(self, filter: dict):
+        self._count("delete_many")
+        before = len(self._docs)
+        self._docs = [doc for doc in self._docs if not _matches(doc, filter)]
+        return _Result(deleted_count=before - len(self._docs))
+
+    def create_index(self, *args, **kwargs) -> str:
+        self._count("create_index")
+        return "index"
+
+    def bulk_write(self, requests: Iterable, **kwargs):
+        self._count("bulk_write")
+        for request in requests:
+            self.update_one(request._filter, request._doc, upsert=request._upsert)
+        return _Result()
+
+    def _matching(self, filter: dict):
+        return (doc for doc in self._docs if _matches(doc, filter))
+
+    def _count(self, op: str) -> None:
+        self._calls[f"{self.name}.{op}"] += 1
+
+
+class _Result:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+_OPERATORS = {
+    "$ne": lambda value, arg: value != arg,
+    "$in": lambda value, arg: value in arg,
+    "$nin": lambda value, arg: value not in arg,
+    "$lt": lambda value, arg: value is not None and value < arg,
+    "$lte": lambda value, arg: value is not None and value <= arg,
+    "$gt": lambda value, arg: value is not None and value > arg,
+    "$gte": lambda value, arg: value is not None and value >= arg,
+    "$exists": lambda value, arg: (value is not None) == arg,
+}
+
+
+def _matches(doc: dict, filter: dict) -> bool:
+    for key, condition in filter.items():
+        if key == "$or":
+            if not any(_matches(doc, sub) for sub in condition):
+                return False
+            continue
+
+        if key.startswith("$"):
+            raise NotImplementedError(f"{key} is not supported by the benchmark stand-in")
+
+        value = _get(doc, key)
+
+        if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            if not all(_OPERATORS[op](value, arg) for op, arg in condition.items()):
+                return False
+        elif value != condition:
+            return False
+
+    return True
+
+
+def _apply(doc: dict, update: dict, inserting: bool = False) -> None:
+    for op, fields in update.items():
+        for key, value in fields.items():
+            if op == "$set" or (op == "$setOnInsert" and inserting):
+                _set(doc, key, copy.deepcopy(value))
+            elif op == "$inc":
+                _set(doc, key, (_get(doc, key) or 0) + value)
+            elif op == "$unset":
+                _set(doc, key, None)
+            elif op != "$setOnInsert":
+                raise NotImplementedError(f"{op} is not supported by the benchmark stand-in")
+
+
+def _get(doc: dict, key: str) -> Any:
+    for part in key.split("."):
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(part)
+    return doc
+
+
+def _set(doc: dict, key: str, value: Any) -> None:
+    *parents, last = key.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[last] = value
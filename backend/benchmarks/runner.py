@@ -0,0 +1,204 @@
+"""
+Runs the analytics pipeline stage by stage on generated datasets and
+records wall time and peak Python heap for each stage.
+"""
+import gc
+import os
+import platform
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+from bson import ObjectId
+
+from app.core.config import settings
+
+# Everything runs in this process; keep metrics in memory rather than on disk
+settings.METRICS_MULTIPROC_DIR = None
+
+from app.core import database  # noqa: E402
+from benchmarks.generators import write_csv  # noqa: E402
+from benchmarks.mongo import InMemoryDatabase  # noqa: E402
+
+STAGES = [
+    "load_csv",
+    "infer_schema",
+    "profile_dataset",
+    "ingest",
+    "recommend_charts",
+    "dashboard_cold",
+    "dashboard_warm",
+    "insights",
+]
+
+
+def configure(work_dir: str, stream: bool = False) -> InMemoryDatabase:
+    """
+    Point the app at a scratch data directory and an in-memory Mongo.
+
+    Must run before the services are imported: the dashboard cache picks
+    its shared tier at import time.
+    """
+    settings.DATA_DIR = Path(work_dir) / "data"
+    settings.DATASET_DIR = settings.DATA_DIR / "datasets"
+    settings.DASHBOARD_DIR = settings.DATA_DIR / "dashboards"
+    settings.DASHBOARD_CACHE_DIR = settings.DATA_DIR / "cache" / "dashboards"
+    settings.DASHBOARD_CACHE_SHARED_TIER = "none"
+
+    if stream:
+        settings.STREAMING_INGEST_THRESHOLD_MB = 0
+
+    db = InMemoryDatabase()
+    database._db = db
+    return db
+
+
+def run_scenario(
+    work_dir: str,
+    db: InMemoryDatabase,
+    rows: int,
+    columns: int,
+    seed: int = 0,
+    repeat: int = 1,
+    memory: bool = True
+) -> Dict[str, Any]:
+    from app.services.chart_recommender import recommend_charts
+    from app.services.dashboard_service import _dashboard_cache, generate_dashboard
+    from app.services.dataset_service import process_dataset
+    from app.services.insight_service import generate_insights
+    from app.services.profiling import profile_dataset
+    from app.services.schema_inference import infer_schema, normalize_columns
+
+    dataset_id = f"bench-{rows}x{columns}-{seed}"
+    dataset_dir = os.path.join(settings.DATASET_DIR, dataset_id)
+    os.makedirs(dataset_dir, exist_ok=True)
+
+    file_path = os.path.join(work_dir, f"{dataset_id}.csv")
+    if not os.path.exists(file_path):
+        write_csv(file_path, rows, columns, seed)
+
+    user_id = ObjectId()
+    db["users"].insert_one({"_id": user_id, "stats": {}})
+    db["datasets"].insert_one({
+        "dataset_id": dataset_id,
+        "user_id": str(user_id),
+        "status": "PROCESSING",
+    })
+    db.calls.clear()
+
+    def load_csv():
+        df = pd.read_csv(file_path)
+        df.columns = normalize_columns(df.columns)
+        return df
+
+    stages: Dict[str, Dict[str, float]] = {}
+
+    df = _measure(stages, "load_csv", load_csv, repeat=repeat, memory=memory)
+    schema = _measure(stages, "infer_schema", infer_schema, df, repeat=repeat, memory=memory)
+    profile = _measure(stages, "profile_dataset", profile_dataset, df, repeat=repeat, memory=memory)
+    del df
+
+    _measure(stages, "ingest", process_dataset, dataset_id, file_path, repeat=repeat, memory=memory)
+    _measure(stages, "recommend_charts", recommend_charts, schema, profile, repeat=repeat, memory=memory)
+    _measure(
+        stages, "dashboard_cold", generate_dashboard, dataset_id,
+        setup=_dashboard_cache.local.clear, repeat=repeat, memory=memory,
+    )
+    _measure(stages, "dashboard_warm", generate_dashboard, dataset_id, repeat=repeat, memory=memory)
+    _measure(stages, "insights", generate_insights, dataset_id, repeat=repeat, memory=memory)
+
+    return {
+        "name": f"{rows}x{columns}",
+        "rows": rows,
+        "columns": columns,
+        "seed": seed,
+        "file_mb": round(os.path.getsize(file_path) / (1024 * 1024), 2),
+        "stages": stages,
+        "mongo_calls": dict(sorted(db.calls.items())),
+    }
+
+
+def run(
+    sizes: List[tuple],
+    seed: int = 0,
+    repeat: int = 1,
+    memory: bool = True,
+    stream: bool = False,
+    work_dir: Optional[str] = None
+) -> Dict[str, Any]:
+    keep = work_dir is not None
+    work_dir = work_dir or tempfile.mkdtemp(prefix="insights-bench-")
+    os.makedirs(work_dir, exist_ok=True)
+
+    try:
+        db = configure(work_dir, stream=stream)
+        scenarios = [
+            run_scenario(work_dir, db, rows, columns, seed, repeat, memory)
+            for rows, columns in sizes
+        ]
+    finally:
+        if not keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "stream": stream,
+        },
+        "scenarios": scenarios,
+    }
+
+
+def _measure(
+    stages: Dict[str, Dict[str, float]],
+    name: str,
+    fn: Callable,
+    *args,
+    setup: Optional[Callable] = None,
+    repeat: int = 1,
+    memory: bool = True
+) -> Any:
+    """
+    Best-of-`repeat` wall time, then (optionally) one extra run under
+    tracemalloc for the peak: tracing slows allocation-heavy code, so it
+    never overlaps with the timed runs.
+    """
+    timings = []
+    result = None
+
+    for _ in range(max(repeat, 1)):
+        if setup:
+            setup()
+        gc.collect()
+
+        start = time.perf_counter()
+        result = fn(*args)
+        timings.append(time.perf_counter() - start)
+
+    stage = {"seconds": round(min(timings), 4)}
+
+    if memory:
+        if setup:
+            setup()
+        gc.collect()
+
+        tracemalloc.start()
+        try:
+            fn(*args)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        stage["peak_mb"] = round(peak / (1024 * 1024), 2)
+
+    stages[name] = stage
+    return result
@@ -0,0 +1,157 @@
+"""
+Shared fixtures. MongoDB is replaced by mongomock (with a thin async
+wrapper standing in for AsyncMongoClient), and every test gets its own
+DATA_DIR, so no test needs a running mongod or leaves files behind.
+"""
+from datetime import datetime
+
+import mongomock
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import app.core.database as database
+import app.core.storage as storage
+import app.services.dashboard_service as dashboard_service
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.services.dataset_service import process_dataset
+from app.services.query_service import _result_cache
+from app.services.user_service import _user_cache
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    data_dir = tmp_path / "data"
+    monkeypatch.setattr(settings, "DATA_DIR", data_dir)
+    monkeypatch.setattr(settings, "DATASET_DIR", data_dir / "datasets")
+    monkeypatch.setattr(settings, "DASHBOARD_DIR", data_dir / "dashboards")
+    monkeypatch.setattr(settings, "DASHBOARD_CACHE_DIR", data_dir / "cache" / "dashboards")
+    settings.DATASET_DIR.mkdir(parents=True)
+    settings.DASHBOARD_DIR.mkdir(parents=True)
+
+    # Module-level singletons built from the paths above
+    monkeypatch.setattr(storage, "_storage", None)
+    monkeypatch.setattr(dashboard_service, "_dashboard_cache", dashboard_service._build_dashboard_cache())
+    _result_cache.clear()
+    _user_cache.clear()
+
+    return data_dir
+
+
+@pytest.fixture
+def db(monkeypatch):
+    mongo = mongomock.MongoClient()["test"]
+    monkeypatch.setattr(database, "_db", mongo)
+    monkeypatch.setattr(database, "_async_db", _AsyncDatabase(mongo))
+    return mongo
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_WORKERS", 0)
+    from app.main import app
+
+    # Not entered as a context manager: startup/shutdown hooks stay off
+    return TestClient(app)
+
+
+@pytest.fixture
+def auth_headers(db):
+    user_id = db.users.insert_one({
+        "email": "analyst@example.com",
+        "hashed_password": "unused",
+        "is_active": True,
+        "profile": {"name": "Analyst"},
+        "stats": {"datasets_uploaded": 0, "dashboards_created": 0, "insights_generated": 0},
+        "created_at": datetime.utcnow(),
+    }).inserted_id
+    return {"Authorization": f"Bearer {create_access_token(str(user_id))}"}
+
+
+@pytest.fixture
+def sales_csv(tmp_path):
+    """Write a small sales CSV into the test's temp dir; returns (path, frame)."""
+    def write(name: str = "sales.csv", rows: int = 500, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        df = pd.DataFrame({
+            "Order Date": pd.date_range("2024-01-01", periods=rows, freq="h").astype(str),
+            "Region": rng.choice(["north", "south", "east", "west"], rows),
+            "Sales": rng.normal(100, 20, rows).round(2),
+            "Qty": rng.integers(1, 10, rows),
+        })
+        path = tmp_path / name
+        df.to_csv(path, index=False)
+        return path, df
+
+    return write
+
+
+@pytest.fixture
+def ready_dataset(client, auth_headers, db, sales_csv):
+    """Upload a CSV through the API and ingest it in-process; returns (dataset_id, frame)."""
+    path, df = sales_csv()
+
+    with open(path, "rb") as f:
+        response = client.post(
+            "/datasets/upload",
+            files={"file": (path.name, f, "text/csv")},
+            headers=auth_headers,
+        )
+    dataset_id = response.json()["dataset_id"]
+
+    job = db.jobs.find_one({"dataset_id": dataset_id})
+    process_dataset(dataset_id, job["file_path"])
+
+    return dataset_id, df
+
+
+class _AsyncCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self._cursor = self._cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, limit):
+        self._cursor = self._cursor.limit(limit)
+        return self
+
+    async def to_list(self, length=None):
+        docs = list(self._cursor)
+        return docs[:length] if length else docs
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._cursor)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class _AsyncCollection:
+    def __init__(self, collection):
+        self._collection = collection
+
+    def find(self, *args, **kwargs):
+        return _AsyncCursor(self._collection.find(*args, **kwargs))
+
+    def __getattr__(self, name):
+        method = getattr(self._collection, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+
+        return call
+
+
+class _AsyncDatabase:
+    def __init__(self, db):
+        self._db = db
+
+    def __getitem__(self, name):
+        return _AsyncCollection(self._db[name])
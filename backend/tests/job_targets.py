@@ -0,0 +1,21 @@
+"""
+Ingest stand-ins for JobExecutor tests. They run in forkserver children,
+so they live in an importable module and take their instructions from
+the job's file_path: "ok", "fail-once:<marker>" or "sleep:<seconds>:<pid file>".
+"""
+import os
+import time
+
+
+def run(dataset_id: str, file_path: str, final_attempt: bool) -> None:
+    action, _, arg = file_path.partition(":")
+
+    if action == "fail-once" and not os.path.exists(arg):
+        open(arg, "w").close()
+        raise SystemExit(2)
+
+    if action == "sleep":
+        seconds, pid_path = arg.split(":", 1)
+        with open(pid_path, "w") as f:
+            f.write(str(os.getpid()))
+        time.sleep(float(seconds))
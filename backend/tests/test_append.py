@@ -0,0 +1,101 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from app.core.storage import dataset_prefix, get_storage
+from app.services import dataset_service
+from app.services.columnar_store import columnar_paths
+from app.services.dataset_service import append_dataset
+
+
+def append(client, auth_headers, dataset_id, name, content, content_type="text/csv"):
+    return client.post(
+        f"/datasets/{dataset_id}/append",
+        files={"file": (name, content, content_type)},
+        headers=auth_headers,
+    )
+
+
+def dataset_dir(dataset_id):
+    return get_storage().path(dataset_prefix(dataset_id))
+
+
+def read_json(dataset_id, filename):
+    with open(f"{dataset_dir(dataset_id)}/{filename}") as f:
+        return json.load(f)
+
+
+def test_matching_delta_updates_row_count_and_profile(client, auth_headers, ready_dataset, sales_csv):
+    dataset_id, base = ready_dataset
+    path, delta = sales_csv("delta.csv", rows=120, seed=1)
+
+    response = append(client, auth_headers, dataset_id, "delta.csv", path.read_bytes())
+
+    assert response.status_code == 200
+    assert response.json()["rows_appended"] == 120
+    assert response.json()["row_count"] == 620
+
+    sales = pd.concat([base["Sales"], delta["Sales"]])
+    stats = read_json(dataset_id, "profile.json")["numeric"]["sales"]
+    assert stats["mean"] == pytest.approx(sales.mean())
+    assert (stats["min"], stats["max"]) == (sales.min(), sales.max())
+    assert len(columnar_paths(dataset_dir(dataset_id))) == 2
+
+
+def test_schema_mismatch_is_rejected(client, auth_headers, ready_dataset, sales_csv):
+    dataset_id, _ = ready_dataset
+    path, delta = sales_csv("delta.csv", rows=10)
+    delta.drop(columns=["Qty"]).assign(Discount=0.1).to_csv(path, index=False)
+
+    response = append(client, auth_headers, dataset_id, "delta.csv", path.read_bytes())
+
+    assert response.status_code == 400
+    assert "missing: ['qty']" in response.json()["detail"]
+    assert len(columnar_paths(dataset_dir(dataset_id))) == 1
+
+
+@pytest.mark.parametrize("name, content", [
+    ("delta.csv", b"\xff\xfe\x00\x81 not text"),
+    ("delta.csv", b'order_date,region\n"2024-01-01,north\n'),
+    ("delta.txt", b"order_date,region,sales,qty\n"),
+])
+def test_unreadable_file_is_rejected(client, auth_headers, ready_dataset, name, content):
+    dataset_id, _ = ready_dataset
+
+    response = append(client, auth_headers, dataset_id, name, content)
+
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Could not read the file")
+
+
+def test_failed_append_leaves_the_dataset_as_it_was(ready_dataset, sales_csv, monkeypatch):
+    dataset_id, _ = ready_dataset
+    directory = dataset_dir(dataset_id)
+    path, _ = sales_csv("delta.csv", rows=50, seed=2)
+
+    before = {
+        name: open(f"{directory}/{name}", "rb").read()
+        for name in ("schema.json", "profile.json", "metadata.json", "rollups/manifest.json")
+    }
+
+    save_json = dataset_service._save_json
+
+    def fail_on_profile(dataset_dir, filename, data):
+        if filename == "profile.json":
+            raise OSError("disk full")
+        save_json(dataset_dir, filename, data)
+
+    monkeypatch.setattr(dataset_service, "_save_json", fail_on_profile)
+    with pytest.raises(OSError):
+        append_dataset(dataset_id, str(path), "delta-hash")
+
+    assert len(columnar_paths(directory)) == 1
+    for name, content in before.items():
+        assert open(f"{directory}/{name}", "rb").read() == content
+    assert os.listdir(os.path.dirname(directory)) == [dataset_id]
+
+    # Nothing of the failed attempt is counted by the next append
+    monkeypatch.setattr(dataset_service, "_save_json", save_json)
+    assert append_dataset(dataset_id, str(path), "delta-hash")["row_count"] == 550
@@ -0,0 +1,84 @@
+import os
+import time
+
+import pytest
+
+from app.core.cache import ByteLRUCache, DiskCacheTier, TieredCache
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return tmp_path / "cache"
+
+
+def age(path, seconds):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_disk_tier_sweeps_expired_entries_of_other_keys(cache_dir):
+    tier = DiskCacheTier(cache_dir, ttl=60, max_bytes=10_000, sweep_interval=0)
+    tier.set("orphaned", b"x" * 10)
+    age(cache_dir / "orphaned", 120)
+
+    tier.set("fresh", b"y" * 10)
+
+    assert sorted(os.listdir(cache_dir)) == ["fresh"]
+
+
+def test_disk_tier_evicts_oldest_written_beyond_max_bytes(cache_dir):
+    tier = DiskCacheTier(cache_dir, ttl=3600, max_bytes=250, sweep_interval=0)
+
+    for i, key in enumerate(["a", "b", "c"]):
+        tier.set(key, b"x" * 100)
+        age(cache_dir / key, 30 - i)
+
+    assert tier.get("a") is None
+    assert tier.get("b") == tier.get("c") == b"x" * 100
+
+
+def test_disk_tier_sweeps_at_most_once_per_interval(cache_dir):
+    tier = DiskCacheTier(cache_dir, ttl=3600, max_bytes=150, sweep_interval=300)
+
+    tier.set("a", b"x" * 100)
+    tier.set("b", b"x" * 100)
+
+    assert sorted(os.listdir(cache_dir)) == ["a", "b"]
+
+
+def test_disk_tier_skips_payloads_larger_than_the_bound(cache_dir):
+    tier = DiskCacheTier(cache_dir, ttl=3600, max_bytes=50)
+
+    tier.set("big", b"x" * 100)
+
+    assert tier.get("big") is None
+
+
+def test_tiered_cache_fills_local_tier_from_shared_hits(cache_dir):
+    shared = DiskCacheTier(cache_dir, ttl=3600, max_bytes=10_000)
+    TieredCache(ByteLRUCache(10_000, 3600), shared).set("key", {"widgets": [1, 2]})
+
+    # Another worker: empty local tier, same directory
+    other = TieredCache(ByteLRUCache(10_000, 3600), shared)
+    value = other.get("key")
+    value["widgets"].append(3)
+
+    assert other.local.get("key") is not None
+    assert other.get("key") == {"widgets": [1, 2]}
+
+    other.invalidate("key")
+    assert other.get("key") is None
+    assert shared.get("key") is None
+
+
+def test_byte_lru_evicts_least_recently_used_by_size():
+    cache = ByteLRUCache(max_bytes=250, ttl=3600)
+    cache.set("a", b"x" * 100)
+    cache.set("b", b"x" * 100)
+    cache.get("a")
+
+    cache.set("c", b"x" * 100)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.size == 200
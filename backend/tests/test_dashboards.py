@@ -0,0 +1,76 @@
+import json
+
+from app.core.files import store_artifact
+from app.core.storage import dashboard_key, get_storage
+from app.models.dashboard import DashboardResponse
+from app.models.insights import InsightResponse
+from app.services.insight_service import insights_key
+
+
+def create_dashboard(client, auth_headers, dataset_id):
+    response = client.post("/dashboards/", params={"dataset_id": dataset_id}, headers=auth_headers)
+    assert response.status_code == 200
+    return response.json()["dashboard_id"]
+
+
+def stored_bytes(key):
+    with open(get_storage().path(key), "rb") as f:
+        return f.read()
+
+
+def test_dashboard_is_streamed_as_stored(client, auth_headers, ready_dataset):
+    dataset_id, _ = ready_dataset
+    dashboard_id = create_dashboard(client, auth_headers, dataset_id)
+
+    response = client.get(f"/dashboards/{dashboard_id}", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.content == stored_bytes(dashboard_key(dashboard_id))
+
+    # Written in the response model's shape, so nothing is lost by skipping validation
+    body = response.json()
+    assert DashboardResponse.model_validate(body).model_dump(mode="json") == body
+    assert body["dataset_id"] == dataset_id
+
+
+def test_dashboard_by_dataset_matches_dashboard(client, auth_headers, ready_dataset):
+    dataset_id, _ = ready_dataset
+    dashboard_id = create_dashboard(client, auth_headers, dataset_id)
+
+    by_dataset = client.get(f"/dashboards/by-dataset/{dataset_id}", headers=auth_headers)
+    by_id = client.get(f"/dashboards/{dashboard_id}", headers=auth_headers)
+
+    assert by_dataset.content == by_id.content
+
+
+def test_artifact_is_validated_when_stored():
+    key = insights_key("ds-1")
+
+    payload = store_artifact(key, InsightResponse, {
+        "dataset_id": "ds-1",
+        "insights": [],
+        "summary": "quiet month",
+        "ignored": "dropped by the model",
+    })
+
+    assert payload == stored_bytes(key)
+    assert "ignored" not in json.loads(payload)
+
+
+def test_insights_are_streamed_as_generated(client, auth_headers, ready_dataset):
+    dataset_id, _ = ready_dataset
+
+    generated = client.post("/insights/generate", params={"dataset_id": dataset_id}, headers=auth_headers)
+    stored = client.get(f"/insights/{dataset_id}", headers=auth_headers)
+
+    assert generated.status_code == stored.status_code == 200
+    assert stored.content == generated.content
+    body = json.loads(stored.content)
+    assert InsightResponse.model_validate(body).model_dump(mode="json") == body
+
+
+def test_unknown_dashboard_is_not_found(client, auth_headers):
+    response = client.get("/dashboards/missing", headers=auth_headers)
+
+    assert response.status_code == 404
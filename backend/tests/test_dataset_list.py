@@ -0,0 +1,87 @@
+import re
+
+import pytest
+from bson import ObjectId
+
+from app.core.config import settings
+from app.core.jobs import READY
+
+
+def add_datasets(db, count: int) -> list:
+    user_id = db.users.find_one({})["_id"]
+    ids = [f"ds-{i}" for i in range(count)]
+
+    db.datasets.insert_many([
+        {
+            "dataset_id": dataset_id,
+            "user_id": str(user_id),
+            "filename": f"{dataset_id}.csv",
+            "status": "READY",
+            "job_status": READY,
+        }
+        for dataset_id in ids
+    ])
+
+    return ids
+
+
+@pytest.fixture
+def datasets(db, auth_headers):
+    ids = add_datasets(db, 5)
+
+    # Someone else's dataset never shows up
+    db.datasets.insert_one({
+        "dataset_id": "other",
+        "user_id": str(ObjectId()),
+        "filename": "other.csv",
+        "status": "READY",
+    })
+
+    return ids
+
+
+def next_link(response):
+    match = re.match(r'<([^>]+)>; rel="next"', response.headers.get("link", ""))
+    return match.group(1) if match else None
+
+
+def test_unpaged_request_returns_every_dataset(client, auth_headers, db):
+    # More than a page, as the web UI doesn't follow Link headers
+    ids = add_datasets(db, settings.DATASET_PAGE_SIZE + 5)
+
+    response = client.get("/datasets/", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert [d["dataset_id"] for d in response.json()] == ids
+    assert next_link(response) is None
+
+
+def test_pages_follow_the_next_link(client, auth_headers, datasets):
+    seen, pages = [], 0
+    url = "/datasets/?limit=2"
+
+    while url:
+        response = client.get(url, headers=auth_headers)
+        assert response.status_code == 200
+
+        page = [d["dataset_id"] for d in response.json()]
+        assert len(page) <= 2
+        seen.extend(page)
+        pages += 1
+        url = next_link(response)
+
+    assert seen == datasets
+    assert pages == 3
+
+
+def test_exact_last_page_has_no_next_link(client, auth_headers, datasets):
+    response = client.get("/datasets/?limit=5", headers=auth_headers)
+
+    assert len(response.json()) == 5
+    assert next_link(response) is None
+
+
+def test_invalid_cursor_is_rejected(client, auth_headers, datasets):
+    response = client.get("/datasets/?cursor=not-an-id", headers=auth_headers)
+
+    assert response.status_code == 400
@@ -0,0 +1,120 @@
+import json
+
+import pytest
+
+from app.core.compression import _accepted_encodings
+from app.core.files import store_artifact
+from app.core.storage import dashboard_key
+from app.models.dashboard import DashboardResponse
+
+
+def get(client, auth_headers, url, **headers):
+    return client.get(url, headers={**auth_headers, **headers})
+
+
+@pytest.fixture
+def dashboard_id(client, auth_headers, ready_dataset):
+    dataset_id, _ = ready_dataset
+    response = client.post("/dashboards/", params={"dataset_id": dataset_id}, headers=auth_headers)
+    return response.json()["dashboard_id"]
+
+
+@pytest.mark.parametrize("url", ["/datasets/{id}", "/datasets/", "/dashboards/by-dataset/{id}"])
+def test_matching_etag_gets_empty_304(client, auth_headers, ready_dataset, url):
+    dataset_id, _ = ready_dataset
+    url = url.format(id=dataset_id)
+
+    first = get(client, auth_headers, url)
+    etag = first.headers["etag"]
+    revalidated = get(client, auth_headers, url, **{"If-None-Match": etag})
+
+    assert first.status_code == 200
+    assert etag.startswith('W/"')
+    assert first.headers["cache-control"] == "private, no-cache"
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+
+
+def test_stale_etag_gets_full_response(client, auth_headers, ready_dataset):
+    dataset_id, _ = ready_dataset
+
+    response = get(client, auth_headers, f"/datasets/{dataset_id}", **{"If-None-Match": 'W/"stale"'})
+
+    assert response.status_code == 200
+    assert response.json()["dataset_id"] == dataset_id
+
+
+def test_etag_comparison_is_weak_and_accepts_lists(client, auth_headers, ready_dataset):
+    dataset_id, _ = ready_dataset
+    url = f"/datasets/{dataset_id}"
+    etag = get(client, auth_headers, url).headers["etag"]
+
+    strong = get(client, auth_headers, url, **{"If-None-Match": etag.removeprefix("W/")})
+    listed = get(client, auth_headers, url, **{"If-None-Match": f'W/"other", {etag}'})
+    star = get(client, auth_headers, url, **{"If-None-Match": "*"})
+
+    assert (strong.status_code, listed.status_code, star.status_code) == (304, 304, 304)
+
+
+def test_dataset_etag_changes_with_status(client, auth_headers, ready_dataset, db):
+    dataset_id, _ = ready_dataset
+    url = f"/datasets/{dataset_id}"
+    etag = get(client, auth_headers, url).headers["etag"]
+
+    db.datasets.update_one({"dataset_id": dataset_id}, {"$set": {"status": "FAILED", "error": "boom"}})
+    response = get(client, auth_headers, url, **{"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["status"] == "FAILED"
+
+
+def test_rewritten_artifact_gets_new_etag(client, auth_headers, dashboard_id):
+    url = f"/dashboards/{dashboard_id}"
+    first = get(client, auth_headers, url)
+
+    store_artifact(dashboard_key(dashboard_id), DashboardResponse, first.json())
+    response = get(client, auth_headers, url, **{"If-None-Match": first.headers["etag"]})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != first.headers["etag"]
+    assert response.content == first.content
+
+
+def test_artifact_range_is_served(client, auth_headers, dashboard_id):
+    url = f"/dashboards/{dashboard_id}"
+    full = get(client, auth_headers, url, **{"Accept-Encoding": "identity"})
+
+    partial = get(client, auth_headers, url, **{"Accept-Encoding": "identity", "Range": "bytes=0-9"})
+
+    assert partial.status_code == 206
+    assert partial.content == full.content[:10]
+
+
+@pytest.mark.parametrize("accept, encoding", [
+    ("gzip, deflate, br", "br"),
+    ("gzip", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("identity", None),
+])
+def test_large_bodies_are_compressed_as_negotiated(client, auth_headers, dashboard_id, accept, encoding):
+    response = get(client, auth_headers, f"/dashboards/{dashboard_id}", **{"Accept-Encoding": accept})
+
+    assert response.status_code == 200
+    assert response.headers.get("content-encoding") == encoding
+    assert "Accept-Encoding" in response.headers["vary"]
+    # httpx decodes the body, so this also checks it round-trips
+    assert json.loads(response.content)["dashboard_id"] == dashboard_id
+
+
+@pytest.mark.parametrize("accept", ["br", "gzip"])
+def test_small_bodies_are_sent_as_is(client, accept):
+    response = client.get("/health", headers={"Accept-Encoding": accept})
+
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+
+
+def test_refused_encodings_are_not_accepted():
+    assert _accepted_encodings("gzip;q=0.5, br;q=0, identity") == {"gzip", "identity"}
@@ -0,0 +1,239 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo.errors import AutoReconnect
+
+import job_targets
+from app.core import jobs
+from app.core.config import settings
+
+
+@pytest.fixture(autouse=True)
+def fast_queue(monkeypatch):
+    monkeypatch.setattr(settings, "JOB_POLL_INTERVAL_SECONDS", 0.05)
+    monkeypatch.setattr(settings, "JOB_LEASE_SECONDS", 3)
+    monkeypatch.setattr(settings, "JOB_RETRY_BACKOFF_SECONDS", 0.2)
+    monkeypatch.setattr(settings, "JOB_MAX_ATTEMPTS", 3)
+
+
+@pytest.fixture
+def executor(db):
+    executors = []
+
+    def start(timeout: float = 30, worker_id: str = "worker-1") -> jobs.JobExecutor:
+        executor = jobs.JobExecutor(job_targets.run, max_workers=1, timeout=timeout, worker_id=worker_id)
+        executor.start()
+        executors.append(executor)
+        return executor
+
+    yield start
+
+    for executor in executors:
+        executor.shutdown()
+
+
+def add_dataset(db, dataset_id: str) -> None:
+    db.datasets.insert_one({
+        "dataset_id": dataset_id,
+        "user_id": "user-1",
+        "status": "PROCESSING",
+        "job_status": jobs.QUEUED,
+    })
+
+
+def wait_for_job(db, dataset_id: str, state: str, timeout: float = 20) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = db.jobs.find_one({"dataset_id": dataset_id})
+        if job and job["state"] == state:
+            return job
+        time.sleep(0.05)
+
+    raise AssertionError(f"job for {dataset_id} is {job and job['state']}, not {state}")
+
+
+def test_claimed_job_runs_to_ready(db, executor):
+    add_dataset(db, "ds-1")
+    jobs.enqueue_dataset_job("ds-1", "ok")
+    executor()
+
+    job = wait_for_job(db, "ds-1", jobs.READY)
+
+    assert job["attempts"] == 1
+    assert job["lease_owner"] is None
+    assert db.datasets.find_one({"dataset_id": "ds-1"})["job_status"] == jobs.READY
+
+
+def test_failed_attempt_is_retried_after_backoff(db, executor, tmp_path):
+    add_dataset(db, "ds-1")
+    jobs.enqueue_dataset_job("ds-1", f"fail-once:{tmp_path / 'failed'}")
+    executor()
+
+    job = wait_for_job(db, "ds-1", jobs.READY)
+
+    assert job["attempts"] == 2
+    assert job["error"] == "Processing exited with code 2"
+
+
+def test_expired_lease_is_reclaimed_by_another_worker(db, executor):
+    add_dataset(db, "ds-1")
+    jobs.enqueue_dataset_job("ds-1", "ok")
+    # Claimed by a worker that died without releasing it
+    db.jobs.update_one({"dataset_id": "ds-1"}, {"$set": {
+        "state": jobs.RUNNING,
+        "attempts": 1,
+        "lease_owner": "dead-worker",
+        "lease_expires_at": datetime.utcnow() - timedelta(seconds=1),
+    }})
+    executor()
+
+    job = wait_for_job(db, "ds-1", jobs.READY)
+
+    assert job["attempts"] == 2
+
+
+def test_live_lease_is_not_reclaimed(db, executor):
+    add_dataset(db, "ds-1")
+    jobs.enqueue_dataset_job("ds-1", "ok")
+    db.jobs.update_one({"dataset_id": "ds-1"}, {"$set": {
+        "state": jobs.RUNNING,
+        "attempts": 1,
+        "lease_owner": "busy-worker",
+        "lease_expires_at": datetime.utcnow() + timedelta(minutes=5),
+    }})
+    executor()
+    time.sleep(0.5)
+
+    job = db.jobs.find_one({"dataset_id": "ds-1"})
+    assert (job["state"], job["lease_owner"]) == (jobs.RUNNING, "busy-worker")
+
+
+def test_lost_final_attempt_is_reaped_as_failed(db, executor):
+    add_dataset(db, "ds-1")
+    jobs.enqueue_dataset_job("ds-1", "ok")
+    db.jobs.update_one({"dataset_id": "ds-1"}, {"$set": {
+        "state": jobs.RUNNING,
+        "attempts": 3,
+        "lease_owner": "dead-worker",
+        "lease_expires_at": datetime.utcnow() - timedelta(seconds=1),
+    }})
+    executor()
+
+    job = wait_for_job(db, "ds-1", jobs.FAILED)
+
+    assert job["error"] == "Worker lost during final attempt"
+    dataset = db.datasets.find_one({"dataset_id": "ds-1"})
+    assert (dataset["status"], dataset["job_status"]) == ("FAILED", jobs.FAILED)
+
+
+def test_failing_a_dataset_clears_its_stage(db):
+    add_dataset(db, "ds-1")
+    db.datasets.update_one({"dataset_id": "ds-1"}, {"$set": {"stage": "profiling"}})
+    jobs.enqueue_dataset_job("ds-1", "ok")
+
+    assert jobs.cancel_dataset_job("ds-1")
+
+    dataset = db.datasets.find_one({"dataset_id": "ds-1"})
+    assert (dataset["status"], dataset["stage"]) == ("FAILED", None)
+    assert dataset["error"] == "Processing cancelled"
+
+
+def test_supervisor_survives_mongo_errors(db, executor, monkeypatch):
+    reap = jobs._reap_exhausted_jobs
+    calls = []
+
+    def flaky_reap():
+        calls.append(1)
+        if len(calls) == 1:
+            raise AutoReconnect("primary stepped down")
+        reap()
+
+    monkeypatch.setattr(jobs, "_reap_exhausted_jobs", flaky_reap)
+    executor()
+
+    # Enqueued after the failed reap, so the supervisor must still be polling
+    deadline = time.monotonic() + 5
+    while not calls and time.monotonic() < deadline:
+        time.sleep(0.05)
+    add_dataset(db, "ds-1")
+    jobs.enqueue_dataset_job("ds-1", "ok")
+
+    wait_for_job(db, "ds-1", jobs.READY)
+
+
+def test_child_is_terminated_when_monitoring_fails(db, monkeypatch, tmp_path):
+    monkeypatch.setattr(jobs, "_heartbeat_interval", lambda: 0.1)
+
+    def lost_connection(self, job):
+        raise AutoReconnect("connection reset")
+
+    monkeypatch.setattr(jobs.JobExecutor, "_heartbeat", lost_connection)
+
+    pid_path = tmp_path / "pid"
+    add_dataset(db, "ds-1")
+    jobs.enqueue_dataset_job("ds-1", f"sleep:60:{pid_path}")
+
+    executor = jobs.JobExecutor(job_targets.run, max_workers=1, timeout=30, worker_id="worker-1")
+    job = executor._claim()
+
+    with pytest.raises(AutoReconnect):
+        executor._run(job)
+
+    # Handing the job back must not leave the child writing the dataset
+    with pytest.raises(ProcessLookupError):
+        os.kill(int(pid_path.read_text()), 0)
+
+
+def wait_for_pid(pid_path, timeout: float = 10) -> int:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if pid_path.exists() and pid_path.read_text():
+            return int(pid_path.read_text())
+        time.sleep(0.05)
+
+    raise AssertionError(f"child never wrote {pid_path}")
+
+
+def test_job_past_its_timeout_is_killed_and_failed(db, executor, tmp_path):
+    pid_path = tmp_path / "pid"
+    add_dataset(db, "ds-1")
+    jobs.enqueue_dataset_job("ds-1", f"sleep:60:{pid_path}")
+    executor(timeout=1)
+
+    job = wait_for_job(db, "ds-1", jobs.FAILED)
+
+    # Timeouts are not retried
+    assert (job["attempts"], job["error"]) == (1, "Processing timed out after 1s")
+    assert db.datasets.find_one({"dataset_id": "ds-1"})["error"] == "Processing timed out after 1s"
+    with pytest.raises(ProcessLookupError):
+        os.kill(wait_for_pid(pid_path), 0)
+
+
+def test_running_job_is_cancelled_at_its_next_heartbeat(db, executor, monkeypatch, tmp_path):
+    monkeypatch.setattr(jobs, "_heartbeat_interval", lambda: 0.1)
+    pid_path = tmp_path / "pid"
+    add_dataset(db, "ds-1")
+    jobs.enqueue_dataset_job("ds-1", f"sleep:60:{pid_path}")
+    executor()
+    pid = wait_for_pid(pid_path)
+
+    assert jobs.cancel_dataset_job("ds-1")
+    job = wait_for_job(db, "ds-1", jobs.FAILED)
+
+    assert (job["attempts"], job["error"]) == (1, "Processing cancelled")
+    dataset = db.datasets.find_one({"dataset_id": "ds-1"})
+    assert (dataset["status"], dataset["error"]) == ("FAILED", "Processing cancelled")
+    with pytest.raises(ProcessLookupError):
+        os.kill(pid, 0)
+
+
+def test_finished_job_cannot_be_cancelled(db, executor):
+    add_dataset(db, "ds-1")
+    jobs.enqueue_dataset_job("ds-1", "ok")
+    executor()
+    wait_for_job(db, "ds-1", jobs.READY)
+
+    assert not jobs.cancel_dataset_job("ds-1")
+    assert db.datasets.find_one({"dataset_id": "ds-1"})["job_status"] == jobs.READY
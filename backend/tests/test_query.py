@@ -0,0 +1,125 @@
+import pytest
+
+from app.services import query_service
+
+
+def query(client, auth_headers, dataset_id, body):
+    return client.post(f"/datasets/{dataset_id}/query", json=body, headers=auth_headers)
+
+
+def test_grouped_aggregation_matches_pandas(client, auth_headers, ready_dataset):
+    dataset_id, df = ready_dataset
+
+    response = query(client, auth_headers, dataset_id, {
+        "filters": [{"column": "qty", "op": "gte", "value": 3}],
+        "group_by": ["region"],
+        "aggregations": [
+            {"func": "count"},
+            {"func": "sum", "column": "sales", "alias": "revenue"},
+        ],
+        "sort": [{"column": "revenue", "descending": True}],
+    })
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["columns"] == ["region", "count", "revenue"]
+
+    expected = df[df["Qty"] >= 3].groupby("Region")["Sales"].agg(["size", "sum"])
+    expected = expected.sort_values("sum", ascending=False)
+    assert [row["region"] for row in body["rows"]] == list(expected.index)
+    assert [row["count"] for row in body["rows"]] == list(expected["size"])
+    assert [row["revenue"] for row in body["rows"]] == pytest.approx(list(expected["sum"]))
+
+
+def test_row_selection_is_limited_and_keeps_uploaded_datetimes(client, auth_headers, ready_dataset):
+    dataset_id, df = ready_dataset
+
+    response = query(client, auth_headers, dataset_id, {
+        "filters": [{"column": "region", "op": "in", "value": ["north", "south"]}],
+        "columns": ["order_date", "region"],
+        "limit": 5,
+    })
+
+    assert response.status_code == 200
+    body = response.json()
+    selected = df[df["Region"].isin(["north", "south"])]
+    assert (body["total_rows"], body["truncated"]) == (len(selected), True)
+    assert [row["order_date"] for row in body["rows"]] == list(selected["Order Date"][:5])
+
+
+@pytest.mark.parametrize("body, detail", [
+    ({"columns": ["discount"]}, "Unknown columns: discount"),
+    ({"group_by": ["region"]}, "group_by requires at least one aggregation"),
+    ({"aggregations": [{"func": "sum"}]}, "sum needs a column"),
+    ({"aggregations": [{"func": "mean", "column": "region"}]}, "mean needs a numeric column, got region"),
+    (
+        {"aggregations": [{"func": "max", "column": "sales"}, {"func": "max", "column": "sales"}]},
+        "Output column names must be unique; set an alias",
+    ),
+    ({"columns": ["region"], "sort": [{"column": "sales"}]}, "Cannot sort by: sales"),
+    ({"filters": [{"column": "sales", "op": "gt", "value": "lots"}]}, "Invalid value for sales: 'lots'"),
+    ({"filters": [{"column": "region", "op": "in", "value": "north"}]}, "in on region needs a list value"),
+])
+def test_invalid_query_is_rejected(client, auth_headers, ready_dataset, body, detail):
+    dataset_id, _ = ready_dataset
+
+    response = query(client, auth_headers, dataset_id, body)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == detail
+
+
+def test_unknown_function_fails_validation(client, auth_headers, ready_dataset):
+    dataset_id, _ = ready_dataset
+
+    response = query(client, auth_headers, dataset_id, {"aggregations": [{"func": "median", "column": "sales"}]})
+
+    assert response.status_code == 422
+
+
+def test_repeated_query_is_served_from_cache(client, auth_headers, ready_dataset, monkeypatch):
+    dataset_id, _ = ready_dataset
+    body = {
+        "filters": [
+            {"column": "qty", "op": "gt", "value": 2},
+            {"column": "region", "op": "ne", "value": "east"},
+        ],
+        "aggregations": [{"func": "mean", "column": "sales"}],
+    }
+    first = query(client, auth_headers, dataset_id, body)
+
+    def no_load(*args, **kwargs):
+        raise AssertionError("cached query loaded the dataset")
+
+    monkeypatch.setattr(query_service, "load_columnar", no_load)
+    # Filters are ANDed, so the same filters in another order hit the same entry
+    body["filters"].reverse()
+    second = query(client, auth_headers, dataset_id, body)
+
+    assert second.status_code == 200
+    assert second.json() == first.json()
+
+
+def test_append_invalidates_cached_results(client, auth_headers, ready_dataset, sales_csv):
+    dataset_id, _ = ready_dataset
+    body = {"aggregations": [{"func": "count"}]}
+    assert query(client, auth_headers, dataset_id, body).json()["rows"] == [{"count": 500}]
+
+    path, _ = sales_csv("delta.csv", rows=20, seed=1)
+    client.post(
+        f"/datasets/{dataset_id}/append",
+        files={"file": ("delta.csv", path.read_bytes(), "text/csv")},
+        headers=auth_headers,
+    )
+
+    assert query(client, auth_headers, dataset_id, body).json()["rows"] == [{"count": 520}]
+
+
+def test_dataset_that_is_not_ready_cannot_be_queried(client, auth_headers, ready_dataset, db):
+    dataset_id, _ = ready_dataset
+    db.datasets.update_one({"dataset_id": dataset_id}, {"$set": {"status": "PROCESSING"}})
+
+    response = query(client, auth_headers, dataset_id, {})
+
+    assert response.status_code == 409
+
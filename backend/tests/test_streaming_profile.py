@@ -0,0 +1,59 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.services.column_stats import analyze_dataset
+from app.services.schema_inference import normalize_columns
+from app.services.streaming_ingest import stream_dataset
+
+
+def _in_memory_profile(file_path: str) -> dict:
+    df = pd.read_csv(file_path)
+    df.columns = normalize_columns(df.columns)
+    _, profile = analyze_dataset(df)
+    return profile
+
+
+def _as_json(value):
+    return json.loads(json.dumps(value, default=str))
+
+
+def test_column_retyped_late_matches_in_memory_profile(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_CHUNK_ROWS", 500)
+
+    # 100 zip codes with distinct frequencies, so top values have no ties
+    zips = np.repeat(np.arange(10000, 10100), np.arange(1, 101)).astype(object)
+    np.random.default_rng(0).shuffle(zips)
+
+    zips[3] = None          # first chunk parses as float64
+    zips[4500] = "A1234"    # only a late chunk parses as object
+
+    file_path = tmp_path / "zips.csv"
+    pd.DataFrame({"zip": zips, "amount": np.arange(len(zips))}).to_csv(file_path, index=False)
+
+    dataset_dir = tmp_path / "dataset"
+    dataset_dir.mkdir()
+    _, streamed = stream_dataset(str(file_path), str(dataset_dir))
+
+    expected = _as_json(_in_memory_profile(str(file_path))["categorical"]["zip"])
+    actual = _as_json(streamed["categorical"]["zip"])
+
+    assert actual["unique_count"] == expected["unique_count"] == 101
+    assert actual["top_values"] == expected["top_values"]
+
+
+def test_top_values_report_lower_bounds_once_counters_evict(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "INGEST_CHUNK_ROWS", 500)
+    monkeypatch.setattr(settings, "STREAMING_TOP_K_CAPACITY", 100)
+
+    file_path = tmp_path / "dates.csv"
+    dates = pd.date_range("2000-01-01", periods=2000, freq="h").astype(str)
+    pd.DataFrame({"ts": dates}).to_csv(file_path, index=False)
+
+    dataset_dir = tmp_path / "dataset"
+    dataset_dir.mkdir()
+    _, streamed = stream_dataset(str(file_path), str(dataset_dir))
+
+    assert set(streamed["categorical"]["ts"]["top_values"].values()) == {1}
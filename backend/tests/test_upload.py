@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+
+import pytest
+
+from app.core.config import settings
+from app.core.storage import dataset_prefix, get_storage
+
+
+def upload(client, auth_headers, name, content, content_type="text/csv"):
+    return client.post(
+        "/datasets/upload",
+        files={"file": (name, content, content_type)},
+        headers=auth_headers,
+    )
+
+
+def read_json(dataset_id, filename):
+    with open(os.path.join(get_storage().path(dataset_prefix(dataset_id)), filename)) as f:
+        return json.load(f)
+
+
+def test_upload_is_hashed_and_queued(client, auth_headers, db, sales_csv):
+    path, _ = sales_csv()
+    content = path.read_bytes()
+
+    response = upload(client, auth_headers, "sales.csv", content)
+
+    assert response.status_code == 200
+    assert (response.json()["status"], response.json()["job_status"]) == ("PROCESSING", "QUEUED")
+    dataset = db.datasets.find_one({"dataset_id": response.json()["dataset_id"]})
+    assert dataset["content_hash"] == hashlib.sha256(content).hexdigest()
+    assert db.jobs.count_documents({"dataset_id": dataset["dataset_id"]}) == 1
+
+
+def test_same_bytes_reuse_processed_dataset(client, auth_headers, db, ready_dataset, sales_csv):
+    source_id, _ = ready_dataset
+    path, _ = sales_csv()
+
+    response = upload(client, auth_headers, "copy.csv", path.read_bytes())
+
+    assert response.status_code == 200
+    dataset_id = response.json()["dataset_id"]
+    assert response.json()["status"] == "READY"
+    assert db.datasets.find_one({"dataset_id": dataset_id})["deduplicated_from"] == source_id
+    assert db.jobs.count_documents({"dataset_id": dataset_id}) == 0
+
+    assert read_json(dataset_id, "profile.json") == read_json(source_id, "profile.json")
+    assert read_json(dataset_id, "metadata.json")["dataset_id"] == dataset_id
+
+    count = {"aggregations": [{"func": "count"}]}
+    query = client.post(f"/datasets/{dataset_id}/query", json=count, headers=auth_headers)
+    assert query.json()["rows"] == [{"count": 500}]
+
+
+def test_appending_to_a_copy_leaves_its_source_alone(client, auth_headers, ready_dataset, sales_csv):
+    source_id, _ = ready_dataset
+    path, _ = sales_csv()
+    dataset_id = upload(client, auth_headers, "copy.csv", path.read_bytes()).json()["dataset_id"]
+    profile = read_json(source_id, "profile.json")
+
+    delta, _ = sales_csv("delta.csv", rows=20, seed=1)
+    response = client.post(
+        f"/datasets/{dataset_id}/append",
+        files={"file": ("delta.csv", delta.read_bytes(), "text/csv")},
+        headers=auth_headers,
+    )
+
+    assert response.json()["row_count"] == 520
+    assert read_json(source_id, "profile.json") == profile
+    count = {"aggregations": [{"func": "count"}]}
+    query = client.post(f"/datasets/{source_id}/query", json=count, headers=auth_headers)
+    assert query.json()["rows"] == [{"count": 500}]
+
+
+def test_same_bytes_are_processed_while_source_is_not_ready(client, auth_headers, db, sales_csv):
+    path, _ = sales_csv()
+    first = upload(client, auth_headers, "sales.csv", path.read_bytes()).json()
+
+    second = upload(client, auth_headers, "sales.csv", path.read_bytes()).json()
+
+    assert second["status"] == "PROCESSING"
+    assert db.jobs.count_documents({"dataset_id": {"$in": [first["dataset_id"], second["dataset_id"]]}}) == 2
+
+
+def test_oversized_upload_is_rejected_and_removed(client, auth_headers, db, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE_MB", 1)
+    content = b"a,b\n" + b"1,2\n" * (300 * 1024)
+
+    response = upload(client, auth_headers, "big.csv", content)
+
+    assert response.status_code == 413
+    assert db.datasets.count_documents({}) == 0
+    assert os.listdir(settings.DATASET_DIR) == []
+
+
+@pytest.mark.parametrize("name, content_type", [("notes.txt", "text/plain"), ("image.png", "image/png")])
+def test_unsupported_type_is_rejected(client, auth_headers, name, content_type):
+    response = upload(client, auth_headers, name, b"hello", content_type)
+
+    assert response.status_code == 400